@@ -1,79 +1,37 @@
 #!/usr/bin/env python3
 import aws_cdk as cdk
-from eks_vpc_cdk.eks_vpc_cdk_stack import EksVpcCdkStack
-from eks_vpc_cdk.eks_cluster_role import EksClusterRoleStack
-from eks_vpc_cdk.eks_admin_policy import EksAdminPolicyStack
-from eks_vpc_cdk.eks_nodegroup_role import EksNodeGroupRoleStack
-from eks_vpc_cdk.eks_create_cluster import EksClusterStack
-from eks_vpc_cdk.eks_launch_template import EksLaunchTemplateStack
-from eks_vpc_cdk.eks_nodegroup_scheduler import EksNodeGroupSchedulerStack
-from eks_vpc_cdk.eks_nodegroup_hello import EksNodeGroupHelloStack
-from eks_vpc_cdk.eks_k8s_resources import EksK8sResourcesStack
-from eks_vpc_cdk.eks_alb import EksAlbStack
+from eks_vpc_cdk import deploy_plan, settings, stack_registry, synth_cache, template_report
 
 app = cdk.App()
 
-# Deploy VPC stack first
-vpc_stack = EksVpcCdkStack(app, "EksVpcCdkStack")
-
-# Then deploy the EKS Cluster Role stack
-# No explicit dependency needed since they don't share resources
-cluster_role_stack = EksClusterRoleStack(app, "EksClusterRoleStack")
-nodegroup_role_stack = EksNodeGroupRoleStack(app, "EksNodeGroupRoleStack")
-admin_policy_stack = EksAdminPolicyStack(app, "EksAdminPolicyStack")
-
-# Deploy EKS cluster stack
-eks_cluster_stack = EksClusterStack(app, "EksClusterStack", vpc_stack=vpc_stack)
-eks_cluster_stack.add_dependency(vpc_stack) # Ensure VPC is created before the EKS cluster
-
-# Deploy Launch Template stack
-launch_template_stack = EksLaunchTemplateStack(app, "EksLaunchTemplateStack", eks_cluster_stack=eks_cluster_stack)
-launch_template_stack.add_dependency(eks_cluster_stack) # Ensure EKS cluster is created before launch template
-
-# Deploy Node Group stack (prod-scheduler-v2)
-nodegroup_stack = EksNodeGroupSchedulerStack(
-    app, "EksNodeGroupSchedulerStack", 
-    vpc_stack=vpc_stack,
-    eks_cluster_stack=eks_cluster_stack,
-    launch_template_stack=launch_template_stack
-)
-# Ensure all dependencies are created before the node group
-nodegroup_stack.add_dependency(vpc_stack)
-nodegroup_stack.add_dependency(cluster_role_stack)
-nodegroup_stack.add_dependency(nodegroup_role_stack)
-nodegroup_stack.add_dependency(admin_policy_stack)
-nodegroup_stack.add_dependency(eks_cluster_stack)
-nodegroup_stack.add_dependency(launch_template_stack)
-
-# NEW: Deploy Node Group stack for prod-hello
-nodegroup_hello_stack = EksNodeGroupHelloStack(
-    app, "EksNodeGroupHelloStack",
-    vpc_stack=vpc_stack,
-    eks_cluster_stack=eks_cluster_stack,
-    launch_template_stack=launch_template_stack
-)
-# Ensure all dependencies are created before the prod-hello node group
-nodegroup_hello_stack.add_dependency(vpc_stack)
-nodegroup_hello_stack.add_dependency(cluster_role_stack)
-nodegroup_hello_stack.add_dependency(nodegroup_role_stack)
-nodegroup_hello_stack.add_dependency(admin_policy_stack)
-nodegroup_hello_stack.add_dependency(eks_cluster_stack)
-nodegroup_hello_stack.add_dependency(launch_template_stack)
-
-# NEW: Deploy Kubernetes resources stack (namespace, deployment, service)
-k8s_resources_stack = EksK8sResourcesStack(
-    app, "EksK8sResourcesStack",
-    eks_cluster_stack=eks_cluster_stack
-)
-k8s_resources_stack.add_dependency(eks_cluster_stack)
-k8s_resources_stack.add_dependency(nodegroup_hello_stack)
-
-# NEW: Deploy ALB stack for prod-hello
-alb_stack = EksAlbStack(
-    app, "EksAlbStack",
-    vpc_stack=vpc_stack
-)
-alb_stack.add_dependency(vpc_stack)
-alb_stack.add_dependency(nodegroup_hello_stack)
-
-app.synth()
+# Stacks, their constructor wiring and deploy order live in eks_vpc_cdk/stack_registry.py.
+# Build only what was asked for with `-c stacks=EksAlbStack,EksClusterStack`
+# (plus the stacks they depend on); without the context value every stack is built.
+# Stack modules are imported lazily, so unrequested stacks cost nothing.
+requested = stack_registry.requested_stacks(app)
+
+# -c identity_mode=merged|nested builds the three IAM stacks as one EksIdentityStack
+identity_mode = settings.get(app, "identity_mode")
+
+# With `-c synth_cache=.synth-cache` only stacks whose inputs changed since the
+# cached synth are built; the rest are restored from the cache
+cache_dir = app.node.try_get_context("synth_cache")
+if cache_dir:
+    fingerprints = synth_cache.fingerprints(app.node.get_all_context())
+    changed = synth_cache.changed_stacks(cache_dir, fingerprints, requested, identity_mode)
+    stack_registry.build(app, synth_cache.stacks_to_build(changed, requested))
+else:
+    stack_registry.build(app, requested)
+
+assembly = app.synth()
+
+if cache_dir:
+    # cdk.out/synth-cache.json: which stacks came from the cache and need no deploy
+    synth_cache.update(cache_dir, assembly.directory, fingerprints, changed, requested, identity_mode)
+
+# cdk.out/deploy-plan.json: parallel deploy waves and the critical path
+deploy_plan.write(assembly.directory, requested, identity_mode=identity_mode)
+
+# cdk.out/template-report.json: template bytes, resource/output/export counts and
+# the largest properties; fails the synth when a stack nears a CloudFormation limit
+template_report.check(app, assembly.directory)
@@ -0,0 +1,100 @@
+"""Subnet plan derived from the VPC CIDR, the AZs and the expected pod density.
+
+The VPC CNI gives every pod an address from its node's subnet, so a private
+subnet has to hold nodes_per_az * (pods_per_node + 1) addresses (one per pod
+plus the node's own), plus the 5 that AWS reserves in every subnet. Public
+subnets only hold load balancers and NAT gateways and get a fixed size.
+
+Blocks are allocated largest first, each aligned to its own size, so they
+never overlap. Equal-sized blocks keep their order (public before private,
+AZs in order). The defaults reproduce the original layout: six /20s in
+192.168.0.0/16, public 0-47 and private 48-95 in the third octet.
+
+With a pod_cidr (-c pod_cidr=100.64.0.0/16) the VPC gets it as a secondary
+CIDR, split evenly into one pod subnet per AZ for VPC CNI custom networking;
+pods then no longer take addresses from the node subnets.
+
+Every stack takes its CIDRs and AZ names from EksVpcCdkStack.cidr_plan.
+"""
+import ipaddress
+import math
+
+from eks_vpc_cdk import settings
+
+# Addresses AWS reserves in every subnet
+RESERVED_PER_SUBNET = 5
+
+
+def private_prefix(pods_per_node, nodes_per_az):
+    """Smallest prefix length whose subnet holds nodes_per_az full nodes."""
+    required = nodes_per_az * (pods_per_node + 1) + RESERVED_PER_SUBNET
+    return 32 - math.ceil(math.log2(required))
+
+
+def allocate(vpc_cidr, prefixes):
+    """Non-overlapping subnets of vpc_cidr, one per prefix length, in input order."""
+    network = ipaddress.ip_network(vpc_cidr)
+    # Largest blocks first (sorted is stable, so equal sizes keep their order)
+    order = sorted(range(len(prefixes)), key=lambda index: prefixes[index])
+
+    subnets = [None] * len(prefixes)
+    cursor = int(network.network_address)
+    for index in order:
+        prefix = prefixes[index]
+        if prefix < network.prefixlen:
+            raise ValueError(f"A /{prefix} subnet does not fit in VPC {vpc_cidr}")
+        size = 2 ** (32 - prefix)
+        cursor = -(-cursor // size) * size  # align to the block size
+        subnet = ipaddress.ip_network(f"{ipaddress.ip_address(cursor)}/{prefix}")
+        if not subnet.subnet_of(network):
+            raise ValueError(
+                f"VPC {vpc_cidr} is too small for subnets of /{', /'.join(map(str, prefixes))}"
+            )
+        subnets[index] = str(subnet)
+        cursor += size
+    return subnets
+
+
+def pod_subnets(pod_cidr, vpc_cidr, count):
+    """pod_cidr split into count equal subnets, one per AZ."""
+    if ipaddress.ip_network(pod_cidr).overlaps(ipaddress.ip_network(vpc_cidr)):
+        raise ValueError(f"pod_cidr {pod_cidr} overlaps vpc_cidr {vpc_cidr}")
+    prefix = ipaddress.ip_network(pod_cidr).prefixlen + math.ceil(math.log2(count))
+    return allocate(pod_cidr, [prefix] * count)
+
+
+def plan(vpc_cidr, availability_zones, pods_per_node, nodes_per_az, public_subnet_prefix,
+         pod_cidr=None):
+    """Public, private and (with a pod_cidr) pod subnet CIDRs per AZ."""
+    prefix = private_prefix(pods_per_node, nodes_per_az)
+    count = len(availability_zones)
+    cidrs = allocate(vpc_cidr, [public_subnet_prefix] * count + [prefix] * count)
+    return {
+        "vpc_cidr": vpc_cidr,
+        "availability_zones": list(availability_zones),
+        "public_subnets": cidrs[:count],
+        "private_subnets": cidrs[count:],
+        "pods_per_az": nodes_per_az * pods_per_node,
+        "private_addresses_per_az": 2 ** (32 - prefix) - RESERVED_PER_SUBNET,
+        "pod_cidr": pod_cidr,
+        "pod_subnets": pod_subnets(pod_cidr, vpc_cidr, count) if pod_cidr else []
+    }
+
+
+def from_context(scope):
+    """The plan for the context values (-c vpc_cidr=..., -c az_count=..., ...)."""
+    availability_zones = settings.string_list(scope, "availability_zones")
+    az_count = settings.number(scope, "az_count")
+    if not 1 <= az_count <= len(availability_zones):
+        raise ValueError(
+            f"az_count must be between 1 and {len(availability_zones)} "
+            f"(the number of availability_zones), got {az_count}"
+        )
+    return plan(
+        settings.get(scope, "vpc_cidr"),
+        availability_zones[:az_count],
+        settings.number(scope, "pods_per_node"),
+        settings.number(scope, "nodes_per_az"),
+        settings.number(scope, "public_subnet_prefix"),
+        settings.get(scope, "pod_cidr")
+    )
@@ -0,0 +1,82 @@
+"""Node group scaling bounds and Cluster Autoscaler settings.
+
+Each managed node group takes its min, desired and max size from context
+(-c scheduler_max_size=6, -c hello_min_size=2, ...). The defaults are the
+original fixed sizes.
+
+With -c cluster_autoscaler=true, EksClusterAutoscalerStack runs Cluster
+Autoscaler with auto-discovery: it manages every node group whose
+Auto Scaling group carries the DISCOVERY tags, within that group's min and
+max. EKS copies these tags to the Auto Scaling groups of managed node groups
+itself; the node group stacks also set them on the node groups. When more
+than one group can take a pending pod, the priority expander picks the group
+with the highest priority in EXPANDER_PRIORITIES, matched on the Auto Scaling
+group name (eks-<node group name>-<uuid>).
+"""
+from eks_vpc_cdk import settings
+from eks_vpc_cdk.eks_create_cluster import CLUSTER_NAME, KUBERNETES_VERSION
+
+CHART = "autoscaler/cluster-autoscaler"
+CHART_VERSION = "9.46.6"
+REPOSITORY = "https://kubernetes.github.io/autoscaler"
+# Cluster Autoscaler minor version follows the Kubernetes version
+IMAGE_TAG = f"v{KUBERNETES_VERSION}.0"
+NAMESPACE = "kube-system"
+SERVICE_ACCOUNT = "cluster-autoscaler"
+
+# Auto-discovery tags
+DISCOVERY = {
+    "k8s.io/cluster-autoscaler/enabled": "true",
+    f"k8s.io/cluster-autoscaler/{CLUSTER_NAME}": "owned"
+}
+
+# Priority -> Auto Scaling group name patterns; higher wins
+EXPANDER_PRIORITIES = {
+    20: [".*prod-scheduler-v2.*"],
+    10: [".*"]
+}
+
+
+def scaling_config(scope, node_group):
+    """CfnNodegroup scaling_config from the <node_group>_min/desired/max_size context values."""
+    min_size = settings.number(scope, f"{node_group}_min_size")
+    desired_size = settings.number(scope, f"{node_group}_desired_size")
+    max_size = settings.number(scope, f"{node_group}_max_size")
+    if not 0 <= min_size <= desired_size <= max_size or max_size < 1:
+        raise ValueError(
+            f"{node_group} node group needs 0 <= min_size <= desired_size <= max_size "
+            f"and max_size >= 1, got {min_size}/{desired_size}/{max_size}"
+        )
+    return {
+        "desiredSize": desired_size,
+        "minSize": min_size,
+        "maxSize": max_size
+    }
+
+
+def node_group_tags(scope, tags):
+    """tags plus the auto-discovery tags when Cluster Autoscaler is enabled."""
+    if settings.flag(scope, "cluster_autoscaler"):
+        return {**tags, **DISCOVERY}
+    return tags
+
+
+def helm_values(scope, region):
+    """Helm values for auto-discovery with the priority expander."""
+    return {
+        "autoDiscovery": {"clusterName": CLUSTER_NAME},
+        "awsRegion": region,
+        "image": {"tag": IMAGE_TAG},
+        "rbac": {"serviceAccount": {"name": SERVICE_ACCOUNT}},
+        "extraArgs": {
+            "scan-interval": settings.get(scope, "cluster_autoscaler_scan_interval"),
+            "scale-down-delay-after-add": settings.get(scope, "cluster_autoscaler_scale_down_delay"),
+            "scale-down-unneeded-time": settings.get(scope, "cluster_autoscaler_scale_down_unneeded"),
+            "expander": "priority",
+            "balance-similar-node-groups": True,
+            "skip-nodes-with-system-pods": False
+        },
+        # The chart renders these into the cluster-autoscaler-priority-expander ConfigMap
+        "expanderPriorities": {str(priority): patterns for priority, patterns in EXPANDER_PRIORITIES.items()},
+        "priorityClassName": "system-cluster-critical"
+    }
@@ -0,0 +1,69 @@
+"""Service dataplane (-c dataplane=iptables|ipvs|cilium).
+
+iptables (default): kube-proxy as EKS installs it. Service routing walks one
+iptables rule chain per packet, so its cost grows with services and endpoints.
+
+ipvs: kube-proxy in IPVS mode through the kube-proxy managed add-on. Services
+become hash-table lookups in the kernel. Nodes load the ip_vs modules at boot.
+
+cilium: Cilium in ENI mode with kube-proxy replacement, installed as a Helm
+chart after the cluster exists. It takes over pod networking from aws-node,
+handles services in eBPF, and allocates pod IPs from ENIs with the node role's
+AmazonEKS_CNI_Policy. The aws-node and kube-proxy daemonsets are
+kept but pinned to a node label no node has, so they can be restored. New
+nodes start tainted until the Cilium agent is ready on them.
+"""
+# kube-proxy add-on configuration for dataplane=ipvs
+KUBE_PROXY_IPVS_CONFIGURATION = {"mode": "ipvs", "ipvs": {"scheduler": "rr"}}
+
+# Kernel modules kube-proxy needs in IPVS mode, loaded from the node user data
+IPVS_MODULES = ["ip_vs", "ip_vs_rr", "ip_vs_wrr", "ip_vs_sh", "nf_conntrack"]
+
+CILIUM_CHART = "cilium/cilium"
+CILIUM_VERSION = "1.16.5"
+CILIUM_REPOSITORY = "https://helm.cilium.io/"
+
+# Taint new nodes carry until the Cilium agent removes it
+CILIUM_AGENT_NOT_READY_TAINT = "node.cilium.io/agent-not-ready=true:NoExecute"
+
+# Node selector that parks aws-node and kube-proxy once Cilium replaces them
+DISABLED_NODE_SELECTOR = {"io.cilium/aws-node-enabled": "true"}
+
+
+def cilium_values(api_server_host, prefix_delegation=False):
+    """Helm values for Cilium in ENI mode with kube-proxy replacement."""
+    return {
+        "eni": {"enabled": True, "awsEnablePrefixDelegation": prefix_delegation},
+        "ipam": {"mode": "eni"},
+        "routingMode": "native",
+        "egressMasqueradeInterfaces": "eth+",
+        # Without kube-proxy the agent reaches the API server directly
+        "kubeProxyReplacement": True,
+        "k8sServiceHost": api_server_host,
+        "k8sServicePort": 443
+    }
+
+
+def cilium_install_commands(values_json):
+    """Shell commands that hand the dataplane over to Cilium."""
+    patch = (
+        '{"spec":{"template":{"spec":{"nodeSelector":'
+        + "{" + ",".join(f'"{key}":"{value}"' for key, value in DISABLED_NODE_SELECTOR.items()) + "}"
+        + "}}}}"
+    )
+    return " && ".join([
+        f"kubectl -n kube-system patch daemonset aws-node --type=strategic -p '{patch}'",
+        f"kubectl -n kube-system patch daemonset kube-proxy --type=strategic -p '{patch}'",
+        f"helm repo add cilium {CILIUM_REPOSITORY}",
+        f"echo '{values_json}' | helm upgrade --install cilium {CILIUM_CHART} "
+        f"--version {CILIUM_VERSION} --namespace kube-system -f -"
+    ])
+
+
+def ipvs_module_setup():
+    """User data lines that load the IPVS kernel modules now and at every boot."""
+    modules = "\n".join(IPVS_MODULES)
+    return (
+        f"cat <<'EOF' > /etc/modules-load.d/ipvs.conf\n{modules}\nEOF\n"
+        + "".join(f"modprobe {module}\n" for module in IPVS_MODULES)
+    )
@@ -0,0 +1,153 @@
+"""Deploy plan for the stack graph in stack_registry.
+
+Groups stacks into waves that can deploy in parallel and finds the critical
+path, i.e. the chain of dependent stacks that bounds a full rollout.
+
+    python -m eks_vpc_cdk.deploy_plan [--stacks A,B] [--durations minutes.json]
+                                      [--identity-mode stacks|merged|nested] [--output plan.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+from eks_vpc_cdk import stack_registry
+
+# Rough CloudFormation deploy times in minutes, used to weight the critical
+# path. Pass --durations with measured values to override any of them.
+ESTIMATED_MINUTES = {
+    "EksVpcCdkStack": 3,
+    "EksClusterRoleStack": 1,
+    "EksNodeGroupRoleStack": 1,
+    "EksAdminPolicyStack": 1,
+    "EksIdentityStack": 2,
+    "EksClusterStack": 12,
+    "EksLaunchTemplateStack": 1,
+    "EksNodeGroupSchedulerStack": 5,
+    "EksNodeGroupHelloStack": 5,
+    "EksK8sResourcesStack": 1,
+    "EksAlbStack": 4,
+    "EksKarpenterStack": 2,
+    "EksClusterAutoscalerStack": 1,
+    "EksImageBuilderStack": 30,
+    "EksSociIndexStack": 1
+}
+
+
+def _reduce(dependency_graph):
+    """Transitive reduction of a {stack: [deps]} graph."""
+    def reachable(stack_id):
+        seen = set()
+        pending = list(dependency_graph[stack_id])
+        while pending:
+            dep = pending.pop()
+            if dep not in seen:
+                seen.add(dep)
+                pending.extend(dependency_graph[dep])
+        return seen
+
+    reduced = {}
+    for stack_id, deps in dependency_graph.items():
+        implied = set().union(*(reachable(dep) for dep in deps)) if deps else set()
+        reduced[stack_id] = [dep for dep in deps if dep not in implied]
+    return reduced
+
+
+def graph(names=None, identity_mode="stacks"):
+    """Reduced dependency graph {stack: [deps]} of the deployed stacks."""
+    dependency_graph = {}
+    for stack_id in stack_registry.resolve(names):
+        name = stack_registry.deployed_as(stack_id, identity_mode)
+        deps = dependency_graph.setdefault(name, [])
+        for dep in stack_registry.reduced_dependencies(stack_id):
+            dep = stack_registry.deployed_as(dep, identity_mode)
+            if dep != name and dep not in deps:
+                deps.append(dep)
+    return _reduce(dependency_graph)
+
+
+def waves(dependency_graph):
+    """Lists of stacks where every stack only depends on earlier waves."""
+    level = {}
+    # resolve() order puts dependencies first, and so does graph()
+    for stack_id, deps in dependency_graph.items():
+        level[stack_id] = max((level[dep] + 1 for dep in deps), default=0)
+    result = [[] for _ in range(max(level.values(), default=-1) + 1)]
+    for stack_id, stack_level in level.items():
+        result[stack_level].append(stack_id)
+    return result
+
+
+def critical_path(dependency_graph, durations):
+    """Longest chain of dependent stacks, weighted by duration."""
+    finish = {}
+    previous = {}
+    for stack_id, deps in dependency_graph.items():
+        slowest = max(deps, key=lambda dep: finish[dep], default=None)
+        previous[stack_id] = slowest
+        finish[stack_id] = durations.get(stack_id, 1) + (finish[slowest] if slowest else 0)
+
+    if not finish:
+        return [], 0
+    stack_id = max(finish, key=finish.get)
+    total = finish[stack_id]
+    path = []
+    while stack_id:
+        path.append(stack_id)
+        stack_id = previous[stack_id]
+    return list(reversed(path)), total
+
+
+def plan(names=None, durations=None, identity_mode="stacks"):
+    """Deploy waves, critical path and the matching `cdk deploy` command."""
+    durations = {**ESTIMATED_MINUTES, **(durations or {})}
+    dependency_graph = graph(names, identity_mode)
+    stack_waves = waves(dependency_graph)
+    path, minutes = critical_path(dependency_graph, durations)
+    concurrency = max((len(wave) for wave in stack_waves), default=1)
+    stacks = " ".join(dependency_graph) if names else "--all"
+    return {
+        "dependencies": dependency_graph,
+        "waves": stack_waves,
+        "critical_path": path,
+        "critical_path_minutes": minutes,
+        "serial_minutes": sum(durations.get(stack_id, 1) for stack_id in dependency_graph),
+        "concurrency": concurrency,
+        "command": f"cdk deploy {stacks} --concurrency {concurrency}"
+    }
+
+
+def write(directory, names=None, durations=None, identity_mode="stacks"):
+    """Write deploy-plan.json next to the synthesized templates."""
+    path = os.path.join(directory, "deploy-plan.json")
+    with open(path, "w") as f:
+        json.dump(plan(names, durations, identity_mode), f, indent=2)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the parallel deploy plan for the EKS stacks")
+    parser.add_argument("--stacks", help="Comma-separated stack ids (default: all stacks)")
+    parser.add_argument("--durations", help="JSON file of {stack id: minutes} overriding the estimates")
+    parser.add_argument("--identity-mode", default="stacks", choices=["stacks", "merged", "nested"],
+                        help="Where the IAM stacks live (identity_mode context value)")
+    parser.add_argument("--output", help="Write the plan to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.stacks.split(",")] if args.stacks else None
+    durations = None
+    if args.durations:
+        with open(args.durations) as f:
+            durations = json.load(f)
+
+    result = json.dumps(plan(names, durations, args.identity_mode), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(result + "\n")
+    else:
+        print(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,45 +1,58 @@
 from aws_cdk import (
     Stack,
+    RemovalPolicy,
     aws_iam as iam,
     CfnOutput
 )
 from constructs import Construct
+from eks_vpc_cdk import settings
 
 class EksAdminPolicyStack(Stack):
     def __init__(self, scope: Construct, id: str, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
-        # Look up the existing devops-admin role
-        devops_admin_role = iam.Role.from_role_name(
-            self, "DevopsAdminRole",
-            role_name="devops-admins"
-        )
-
-        # Create the AdminRoleEKSClusterPolicy and attach it to devops-admin role
-        admin_eks_policy = iam.Policy(
-            self, "AdminRoleEKSClusterPolicy",
-            policy_name="AdminRoleEKSClusterPolicy",
-            roles=[devops_admin_role],
-            statements=[
-                iam.PolicyStatement(
-                    sid="EKSAdminAccessPolicy2",
-                    effect=iam.Effect.ALLOW,
-                    actions=["eks:*"],
-                    resources=["*"]
-                )
-            ]
-        )
-
-        # Output the policy name for reference (Policy object doesn't have policy_arn attribute)
-        CfnOutput(
-            self, "AdminEKSPolicyName", 
-            value=admin_eks_policy.policy_name,
-            description="Name of the AdminRoleEKSClusterPolicy"
-        )
-        
-        # Output confirmation that policy was attached to devops-admin role
-        CfnOutput(
-            self, "PolicyAttachedToRole", 
-            value=f"AdminRoleEKSClusterPolicy attached to {devops_admin_role.role_name}",
-            description="Confirmation of policy attachment"
-        )
+        self.policy = add_admin_policy(self)
+
+
+# Creates the resources directly in `scope`, so the logical IDs are the same whether
+# scope is EksAdminPolicyStack, EksIdentityStack or one of its nested stacks
+def add_admin_policy(scope: Construct) -> iam.Policy:
+    # Look up the existing devops-admin role
+    devops_admin_role = iam.Role.from_role_name(
+        scope, "DevopsAdminRole",
+        role_name="devops-admins"
+    )
+
+    # Create the AdminRoleEKSClusterPolicy and attach it to devops-admin role
+    admin_eks_policy = iam.Policy(
+        scope, "AdminRoleEKSClusterPolicy",
+        policy_name="AdminRoleEKSClusterPolicy",
+        roles=[devops_admin_role],
+        statements=[
+            iam.PolicyStatement(
+                sid="EKSAdminAccessPolicy2",
+                effect=iam.Effect.ALLOW,
+                actions=["eks:*"],
+                resources=["*"]
+            )
+        ]
+    )
+
+    # Keep the policy when the stack is deleted (-c identity_retain=true)
+    if settings.flag(scope, "identity_retain"):
+        admin_eks_policy.apply_removal_policy(RemovalPolicy.RETAIN)
+
+    # Output the policy name for reference (Policy object doesn't have policy_arn attribute)
+    CfnOutput(
+        scope, "AdminEKSPolicyName",
+        value=admin_eks_policy.policy_name,
+        description="Name of the AdminRoleEKSClusterPolicy"
+    )
+
+    # Output confirmation that policy was attached to devops-admin role
+    CfnOutput(
+        scope, "PolicyAttachedToRole",
+        value=f"AdminRoleEKSClusterPolicy attached to {devops_admin_role.role_name}",
+        description="Confirmation of policy attachment"
+    )
+    return admin_eks_policy
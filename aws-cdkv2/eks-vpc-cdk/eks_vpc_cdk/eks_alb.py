@@ -6,6 +6,7 @@ from aws_cdk import (
 )
 from constructs import Construct
 from eks_vpc_cdk.eks_vpc_cdk_stack import EksVpcCdkStack
+from eks_vpc_cdk import settings
 
 class EksAlbStack(Stack):
     def __init__(self, scope: Construct, id: str, 
@@ -14,16 +15,16 @@ class EksAlbStack(Stack):
         super().__init__(scope, id, **kwargs)
 
         # Import VPC
-        vpc_cfn = vpc_stack.vpc
+        vpc_id = vpc_stack.vpc_id_for(self)
         vpc = ec2.Vpc.from_vpc_attributes(
             self, "ImportedVpc",
-            vpc_id=vpc_cfn.ref,
-            availability_zones=["us-east-1a", "us-east-1b", "us-east-1c"],
-            vpc_cidr_block="192.168.0.0/16"
+            vpc_id=vpc_id,
+            availability_zones=vpc_stack.cidr_plan["availability_zones"],
+            vpc_cidr_block=vpc_stack.cidr_plan["vpc_cidr"]
         )
         
         # Get private subnet IDs for the internal ALB
-        private_subnet_ids = [subnet.ref for subnet in vpc_stack.private_subnets]
+        private_subnet_ids = vpc_stack.private_subnet_ids_for(self)
         
         # Create security group for the ALB
         alb_sg = ec2.SecurityGroup(
@@ -36,10 +37,19 @@ class EksAlbStack(Stack):
         
         # Allow HTTP traffic from within VPC
         alb_sg.add_ingress_rule(
-            peer=ec2.Peer.ipv4("192.168.0.0/16"),
+            peer=ec2.Peer.ipv4(vpc_stack.cidr_plan["vpc_cidr"]),
             connection=ec2.Port.tcp(80),
             description="Allow HTTP from VPC"
         )
+
+        # Dual-stack ALB and IPv6 pod targets in an IPv6 cluster (-c ip_family=ipv6)
+        ipv6 = settings.get(self, "ip_family") == "ipv6"
+        if ipv6:
+            alb_sg.add_ingress_rule(
+                peer=ec2.Peer.ipv6(vpc_stack.ipv6_cidr_for(self)),
+                connection=ec2.Port.tcp(80),
+                description="Allow HTTP from VPC over IPv6"
+            )
         
         # Create the internal Application Load Balancer
         alb = elbv2.CfnLoadBalancer(
@@ -49,7 +59,7 @@ class EksAlbStack(Stack):
             scheme="internal",  # Internal ALB
             subnets=private_subnet_ids,
             security_groups=[alb_sg.security_group_id],
-            ip_address_type="ipv4",
+            ip_address_type="dualstack" if ipv6 else "ipv4",
             tags=[
                 {"key": "Name", "value": "prod-eks-sre-hello-alb"},
                 {"key": "Environment", "value": "prod"},
@@ -63,8 +73,9 @@ class EksAlbStack(Stack):
             name="prod-hello-tg",
             port=80,
             protocol="HTTP",
-            vpc_id=vpc_cfn.ref,
+            vpc_id=vpc_id,
             target_type="ip",  # Using IP target type for EKS pods
+            ip_address_type="ipv6" if ipv6 else None,  # pods only have IPv6 addresses
             health_check_enabled=True,
             health_check_interval_seconds=30,
             health_check_path="/",
@@ -0,0 +1,95 @@
+from aws_cdk import (
+    Stack,
+    aws_eks as eks,
+    aws_iam as iam,
+    CfnOutput
+)
+from constructs import Construct
+from eks_vpc_cdk.eks_create_cluster import CLUSTER_NAME, EksClusterStack
+from eks_vpc_cdk import cluster_autoscaler
+
+class EksClusterAutoscalerStack(Stack):
+    # Cluster Autoscaler for the managed node groups (-c cluster_autoscaler=true),
+    # see cluster_autoscaler.py
+    def __init__(self, scope: Construct, id: str,
+                 eks_cluster_stack: EksClusterStack,
+                 **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        # Get the EKS cluster name
+        cluster_name = eks_cluster_stack.cluster_name_for(self)
+
+        # Controller role, handed to the cluster-autoscaler service account
+        # through EKS Pod Identity
+        autoscaler_role = iam.Role(
+            self, "ClusterAutoscalerRole",
+            role_name="prod-sre-cluster-autoscaler",
+            assumed_by=iam.ServicePrincipal("pods.eks.amazonaws.com").with_session_tags()
+        )
+        iam.Policy(
+            self, "ClusterAutoscalerPolicy",
+            policy_name="ClusterAutoscaler",
+            roles=[autoscaler_role],
+            statements=[
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "autoscaling:DescribeAutoScalingGroups",
+                        "autoscaling:DescribeAutoScalingInstances",
+                        "autoscaling:DescribeLaunchConfigurations",
+                        "autoscaling:DescribeScalingActivities",
+                        "autoscaling:DescribeTags",
+                        "ec2:DescribeImages",
+                        "ec2:DescribeInstanceTypes",
+                        "ec2:DescribeLaunchTemplateVersions",
+                        "ec2:GetInstanceTypesFromInstanceRequirements",
+                        "eks:DescribeNodegroup"
+                    ],
+                    resources=["*"]
+                ),
+                # Resize only the Auto Scaling groups of this cluster's node groups
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "autoscaling:SetDesiredCapacity",
+                        "autoscaling:TerminateInstanceInAutoScalingGroup"
+                    ],
+                    resources=["*"],
+                    conditions={
+                        "StringEquals": {
+                            f"aws:ResourceTag/{key}": value
+                            for key, value in cluster_autoscaler.DISCOVERY.items()
+                        }
+                    }
+                )
+            ]
+        )
+        eks.CfnPodIdentityAssociation(
+            self, "ClusterAutoscalerPodIdentity",
+            cluster_name=cluster_name,
+            namespace=cluster_autoscaler.NAMESPACE,
+            service_account=cluster_autoscaler.SERVICE_ACCOUNT,
+            role_arn=autoscaler_role.role_arn
+        )
+
+        # Helm values and install command as outputs, like EksK8sResourcesStack
+        CfnOutput(
+            self, "ClusterAutoscalerHelmValues",
+            value=self.to_json_string(cluster_autoscaler.helm_values(self, Stack.of(self).region)),
+            description="Cluster Autoscaler Helm values"
+        )
+        CfnOutput(
+            self, "ClusterAutoscalerInstallCommand",
+            value=(
+                f"helm repo add autoscaler {cluster_autoscaler.REPOSITORY} && "
+                f"aws cloudformation describe-stacks --stack-name {self.stack_name} "
+                "--query \"Stacks[0].Outputs[?OutputKey=='ClusterAutoscalerHelmValues'].OutputValue\" --output text"
+                f" | helm upgrade --install cluster-autoscaler {cluster_autoscaler.CHART} "
+                f"--version {cluster_autoscaler.CHART_VERSION} --namespace {cluster_autoscaler.NAMESPACE} -f -"
+            ),
+            description=f"Command to install Cluster Autoscaler for {CLUSTER_NAME}"
+        )
+
+        CfnOutput(self, "ClusterAutoscalerRoleArn", value=autoscaler_role.role_arn)
+
+        self.autoscaler_role = autoscaler_role
@@ -1,45 +1,59 @@
 from aws_cdk import (
     Stack,
+    RemovalPolicy,
     aws_iam as iam,
     CfnOutput
 )
 from constructs import Construct
+from eks_vpc_cdk import settings
 
 class EksClusterRoleStack(Stack):
     def __init__(self, scope: Construct, id: str, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
-        # Create the EKS Cluster Role
-        self.role = iam.Role(
-            self, "EksClusterRole",
-            role_name="prod-sre-eks-cluster-role",
-            assumed_by=iam.ServicePrincipal("eks.amazonaws.com")
-        )
-
-        # Add managed policies
-        self.role.add_managed_policy(
-            iam.ManagedPolicy.from_aws_managed_policy_name("AmazonEKSClusterPolicy")
-        )
-        self.role.add_managed_policy(
-            iam.ManagedPolicy.from_aws_managed_policy_name("AmazonEKSVPCResourceController")
-        )
-
-        # Create named inline policy
-        iam.Policy(
-            self, "GetCloudwatchMetricsPolicy",
-            policy_name="GetCloudwatchMetrics-for-EKS",
-            roles=[self.role],
-            statements=[
-                iam.PolicyStatement(
-                    effect=iam.Effect.ALLOW,
-                    actions=[
-                        "cloudwatch:GetMetricData",
-                        "cloudwatch:ListMetrics"
-                    ],
-                    resources=["*"]
-                )
-            ]
-        )
-
-        # Output the role ARN
-        CfnOutput(self, "EksClusterRoleArn", value=self.role.role_arn)
+        self.role = add_cluster_role(self)
+
+
+# Creates the resources directly in `scope`, so the logical IDs are the same whether
+# scope is EksClusterRoleStack, EksIdentityStack or one of its nested stacks
+def add_cluster_role(scope: Construct) -> iam.Role:
+    # Create the EKS Cluster Role
+    role = iam.Role(
+        scope, "EksClusterRole",
+        role_name="prod-sre-eks-cluster-role",
+        assumed_by=iam.ServicePrincipal("eks.amazonaws.com")
+    )
+
+    # Add managed policies
+    role.add_managed_policy(
+        iam.ManagedPolicy.from_aws_managed_policy_name("AmazonEKSClusterPolicy")
+    )
+    role.add_managed_policy(
+        iam.ManagedPolicy.from_aws_managed_policy_name("AmazonEKSVPCResourceController")
+    )
+
+    # Create named inline policy
+    metrics_policy = iam.Policy(
+        scope, "GetCloudwatchMetricsPolicy",
+        policy_name="GetCloudwatchMetrics-for-EKS",
+        roles=[role],
+        statements=[
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "cloudwatch:GetMetricData",
+                    "cloudwatch:ListMetrics"
+                ],
+                resources=["*"]
+            )
+        ]
+    )
+
+    # Keep the role and its policy when the stack is deleted (-c identity_retain=true)
+    if settings.flag(scope, "identity_retain"):
+        role.apply_removal_policy(RemovalPolicy.RETAIN)
+        metrics_policy.apply_removal_policy(RemovalPolicy.RETAIN)
+
+    # Output the role ARN
+    CfnOutput(scope, "EksClusterRoleArn", value=role.role_arn)
+    return role
@@ -1,5 +1,6 @@
 from aws_cdk import (
     Stack,
+    Fn,
     aws_eks as eks,
     aws_ec2 as ec2,
     aws_iam as iam,
@@ -7,24 +8,32 @@ from aws_cdk import (
 )
 from constructs import Construct
 from eks_vpc_cdk.eks_vpc_cdk_stack import EksVpcCdkStack # Import the VPC stack
+from eks_vpc_cdk import dataplane, settings, ssm_wiring, vpc_cni
+
+# Kubernetes service range in IPv4 mode; kube-dns gets its .10 address
+SERVICE_IPV4_CIDR = "10.100.0.0/16"
+
+CLUSTER_NAME = "prod-eks-sre-cluster"
+KUBERNETES_VERSION = "1.33"
 
 class EksClusterStack(Stack):
     def __init__(self, scope: Construct, id: str, vpc_stack: EksVpcCdkStack, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
         # Retrieve VPC and subnet information from the passed vpc_stack
-        vpc_cfn = vpc_stack.vpc
-        public_subnets = vpc_stack.public_subnets
-        private_subnets = vpc_stack.private_subnets
+        # (exports by default, SSM parameters with -c wiring=ssm)
+        vpc_id = vpc_stack.vpc_id_for(self)
+        public_subnet_ids = vpc_stack.public_subnet_ids_for(self)
+        private_subnet_ids = vpc_stack.private_subnet_ids_for(self)
 
         # Import the VPC as an L2 construct for use with SecurityGroup
         # This approach ensures the security group correctly references the VPC by ID and attributes.
         vpc = ec2.Vpc.from_vpc_attributes(
             self, "ImportedVpc",
-            vpc_id=vpc_cfn.ref,
+            vpc_id=vpc_id,
             # Explicitly define availability zones as they are crucial for proper VPC attribute import
-            availability_zones=["us-east-1a", "us-east-1b", "us-east-1c"],
-            vpc_cidr_block="192.168.0.0/16"
+            availability_zones=vpc_stack.cidr_plan["availability_zones"],
+            vpc_cidr_block=vpc_stack.cidr_plan["vpc_cidr"]
         )
 
         # 1. Create EKS cluster security group (Additional Security Group)
@@ -66,24 +75,113 @@ class EksClusterStack(Stack):
         )
 
         # 2. Create EKS Cluster
+        # The IP family can only be chosen at cluster creation
+        ip_family = settings.get(self, "ip_family")
         cluster = eks.CfnCluster(
             self, "ProdSreEksCluster",
-            name="prod-eks-sre-cluster",
+            name=CLUSTER_NAME,
             role_arn=eks_cluster_role.role_arn, # Attach the EKS Cluster Role
-            version="1.33", # Updated: Kubernetes Version to 1.33 as per your request
+            version=KUBERNETES_VERSION, # Updated: Kubernetes Version to 1.33 as per your request
             resources_vpc_config=eks.CfnCluster.ResourcesVpcConfigProperty(
-                subnet_ids=[s.ref for s in public_subnets + private_subnets], # 5. Networking: Attach Private and Public Subnets
+                subnet_ids=public_subnet_ids + private_subnet_ids, # 5. Networking: Attach Private and Public Subnets
                 security_group_ids=[cluster_sg.security_group_id],  # Additional security group
                 endpoint_public_access=True, # 7. Endpoint Access: Public
                 endpoint_private_access=True, # 7. Endpoint Access: Private
                 public_access_cidrs=["0.0.0.0/0"] # 7. Endpoint Access: Public and Private (CIDR: 0.0.0.0/0)
             ),
             kubernetes_network_config=eks.CfnCluster.KubernetesNetworkConfigProperty(
-                ip_family="ipv4", # Corrected: Use uppercase "IPV4" for Cfn property
-                service_ipv4_cidr="10.100.0.0/16" # 6. IPv4 CIDR: 10.100.0.0/16
+                ip_family=ip_family, # "ipv4", or "ipv6" with -c ip_family=ipv6
+                # 6. IPv4 CIDR: 10.100.0.0/16 (EKS assigns the service range in IPv6 mode)
+                service_ipv4_cidr=SERVICE_IPV4_CIDR if ip_family == "ipv4" else None
             )
         )
 
+        # Managed add-ons (-c managed_addons=true): vpc-cni, coredns and kube-proxy
+        # become EKS add-ons instead of the self-managed defaults EKS installs
+        managed_addons = settings.flag(self, "managed_addons")
+
+        # Service dataplane (-c dataplane=ipvs|cilium), see dataplane.py. Cilium
+        # replaces both aws-node and kube-proxy, so neither becomes an add-on.
+        service_dataplane = settings.get(self, "dataplane")
+        cilium = service_dataplane == "cilium"
+        if cilium and (vpc_stack.pod_subnets or ip_family != "ipv4"):
+            raise ValueError("dataplane=cilium (ENI mode) supports neither pod_cidr nor ip_family=ipv6")
+
+        # vpc-cni managed add-on, also when a setting changes its configuration
+        # (custom networking, prefix delegation), see vpc_cni.py
+        cni_configuration = vpc_cni.configuration(
+            self,
+            vpc_stack.cidr_plan["availability_zones"],
+            vpc_stack.pod_subnet_ids_for(self),
+            cluster.attr_cluster_security_group_id
+        )
+        if (cni_configuration or managed_addons) and not cilium:
+            eks.CfnAddon(
+                self, "VpcCniAddon",
+                addon_name="vpc-cni",
+                cluster_name=cluster.ref,
+                resolve_conflicts="OVERWRITE",
+                configuration_values=self.to_json_string(cni_configuration) if cni_configuration else None
+            )
+
+        if managed_addons:
+            # CoreDNS replicas scale with the number of nodes and CPU cores in the
+            # cluster, between coredns_min_replicas and coredns_max_replicas
+            eks.CfnAddon(
+                self, "CorednsAddon",
+                addon_name="coredns",
+                cluster_name=cluster.ref,
+                resolve_conflicts="OVERWRITE",
+                configuration_values=self.to_json_string({
+                    "autoScaling": {
+                        "enabled": True,
+                        "minReplicas": settings.number(self, "coredns_min_replicas"),
+                        "maxReplicas": settings.number(self, "coredns_max_replicas")
+                    }
+                })
+            )
+
+        # kube-proxy managed add-on, also to switch it to IPVS mode
+        if (managed_addons or service_dataplane == "ipvs") and not cilium:
+            eks.CfnAddon(
+                self, "KubeProxyAddon",
+                addon_name="kube-proxy",
+                cluster_name=cluster.ref,
+                resolve_conflicts="OVERWRITE",
+                configuration_values=(
+                    self.to_json_string(dataplane.KUBE_PROXY_IPVS_CONFIGURATION)
+                    if service_dataplane == "ipvs" else None
+                )
+            )
+
+        # EKS Pod Identity agent, for controllers that get their IAM role through
+        # a pod identity association (Karpenter, Cluster Autoscaler)
+        if settings.flag(self, "karpenter") or settings.flag(self, "cluster_autoscaler"):
+            eks.CfnAddon(
+                self, "PodIdentityAgentAddon",
+                addon_name="eks-pod-identity-agent",
+                cluster_name=cluster.ref,
+                resolve_conflicts="OVERWRITE"
+            )
+
+        # Cilium is a Helm chart installed after the cluster exists: emit its
+        # values and the commands that hand the dataplane over to it
+        if cilium:
+            cilium_values = self.to_json_string(dataplane.cilium_values(
+                Fn.select(1, Fn.split("//", cluster.attr_endpoint)),
+                settings.flag(self, "prefix_delegation")
+            ))
+            CfnOutput(
+                self, "CiliumHelmValues",
+                value=cilium_values,
+                description=f"Helm values for {dataplane.CILIUM_CHART} {dataplane.CILIUM_VERSION}"
+            )
+            CfnOutput(
+                self, "CiliumInstallCommands",
+                value=dataplane.cilium_install_commands(cilium_values),
+                description="Commands to replace aws-node and kube-proxy with Cilium"
+            )
+
         # Output the Cluster Name and ARN
         CfnOutput(self, "EksClusterName", value=cluster.name)
         CfnOutput(self, "EksClusterArn", value=cluster.attr_arn)
@@ -105,3 +203,31 @@ class EksClusterStack(Stack):
         # Store the cluster reference for potential use by other stacks
         self.cluster = cluster
         self.primary_security_group_id = cluster.attr_cluster_security_group_id
+
+        # Publish identifiers for consumers when SSM wiring is enabled (-c wiring=ssm)
+        ssm_wiring.publish(self, ssm_wiring.CLUSTER_NAME, cluster.name)
+        ssm_wiring.publish(
+            self, ssm_wiring.CLUSTER_PRIMARY_SECURITY_GROUP_ID, cluster.attr_cluster_security_group_id
+        )
+        ssm_wiring.publish(self, ssm_wiring.CLUSTER_ENDPOINT, cluster.attr_endpoint)
+        ssm_wiring.publish(
+            self, ssm_wiring.CLUSTER_CERTIFICATE_AUTHORITY, cluster.attr_certificate_authority_data
+        )
+
+    # Accessors for consumer stacks: the value itself (export) or an SSM lookup
+    def cluster_name_for(self, consumer: Construct) -> str:
+        return ssm_wiring.resolve(consumer, ssm_wiring.CLUSTER_NAME, self.cluster.name)
+
+    def primary_security_group_id_for(self, consumer: Construct) -> str:
+        return ssm_wiring.resolve(
+            consumer, ssm_wiring.CLUSTER_PRIMARY_SECURITY_GROUP_ID, self.primary_security_group_id
+        )
+
+    # API server endpoint and CA data, for self-managed nodes that bootstrap themselves
+    def endpoint_for(self, consumer: Construct) -> str:
+        return ssm_wiring.resolve(consumer, ssm_wiring.CLUSTER_ENDPOINT, self.cluster.attr_endpoint)
+
+    def certificate_authority_for(self, consumer: Construct) -> str:
+        return ssm_wiring.resolve(
+            consumer, ssm_wiring.CLUSTER_CERTIFICATE_AUTHORITY, self.cluster.attr_certificate_authority_data
+        )
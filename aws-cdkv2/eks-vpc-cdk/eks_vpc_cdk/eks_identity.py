@@ -0,0 +1,28 @@
+from aws_cdk import (
+    Stack,
+    NestedStack
+)
+from constructs import Construct
+from eks_vpc_cdk.eks_cluster_role import add_cluster_role
+from eks_vpc_cdk.eks_nodegroup_role import add_nodegroup_role
+from eks_vpc_cdk.eks_admin_policy import add_admin_policy
+
+class EksIdentityStack(Stack):
+    # Replaces EksClusterRoleStack, EksNodeGroupRoleStack and EksAdminPolicyStack
+    # with one stack (-c identity_mode=merged|nested)
+    def __init__(self, scope: Construct, id: str, identity_mode: str = "merged", **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        if identity_mode == "nested":
+            # One nested stack per former stack, named after it. Logical IDs inside
+            # each nested template are exactly those of the standalone stack.
+            self.cluster_role = add_cluster_role(NestedStack(self, "EksClusterRoleStack"))
+            self.nodegroup_role = add_nodegroup_role(NestedStack(self, "EksNodeGroupRoleStack"))
+            self.admin_policy = add_admin_policy(NestedStack(self, "EksAdminPolicyStack"))
+        else:
+            # All resources directly in this stack, so they keep their standalone
+            # logical IDs. The two identical GetCloudwatchMetrics-for-EKS inline
+            # policies become one AWS::IAM::Policy attached to both roles.
+            self.cluster_role = add_cluster_role(self)
+            self.nodegroup_role = add_nodegroup_role(self)
+            self.admin_policy = add_admin_policy(self)
@@ -0,0 +1,203 @@
+from aws_cdk import (
+    Stack,
+    aws_ec2 as ec2,
+    aws_iam as iam,
+    aws_imagebuilder as imagebuilder,
+    CfnOutput
+)
+from constructs import Construct
+from eks_vpc_cdk.eks_vpc_cdk_stack import EksVpcCdkStack
+from eks_vpc_cdk.eks_launch_template import INSTANCE_TYPE, INSTANCE_TAGS, ROOT_VOLUME
+from eks_vpc_cdk import image_cache, settings, soci, warm_pool
+
+class EksImageBuilderStack(Stack):
+    # Image Builder pipeline for a node AMI with the hot container images
+    # pre-pulled (-c image_builder=true), see image_cache.py
+    def __init__(self, scope: Construct, id: str,
+                 vpc_stack: EksVpcCdkStack,
+                 **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        # Build instances run in a private subnet and pull through the NAT gateway
+        vpc_id = vpc_stack.vpc_id_for(self)
+        private_subnet_ids = vpc_stack.private_subnet_ids_for(self)
+
+        images = settings.string_list(self, "cached_images")
+
+        # Build instance role: Image Builder's agent (SSM) and ECR pulls
+        build_role = iam.Role(
+            self, "ImageBuilderInstanceRole",
+            role_name="prod-eks-image-builder",
+            assumed_by=iam.ServicePrincipal("ec2.amazonaws.com"),
+            managed_policies=[
+                iam.ManagedPolicy.from_aws_managed_policy_name("AmazonSSMManagedInstanceCore"),
+                iam.ManagedPolicy.from_aws_managed_policy_name("EC2InstanceProfileForImageBuilder"),
+                iam.ManagedPolicy.from_aws_managed_policy_name("AmazonEC2ContainerRegistryReadOnly")
+            ]
+        )
+        instance_profile = iam.CfnInstanceProfile(
+            self, "ImageBuilderInstanceProfile",
+            instance_profile_name="prod-eks-image-builder",
+            roles=[build_role.role_name]
+        )
+
+        # Egress only; nothing connects to the build instance
+        build_sg = ec2.CfnSecurityGroup(
+            self, "ImageBuilderSecurityGroup",
+            group_description="Image Builder build instances for the node AMI",
+            vpc_id=vpc_id,
+            security_group_egress=[
+                ec2.CfnSecurityGroup.EgressProperty(ip_protocol="-1", cidr_ip="0.0.0.0/0")
+            ],
+            tags=[{"key": "Name", "value": "prod-eks-image-builder-sg"}]
+        )
+
+        # Pull the images into containerd's k8s.io namespace; the version
+        # follows the document, so a changed one is a new component version
+        component_properties = {
+            "name": "prod-eks-image-cache",
+            "platform": "Linux",
+            "data": image_cache.component_document(images)
+        }
+        component_version = image_cache.version(component_properties)
+        component = imagebuilder.CfnComponent(
+            self, "ImageCacheComponent",
+            version=component_version,
+            **component_properties
+        )
+        components = [(component, component_properties["name"], component_version)]
+
+        # SOCI snapshotter baked in (-c soci=true), so nodes on this AMI do
+        # not download it at boot, see soci.py
+        if soci.enabled(self):
+            soci_properties = {
+                "name": "prod-eks-soci-snapshotter",
+                "platform": "Linux",
+                "data": soci.component_document(self)
+            }
+            soci_version = image_cache.version(soci_properties)
+            soci_component = imagebuilder.CfnComponent(
+                self, "SociSnapshotterComponent",
+                version=soci_version,
+                **soci_properties
+            )
+            components.append((soci_component, soci_properties["name"], soci_version))
+
+        # Same EKS optimized AL2023 AMI the warm pool group launches; the ssm:
+        # prefix makes Image Builder resolve it at build time, so scheduled
+        # builds pick up new AMI releases
+        recipe_properties = {
+            "name": "prod-eks-node",
+            "parent_image": f"ssm:{warm_pool.AMI_PARAMETER}",
+            "block_device_mappings": [
+                {
+                    "deviceName": ROOT_VOLUME["device_name"],
+                    "ebs": {
+                        "deleteOnTermination": True,
+                        "volumeSize": ROOT_VOLUME["volume_size"],
+                        "volumeType": ROOT_VOLUME["volume_type"],
+                        "iops": ROOT_VOLUME["iops"],
+                        "throughput": ROOT_VOLUME["throughput"]
+                    }
+                }
+            ]
+        }
+        # The component ARNs are tokens; their names and versions determine them
+        recipe_version = image_cache.version({
+            **recipe_properties,
+            "components": [{"name": name, "version": version} for _, name, version in components]
+        })
+        recipe = imagebuilder.CfnImageRecipe(
+            self, "NodeImageRecipe",
+            version=recipe_version,
+            components=[
+                imagebuilder.CfnImageRecipe.ComponentConfigurationProperty(component_arn=component.attr_arn)
+                for component, _, _ in components
+            ],
+            **recipe_properties
+        )
+
+        infrastructure = imagebuilder.CfnInfrastructureConfiguration(
+            self, "NodeImageInfrastructure",
+            name="prod-eks-node",
+            instance_profile_name=instance_profile.ref,
+            instance_types=[INSTANCE_TYPE],
+            subnet_id=private_subnet_ids[0],
+            security_group_ids=[build_sg.attr_group_id],
+            instance_metadata_options=imagebuilder.CfnInfrastructureConfiguration.InstanceMetadataOptionsProperty(
+                http_tokens="required"
+            ),
+            resource_tags={**INSTANCE_TAGS, "Component": "prod-eks-image-builder"},
+            terminate_instance_on_failure=True
+        )
+
+        # Tagged AMI in this region; its ID goes to the parameter the launch
+        # templates read (-c node_image=image_builder)
+        distribution = imagebuilder.CfnDistributionConfiguration(
+            self, "NodeImageDistribution",
+            name="prod-eks-node",
+            distributions=[
+                imagebuilder.CfnDistributionConfiguration.DistributionProperty(
+                    region=Stack.of(self).region,
+                    ami_distribution_configuration={
+                        "Name": "prod-eks-node-{{ imagebuilder:buildDate }}",
+                        "AmiTags": {**INSTANCE_TAGS, **image_cache.AMI_TAGS}
+                    },
+                    ssm_parameter_configurations=[
+                        imagebuilder.CfnDistributionConfiguration.SsmParameterConfigurationProperty(
+                            parameter_name=image_cache.AMI_PARAMETER,
+                            data_type="aws:ec2:image"
+                        )
+                    ]
+                )
+            ]
+        )
+
+        # The recipe has no test components; skip the test phase
+        image_tests = {"imageTestsEnabled": False}
+
+        # First image, built while the stack deploys, so the parameter exists
+        # before EksLaunchTemplateStack reads it
+        image = imagebuilder.CfnImage(
+            self, "NodeImage",
+            image_recipe_arn=recipe.attr_arn,
+            infrastructure_configuration_arn=infrastructure.attr_arn,
+            distribution_configuration_arn=distribution.attr_arn,
+            image_tests_configuration=image_tests
+        )
+
+        # Scheduled rebuilds for new EKS AMI releases and image pushes
+        pipeline = imagebuilder.CfnImagePipeline(
+            self, "NodeImagePipeline",
+            name="prod-eks-node",
+            image_recipe_arn=recipe.attr_arn,
+            infrastructure_configuration_arn=infrastructure.attr_arn,
+            distribution_configuration_arn=distribution.attr_arn,
+            image_tests_configuration=image_tests,
+            schedule=imagebuilder.CfnImagePipeline.ScheduleProperty(
+                schedule_expression=settings.get(self, "image_pipeline_schedule"),
+                pipeline_execution_start_condition="EXPRESSION_MATCH_ONLY"
+            )
+        )
+
+        self.image = image
+        self.pipeline = pipeline
+
+        # Outputs
+        CfnOutput(
+            self, "NodeImageId",
+            value=image.attr_image_id,
+            description="AMI built when the stack was deployed"
+        )
+
+        CfnOutput(
+            self, "NodeImagePipelineArn",
+            value=pipeline.attr_arn,
+            description="Image Builder pipeline for the node AMI"
+        )
+
+        CfnOutput(
+            self, "NodeImageParameter",
+            value=image_cache.AMI_PARAMETER,
+            description="SSM parameter with the latest node AMI ID (-c node_image=image_builder)"
+        )
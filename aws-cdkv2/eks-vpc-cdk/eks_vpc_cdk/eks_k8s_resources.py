@@ -4,7 +4,9 @@ from aws_cdk import (
     CfnOutput
 )
 from constructs import Construct
-from eks_vpc_cdk.eks_create_cluster import EksClusterStack
+from eks_vpc_cdk.eks_create_cluster import EksClusterStack, SERVICE_IPV4_CIDR
+from eks_vpc_cdk import node_capacity, node_local_dns, settings
+import ipaddress
 import json
 
 class EksK8sResourcesStack(Stack):
@@ -13,9 +15,8 @@ class EksK8sResourcesStack(Stack):
                  **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
-        # Get the EKS cluster reference
-        cluster = eks_cluster_stack.cluster
-        cluster_name = cluster.name
+        # Get the EKS cluster name
+        cluster_name = eks_cluster_stack.cluster_name_for(self)
         
         # Create namespace manifest
         namespace_manifest = {
@@ -68,12 +69,27 @@ class EksK8sResourcesStack(Stack):
                             }
                         ],
                         "nodeSelector": {
-                            "eks.amazonaws.com/nodegroup": "prod-hello-ng"
+                            "eks.amazonaws.com/nodegroup": node_capacity.node_group_name(self, "hello")
                         }
                     }
                 }
             }
         }
+
+        # On arm64 nodes (-c hello_architecture=arm64) the pods select the
+        # architecture and tolerate its taint; the image must be multi-arch
+        hello_architecture = node_capacity.architecture(self, "hello")
+        if hello_architecture == "arm64":
+            pod_spec = deployment_manifest["spec"]["template"]["spec"]
+            pod_spec["nodeSelector"]["kubernetes.io/arch"] = node_capacity.KUBERNETES_ARCH[hello_architecture]
+            pod_spec["tolerations"] = [
+                {
+                    "key": node_capacity.ARM64_TAINT["key"],
+                    "operator": "Equal",
+                    "value": node_capacity.ARM64_TAINT["value"],
+                    "effect": "NoSchedule"
+                }
+            ]
         
         # Create service manifest
         service_manifest = {
@@ -124,6 +140,34 @@ class EksK8sResourcesStack(Stack):
             description="Kubernetes service manifest for prod-hello"
         )
         
+        # NodeLocal DNSCache (-c node_local_dns=true): one output per object,
+        # apply them in order with the command below
+        if settings.flag(self, "node_local_dns"):
+            if settings.get(self, "ip_family") != "ipv4":
+                raise ValueError("node_local_dns needs the IPv4 kube-dns address (ip_family=ipv4)")
+            service_dataplane = settings.get(self, "dataplane")
+            if service_dataplane == "cilium":
+                raise ValueError("node_local_dns needs kube-proxy; dataplane=cilium replaces it")
+            kube_dns_ip = str(ipaddress.ip_network(SERVICE_IPV4_CIDR)[10])
+            dns_manifests = node_local_dns.manifests(kube_dns_ip, ipvs=service_dataplane == "ipvs")
+            for output_id, manifest in dns_manifests.items():
+                CfnOutput(
+                    self, output_id,
+                    value=json.dumps(manifest),
+                    description=f"NodeLocal DNSCache {manifest['kind']} manifest"
+                )
+
+            CfnOutput(
+                self, "NodeLocalDnsInstallCommand",
+                value=" && ".join(
+                    f"aws cloudformation describe-stacks --stack-name {self.stack_name} "
+                    f"--query \"Stacks[0].Outputs[?OutputKey=='{output_id}'].OutputValue\" "
+                    f"--output text | kubectl apply -f -"
+                    for output_id in dns_manifests
+                ),
+                description="Command to install NodeLocal DNSCache"
+            )
+
         # Store cluster name for kubectl commands
         CfnOutput(
             self, "ClusterName",
@@ -0,0 +1,421 @@
+from aws_cdk import (
+    Stack,
+    aws_eks as eks,
+    aws_events as events,
+    aws_iam as iam,
+    aws_sqs as sqs,
+    CfnOutput
+)
+from constructs import Construct
+from eks_vpc_cdk.eks_create_cluster import CLUSTER_NAME, EksClusterStack
+from eks_vpc_cdk.eks_launch_template import INSTANCE_TYPE, INSTANCE_TAGS, ROOT_VOLUME
+from eks_vpc_cdk import dataplane, image_cache, node_config, node_storage, settings
+
+KARPENTER_VERSION = "1.1.1"
+KARPENTER_CHART = "oci://public.ecr.aws/karpenter/karpenter"
+KARPENTER_NAMESPACE = "kube-system"
+KARPENTER_SERVICE_ACCOUNT = "karpenter"
+
+# Ownership tag Karpenter puts on the instances, launch templates and
+# instance profiles it creates; the controller policy is scoped to it
+CLUSTER_TAG = f"kubernetes.io/cluster/{CLUSTER_NAME}"
+
+# Role of the nodes Karpenter launches (same as the managed node groups)
+NODE_ROLE_NAME = "prod-sre-workernode-role"
+
+# EC2 events Karpenter reacts to before the instance goes away
+INTERRUPTION_EVENTS = {
+    "ScheduledChangeRule": {"source": ["aws.health"], "detail-type": ["AWS Health Event"]},
+    "SpotInterruptionRule": {"source": ["aws.ec2"], "detail-type": ["EC2 Spot Instance Interruption Warning"]},
+    "RebalanceRule": {"source": ["aws.ec2"], "detail-type": ["EC2 Instance Rebalance Recommendation"]},
+    "InstanceStateChangeRule": {"source": ["aws.ec2"], "detail-type": ["EC2 Instance State-change Notification"]}
+}
+
+class EksKarpenterStack(Stack):
+    # Karpenter provisions nodes for pending pods directly through EC2 fleet,
+    # next to the fixed managed node groups (-c karpenter=true)
+    def __init__(self, scope: Construct, id: str,
+                 eks_cluster_stack: EksClusterStack,
+                 **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        # Get the EKS cluster name and the primary security group for the nodes
+        cluster_name = eks_cluster_stack.cluster_name_for(self)
+        primary_sg_id = eks_cluster_stack.primary_security_group_id_for(self)
+        partition = Stack.of(self).partition
+        region = Stack.of(self).region
+        account = Stack.of(self).account
+
+        # Interruption queue: spot interruptions, rebalance recommendations,
+        # scheduled maintenance and instance state changes, so Karpenter can
+        # drain a node before it is gone
+        queue = sqs.CfnQueue(
+            self, "KarpenterInterruptionQueue",
+            queue_name="prod-eks-karpenter-interruption",
+            message_retention_period=300,
+            sqs_managed_sse_enabled=True
+        )
+        sqs.CfnQueuePolicy(
+            self, "KarpenterInterruptionQueuePolicy",
+            queues=[queue.ref],
+            policy_document={
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Effect": "Allow",
+                        "Principal": {"Service": ["events.amazonaws.com", "sqs.amazonaws.com"]},
+                        "Action": "sqs:SendMessage",
+                        "Resource": queue.attr_arn
+                    }
+                ]
+            }
+        )
+        for rule_id, event_pattern in INTERRUPTION_EVENTS.items():
+            events.CfnRule(
+                self, rule_id,
+                event_pattern=event_pattern,
+                targets=[events.CfnRule.TargetProperty(id="KarpenterInterruptionQueue", arn=queue.attr_arn)]
+            )
+
+        # Controller role, handed to the karpenter service account through EKS Pod Identity
+        controller_role = iam.Role(
+            self, "KarpenterControllerRole",
+            role_name="prod-sre-karpenter-controller",
+            assumed_by=iam.ServicePrincipal("pods.eks.amazonaws.com").with_session_tags()
+        )
+        # Mutating actions are scoped to resources tagged for this cluster, as
+        # in the upstream Karpenter controller policy; Karpenter sets these tags
+        # on everything it creates
+        tagged_resources = [
+            f"arn:{partition}:ec2:{region}:*:{resource}/*"
+            for resource in (
+                "fleet", "instance", "volume", "network-interface", "launch-template", "spot-instances-request"
+            )
+        ]
+        instance_profiles = f"arn:{partition}:iam::{account}:instance-profile/*"
+        profile_request_tags = {
+            f"aws:RequestTag/{CLUSTER_TAG}": "owned",
+            "aws:RequestTag/eks:eks-cluster-name": CLUSTER_NAME,
+            "aws:RequestTag/topology.kubernetes.io/region": region
+        }
+        profile_resource_tags = {
+            f"aws:ResourceTag/{CLUSTER_TAG}": "owned",
+            "aws:ResourceTag/topology.kubernetes.io/region": region
+        }
+        iam.Policy(
+            self, "KarpenterControllerPolicy",
+            policy_name="KarpenterController",
+            roles=[controller_role],
+            statements=[
+                # Launch nodes from any image, snapshot, security group and subnet ...
+                iam.PolicyStatement(
+                    sid="AllowScopedEC2InstanceAccessActions",
+                    effect=iam.Effect.ALLOW,
+                    actions=["ec2:RunInstances", "ec2:CreateFleet"],
+                    resources=[
+                        f"arn:{partition}:ec2:{region}::image/*",
+                        f"arn:{partition}:ec2:{region}::snapshot/*",
+                        f"arn:{partition}:ec2:{region}:*:security-group/*",
+                        f"arn:{partition}:ec2:{region}:*:subnet/*"
+                    ]
+                ),
+                # ... but only from launch templates Karpenter created for this cluster
+                iam.PolicyStatement(
+                    sid="AllowScopedEC2LaunchTemplateAccessActions",
+                    effect=iam.Effect.ALLOW,
+                    actions=["ec2:RunInstances", "ec2:CreateFleet"],
+                    resources=[f"arn:{partition}:ec2:{region}:*:launch-template/*"],
+                    conditions={
+                        "StringEquals": {f"aws:ResourceTag/{CLUSTER_TAG}": "owned"},
+                        "StringLike": {"aws:ResourceTag/karpenter.sh/nodepool": "*"}
+                    }
+                ),
+                # New instances, volumes, fleets and launch templates must carry the cluster tags
+                iam.PolicyStatement(
+                    sid="AllowScopedEC2InstanceActionsWithTags",
+                    effect=iam.Effect.ALLOW,
+                    actions=["ec2:RunInstances", "ec2:CreateFleet", "ec2:CreateLaunchTemplate"],
+                    resources=tagged_resources,
+                    conditions={
+                        "StringEquals": {
+                            f"aws:RequestTag/{CLUSTER_TAG}": "owned",
+                            "aws:RequestTag/eks:eks-cluster-name": CLUSTER_NAME
+                        },
+                        "StringLike": {"aws:RequestTag/karpenter.sh/nodepool": "*"}
+                    }
+                ),
+                # Tags only while creating those resources ...
+                iam.PolicyStatement(
+                    sid="AllowScopedResourceCreationTagging",
+                    effect=iam.Effect.ALLOW,
+                    actions=["ec2:CreateTags"],
+                    resources=tagged_resources,
+                    conditions={
+                        "StringEquals": {
+                            f"aws:RequestTag/{CLUSTER_TAG}": "owned",
+                            "aws:RequestTag/eks:eks-cluster-name": CLUSTER_NAME,
+                            "ec2:CreateAction": ["RunInstances", "CreateFleet", "CreateLaunchTemplate"]
+                        },
+                        "StringLike": {"aws:RequestTag/karpenter.sh/nodepool": "*"}
+                    }
+                ),
+                # ... and the node claim and name tags on this cluster's Karpenter instances
+                iam.PolicyStatement(
+                    sid="AllowScopedResourceTagging",
+                    effect=iam.Effect.ALLOW,
+                    actions=["ec2:CreateTags"],
+                    resources=[f"arn:{partition}:ec2:{region}:*:instance/*"],
+                    conditions={
+                        "StringEquals": {f"aws:ResourceTag/{CLUSTER_TAG}": "owned"},
+                        "StringLike": {"aws:ResourceTag/karpenter.sh/nodepool": "*"},
+                        "StringEqualsIfExists": {"aws:RequestTag/eks:eks-cluster-name": CLUSTER_NAME},
+                        "ForAllValues:StringEquals": {
+                            "aws:TagKeys": ["eks:eks-cluster-name", "karpenter.sh/nodeclaim", "Name"]
+                        }
+                    }
+                ),
+                # Terminate only this cluster's Karpenter instances and launch templates
+                iam.PolicyStatement(
+                    sid="AllowScopedDeletion",
+                    effect=iam.Effect.ALLOW,
+                    actions=["ec2:TerminateInstances", "ec2:DeleteLaunchTemplate"],
+                    resources=[
+                        f"arn:{partition}:ec2:{region}:*:instance/*",
+                        f"arn:{partition}:ec2:{region}:*:launch-template/*"
+                    ],
+                    conditions={
+                        "StringEquals": {f"aws:ResourceTag/{CLUSTER_TAG}": "owned"},
+                        "StringLike": {"aws:ResourceTag/karpenter.sh/nodepool": "*"}
+                    }
+                ),
+                iam.PolicyStatement(
+                    sid="AllowRegionalReadActions",
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "ec2:DescribeAvailabilityZones",
+                        "ec2:DescribeImages",
+                        "ec2:DescribeInstances",
+                        "ec2:DescribeInstanceTypeOfferings",
+                        "ec2:DescribeInstanceTypes",
+                        "ec2:DescribeLaunchTemplates",
+                        "ec2:DescribeSecurityGroups",
+                        "ec2:DescribeSpotPriceHistory",
+                        "ec2:DescribeSubnets"
+                    ],
+                    resources=["*"],
+                    conditions={"StringEquals": {"aws:RequestedRegion": region}}
+                ),
+                # EKS optimized AMI ids
+                iam.PolicyStatement(
+                    sid="AllowSSMReadActions",
+                    effect=iam.Effect.ALLOW,
+                    actions=["ssm:GetParameter"],
+                    resources=[f"arn:{partition}:ssm:{region}::parameter/aws/service/*"]
+                ),
+                iam.PolicyStatement(
+                    sid="AllowPricingReadActions",
+                    effect=iam.Effect.ALLOW,
+                    actions=["pricing:GetProducts"],
+                    resources=["*"]
+                ),
+                iam.PolicyStatement(
+                    sid="AllowInterruptionQueueActions",
+                    effect=iam.Effect.ALLOW,
+                    actions=["sqs:DeleteMessage", "sqs:GetQueueUrl", "sqs:ReceiveMessage"],
+                    resources=[queue.attr_arn]
+                ),
+                # The node role, to EC2 only
+                iam.PolicyStatement(
+                    sid="AllowPassingInstanceRole",
+                    effect=iam.Effect.ALLOW,
+                    actions=["iam:PassRole"],
+                    resources=[f"arn:{partition}:iam::{account}:role/{NODE_ROLE_NAME}"],
+                    conditions={"StringEquals": {"iam:PassedToService": "ec2.amazonaws.com"}}
+                ),
+                # Instance profiles Karpenter creates per EC2NodeClass; it may
+                # only change and delete the ones tagged for this cluster and region
+                iam.PolicyStatement(
+                    sid="AllowScopedInstanceProfileCreationActions",
+                    effect=iam.Effect.ALLOW,
+                    actions=["iam:CreateInstanceProfile"],
+                    resources=[instance_profiles],
+                    conditions={
+                        "StringEquals": profile_request_tags,
+                        "StringLike": {"aws:RequestTag/karpenter.k8s.aws/ec2nodeclass": "*"}
+                    }
+                ),
+                iam.PolicyStatement(
+                    sid="AllowScopedInstanceProfileTagActions",
+                    effect=iam.Effect.ALLOW,
+                    actions=["iam:TagInstanceProfile"],
+                    resources=[instance_profiles],
+                    conditions={
+                        "StringEquals": {**profile_resource_tags, **profile_request_tags},
+                        "StringLike": {
+                            "aws:ResourceTag/karpenter.k8s.aws/ec2nodeclass": "*",
+                            "aws:RequestTag/karpenter.k8s.aws/ec2nodeclass": "*"
+                        }
+                    }
+                ),
+                iam.PolicyStatement(
+                    sid="AllowScopedInstanceProfileActions",
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "iam:AddRoleToInstanceProfile",
+                        "iam:RemoveRoleFromInstanceProfile",
+                        "iam:DeleteInstanceProfile"
+                    ],
+                    resources=[instance_profiles],
+                    conditions={
+                        "StringEquals": profile_resource_tags,
+                        "StringLike": {"aws:ResourceTag/karpenter.k8s.aws/ec2nodeclass": "*"}
+                    }
+                ),
+                iam.PolicyStatement(
+                    sid="AllowInstanceProfileReadActions",
+                    effect=iam.Effect.ALLOW,
+                    actions=["iam:GetInstanceProfile", "iam:ListInstanceProfiles"],
+                    resources=[instance_profiles]
+                ),
+                iam.PolicyStatement(
+                    sid="AllowAPIServerEndpointDiscovery",
+                    effect=iam.Effect.ALLOW,
+                    actions=["eks:DescribeCluster"],
+                    resources=[f"arn:{partition}:eks:{region}:{account}:cluster/{cluster_name}"]
+                )
+            ]
+        )
+        eks.CfnPodIdentityAssociation(
+            self, "KarpenterPodIdentity",
+            cluster_name=cluster_name,
+            namespace=KARPENTER_NAMESPACE,
+            service_account=KARPENTER_SERVICE_ACCOUNT,
+            role_arn=controller_role.role_arn
+        )
+
+        # Node settings reused from the launch template
+        instance_types = settings.string_list(self, "karpenter_instance_types") or [INSTANCE_TYPE]
+        service_dataplane = settings.get(self, "dataplane")
+
+        # The launch template's kubelet settings, as far as an EC2NodeClass takes them
+        kubelet_config = node_config.kubelet_config(self, instance_types)
+        kubelet = node_config.karpenter_kubelet(kubelet_config)
+        user_data = node_config.karpenter_user_data(self, kubelet_config)
+
+        # Root volume performance for the smallest type without instance store
+        # (-c storage_profile=nvme, see node_storage.py)
+        root_volume = node_storage.root_volume(self, instance_types, ROOT_VOLUME)
+
+        metadata_options = {"httpEndpoint": "enabled"}
+        if settings.get(self, "ip_family") == "ipv6":
+            metadata_options["httpProtocolIPv6"] = "enabled"
+
+        ec2_node_class = {
+            "apiVersion": "karpenter.k8s.aws/v1",
+            "kind": "EC2NodeClass",
+            "metadata": {"name": "default"},
+            "spec": {
+                "role": NODE_ROLE_NAME,
+                # Newest pipeline AMI with -c node_image=image_builder (see image_cache.py)
+                **({"amiFamily": "AL2023", "amiSelectorTerms": [{"tags": image_cache.AMI_TAGS}]}
+                   if image_cache.custom_ami(self) else {"amiSelectorTerms": [{"alias": "al2023@latest"}]}),
+                "subnetSelectorTerms": [
+                    {"tags": {"karpenter.sh/discovery": settings.get(self, "karpenter_discovery")}}
+                ],
+                "securityGroupSelectorTerms": [{"id": primary_sg_id}],
+                "metadataOptions": metadata_options,
+                "blockDeviceMappings": [
+                    {
+                        "deviceName": root_volume["device_name"],
+                        "ebs": {
+                            "volumeSize": f"{root_volume['volume_size']}Gi",
+                            "volumeType": root_volume["volume_type"],
+                            "iops": root_volume["iops"],
+                            "throughput": root_volume["throughput"],
+                            "deleteOnTermination": True
+                        }
+                    }
+                ],
+                "tags": {**INSTANCE_TAGS, "Component": "prod-eks-karpenter"},
+                # Karpenter's own RAID0 setup of the instance store for containerd and the kubelet
+                **({"instanceStorePolicy": "RAID0"} if node_storage.nvme(self) else {}),
+                **({"kubelet": kubelet} if kubelet else {}),
+                **({"userData": user_data} if user_data else {})
+            }
+        }
+
+        node_pool_spec = {
+            "nodeClassRef": {"group": "karpenter.k8s.aws", "kind": "EC2NodeClass", "name": "default"},
+            "requirements": [
+                {"key": "node.kubernetes.io/instance-type", "operator": "In", "values": instance_types},
+                {"key": "karpenter.sh/capacity-type", "operator": "In", "values": ["on-demand"]}
+            ],
+            "expireAfter": "720h"
+        }
+        if service_dataplane == "cilium":
+            # Same taint the launch template registers the managed nodes with
+            taint, effect = dataplane.CILIUM_AGENT_NOT_READY_TAINT.split(":")
+            key, value = taint.split("=")
+            node_pool_spec["startupTaints"] = [{"key": key, "value": value, "effect": effect}]
+
+        node_pool = {
+            "apiVersion": "karpenter.sh/v1",
+            "kind": "NodePool",
+            "metadata": {"name": "default"},
+            "spec": {
+                "template": {"spec": node_pool_spec},
+                "limits": {"cpu": settings.number(self, "karpenter_cpu_limit")},
+                "disruption": {
+                    "consolidationPolicy": "WhenEmptyOrUnderutilized",
+                    "consolidateAfter": "1m"
+                }
+            }
+        }
+
+        helm_values = {
+            "settings": {"clusterName": cluster_name, "interruptionQueue": queue.queue_name},
+            "serviceAccount": {"name": KARPENTER_SERVICE_ACCOUNT},
+            "controller": {
+                "resources": {
+                    "requests": {"cpu": "1", "memory": "1Gi"},
+                    "limits": {"cpu": "1", "memory": "1Gi"}
+                }
+            }
+        }
+
+        # Store manifests and Helm values as outputs, like EksK8sResourcesStack;
+        # they contain cluster tokens, so they are resolved at deploy time
+        manifests = {
+            "KarpenterHelmValues": helm_values,
+            "EC2NodeClassManifest": ec2_node_class,
+            "NodePoolManifest": node_pool
+        }
+        for output_id, manifest in manifests.items():
+            CfnOutput(
+                self, output_id,
+                value=self.to_json_string(manifest),
+                description=f"Karpenter {manifest.get('kind', 'Helm values')}"
+            )
+
+        def output_value(output_id):
+            return (
+                f"aws cloudformation describe-stacks --stack-name {self.stack_name} "
+                f"--query \"Stacks[0].Outputs[?OutputKey=='{output_id}'].OutputValue\" --output text"
+            )
+
+        CfnOutput(
+            self, "KarpenterInstallCommand",
+            value=" && ".join([
+                f"{output_value('KarpenterHelmValues')} | helm upgrade --install karpenter {KARPENTER_CHART} "
+                f"--version {KARPENTER_VERSION} --namespace {KARPENTER_NAMESPACE} -f - --wait",
+                f"{output_value('EC2NodeClassManifest')} | kubectl apply -f -",
+                f"{output_value('NodePoolManifest')} | kubectl apply -f -"
+            ]),
+            description="Commands to install Karpenter and its NodePool"
+        )
+
+        CfnOutput(self, "KarpenterControllerRoleArn", value=controller_role.role_arn)
+        CfnOutput(self, "KarpenterInterruptionQueueName", value=queue.queue_name)
+
+        self.controller_role = controller_role
+        self.interruption_queue = queue
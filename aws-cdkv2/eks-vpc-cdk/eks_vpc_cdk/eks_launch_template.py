@@ -1,36 +1,85 @@
 from aws_cdk import (
     Stack,
+    Fn,
     aws_ec2 as ec2,
     CfnOutput
 )
 from constructs import Construct
-from eks_vpc_cdk.eks_create_cluster import EksClusterStack
+from eks_vpc_cdk.eks_create_cluster import SERVICE_IPV4_CIDR, EksClusterStack
+from eks_vpc_cdk import dataplane, image_cache, node_capacity, node_config, node_storage, settings, soci, ssm_wiring
 import base64
 
-class EksLaunchTemplateStack(Stack):
-    def __init__(self, scope: Construct, id: str, eks_cluster_stack: EksClusterStack, **kwargs) -> None:
-        super().__init__(scope, id, **kwargs)
+# Node settings shared with the nodes other stacks launch (EksKarpenterStack,
+# the scheduler warm pool group)
+INSTANCE_TYPE = "t3a.xlarge"
+# Graviton counterpart for arm64 node groups (prod-arm64-lt)
+ARM64_INSTANCE_TYPE = "t4g.xlarge"
+ROOT_VOLUME = {
+    "device_name": "/dev/xvda",
+    "volume_size": 70,
+    "volume_type": "gp3",
+    "iops": 3000,
+    "throughput": 125
+}
+KEY_PAIR_NAME = "prod-eks-sre"
+INSTANCE_TAGS = {
+    "Environment": "prod",
+    "System": "prod-eks",
+    "Component": "prod-eks-scheduler"
+}
 
-        # Get the primary security group ID from the EKS cluster
-        primary_sg_id = eks_cluster_stack.primary_security_group_id
-        
-        # Define the key pair name (change this to your actual key pair name)
-        key_pair_name = "prod-eks-sre"
-        
-        # User data script for EKS worker nodes
-        # This is the standard EKS-optimized AMI bootstrap script
-        user_data_script = f"""#!/bin/bash
+def node_user_data(scope: Construct, instance_types: list, cluster: dict = None, extra_setup: str = "") -> str:
+    """MIME user data for nodes of any of instance_types: a NodeConfig part when a
+    setting needs one (node_config.py), then the shell part that names the instance.
+
+    Managed node groups on the EKS AMI add the cluster details themselves;
+    self-managed nodes and custom AMIs pass them as cluster (name,
+    apiServerEndpoint, certificateAuthority, cidr).
+    extra_setup is shell run before the instance is named.
+    """
+    # nodeadm NodeConfig part, only when a setting needs one; EKS's defaults
+    # apply otherwise (see node_config.py)
+    node_config_part = ""
+    node_config_yaml = node_config.render(
+        cluster,
+        node_config.kubelet_config(scope, instance_types),
+        node_config.kubelet_flags(scope),
+        node_config.containerd_config(scope),
+        node_storage.local_storage(scope)
+    )
+    if node_config_yaml:
+        node_config_part = f"""--==BOUNDARY==
+Content-Type: application/node.eks.aws
+
+{node_config_yaml}
+"""
+
+    # Kernel modules for kube-proxy in IPVS mode
+    shell_setup = ""
+    if settings.get(scope, "dataplane") == "ipvs":
+        shell_setup = dataplane.ipvs_module_setup() + "\n"
+    # Volume with pre-pulled images (-c containerd_snapshot_id), see image_cache.py
+    shell_setup += image_cache.snapshot_setup(scope)
+    # Lazy image loading (-c soci=true), see soci.py
+    shell_setup += soci.node_setup(scope)
+    shell_setup += extra_setup
+
+    # User data script for EKS worker nodes, as a MIME multi-part document:
+    # nodeadm only finds the NodeConfig part behind a MIME header, and
+    # cloud-init runs a document starting with #! as one shell script
+    return f"""MIME-Version: 1.0
 Content-Type: multipart/mixed; boundary="==BOUNDARY=="
 
---==BOUNDARY==
+{node_config_part}--==BOUNDARY==
 Content-Type: text/x-shellscript; charset="us-ascii"
 
+#!/bin/bash
 # Copyright (C) 2025 Hemanth Pagidimarri <pagidh@amazon.com>
 # This file is free software; as a special exception the author gives
 # unlimited permission to copy and/or distribute it, with or without
 # modifications, as long as this notice is preserved.
 
-INSTANCE_ID=`curl -sL http://169.254.169.254/latest/meta-data/instance-id`
+{shell_setup}INSTANCE_ID=`curl -sL http://169.254.169.254/latest/meta-data/instance-id`
 REGION=`curl -sL http://169.254.169.254/latest/meta-data/placement/region`
 PREFIX="prod-eks-scheduler"
 TIMESTAMP=$(($(date +"%s%N")/1000000))
@@ -40,20 +89,90 @@ aws ec2 create-tags --region $REGION --resources $INSTANCE_ID --tags "Key"="Name
 
 --==BOUNDARY==--
 """
+
+
+class EksLaunchTemplateStack(Stack):
+    def __init__(self, scope: Construct, id: str, eks_cluster_stack: EksClusterStack, **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        # Get the primary security group ID from the EKS cluster
+        primary_sg_id = eks_cluster_stack.primary_security_group_id_for(self)
+        
+        # Define the key pair name (change this to your actual key pair name)
+        key_pair_name = KEY_PAIR_NAME
         
-        # Encode user data to base64 (as expected by launch template)
-        user_data_encoded = base64.b64encode(user_data_script.encode()).decode()
+        # Instance type of the node groups using this template
+        instance_type = INSTANCE_TYPE
 
-        # Create the launch template
-        launch_template = ec2.CfnLaunchTemplate(
-            self, "ProdSchedulerLaunchTemplate",
-            launch_template_name="prod-scheduler-v2-lt",
-            launch_template_data=ec2.CfnLaunchTemplate.LaunchTemplateDataProperty(
+        # Dual-stack nodes in an IPv6 cluster (-c ip_family=ipv6): an IPv6 address
+        # on the primary ENI and the IMDS IPv6 endpoint
+        ipv6 = settings.get(self, "ip_family") == "ipv6"
+
+        # Nodes on the pipeline AMI (-c node_image=image_builder) are CUSTOM to
+        # EKS and bootstrap themselves, so their NodeConfig carries the cluster
+        # details; see image_cache.py
+        custom_ami = image_cache.custom_ami(self)
+        cluster = None
+        if custom_ami:
+            cluster = {
+                "name": eks_cluster_stack.cluster_name_for(self),
+                "apiServerEndpoint": eks_cluster_stack.endpoint_for(self),
+                "certificateAuthority": eks_cluster_stack.certificate_authority_for(self),
+                "cidr": SERVICE_IPV4_CIDR
+            }
+
+        # EBS snapshot with pre-pulled images for /var/lib/containerd (-c containerd_snapshot_id)
+        snapshot_id = image_cache.snapshot_id(self)
+
+        # Everything but the instance type, user data and root volume performance
+        # is the same in all templates
+        def launch_template_data(instance_type, instance_types, user_data_script):
+            # gp3 IOPS and throughput for instance_types (-c storage_profile=nvme, see node_storage.py)
+            root_volume = node_storage.root_volume(self, instance_types, ROOT_VOLUME)
+
+            # Encode user data to base64 (as expected by launch template); the
+            # cluster details are tokens, so CloudFormation encodes those
+            if cluster:
+                user_data_encoded = Fn.base64(user_data_script)
+            else:
+                user_data_encoded = base64.b64encode(user_data_script.encode()).decode()
+
+            # Root volume, plus the containerd volume from the snapshot
+            block_device_mappings = [
+                ec2.CfnLaunchTemplate.BlockDeviceMappingProperty(
+                    device_name=root_volume["device_name"],
+                    ebs=ec2.CfnLaunchTemplate.EbsProperty(
+                        delete_on_termination=True,
+                        iops=root_volume["iops"],
+                        volume_size=root_volume["volume_size"],
+                        volume_type=root_volume["volume_type"],
+                        throughput=root_volume["throughput"]
+                    )
+                )
+            ]
+            if snapshot_id:
+                block_device_mappings.append(
+                    ec2.CfnLaunchTemplate.BlockDeviceMappingProperty(
+                        device_name=image_cache.SNAPSHOT_DEVICE,
+                        ebs=ec2.CfnLaunchTemplate.EbsProperty(
+                            delete_on_termination=True,
+                            snapshot_id=snapshot_id,
+                            iops=root_volume["iops"],
+                            volume_type=root_volume["volume_type"],
+                            throughput=root_volume["throughput"]
+                        )
+                    )
+                )
+
+            return ec2.CfnLaunchTemplate.LaunchTemplateDataProperty(
                 # Key pair for SSH access
                 key_name=key_pair_name,
+
+                # Pipeline AMI, resolved when the stack deploys (EKS picks the AMI otherwise)
+                image_id=f"{{{{resolve:ssm:{image_cache.AMI_PARAMETER}}}}}" if custom_ami else None,
                 
                 # Instance type
-                instance_type="t3a.xlarge",
+                instance_type=instance_type,
                 
                 # User data script (base64 encoded)
                 user_data=user_data_encoded,
@@ -61,6 +180,7 @@ aws ec2 create-tags --region $REGION --resources $INSTANCE_ID --tags "Key"="Name
                 # Metadata options
                 metadata_options=ec2.CfnLaunchTemplate.MetadataOptionsProperty(
                     http_endpoint="enabled",
+                    http_protocol_ipv6="enabled" if ipv6 else None,
                     instance_metadata_tags="enabled"
                 ),
                 
@@ -68,11 +188,7 @@ aws ec2 create-tags --region $REGION --resources $INSTANCE_ID --tags "Key"="Name
                 tag_specifications=[
                     ec2.CfnLaunchTemplate.TagSpecificationProperty(
                         resource_type="instance",
-                        tags=[
-                            {"key": "Environment", "value": "prod"},
-                            {"key": "System", "value": "prod-eks"},
-                            {"key": "Component", "value": "prod-eks-scheduler"}
-                        ]
+                        tags=[{"key": key, "value": value} for key, value in INSTANCE_TAGS.items()]
                     )
                 ],
                 
@@ -80,28 +196,61 @@ aws ec2 create-tags --region $REGION --resources $INSTANCE_ID --tags "Key"="Name
                 network_interfaces=[
                     ec2.CfnLaunchTemplate.NetworkInterfaceProperty(
                         device_index=0,
-                        groups=[primary_sg_id]  # Use the primary security group from EKS cluster
+                        groups=[primary_sg_id],  # Use the primary security group from EKS cluster
+                        ipv6_address_count=1 if ipv6 else None
                     )
                 ],
                 
                 # Block device mappings (EBS volume configuration)
-                block_device_mappings=[
-                    ec2.CfnLaunchTemplate.BlockDeviceMappingProperty(
-                        device_name="/dev/xvda",
-                        ebs=ec2.CfnLaunchTemplate.EbsProperty(
-                            delete_on_termination=True,
-                            iops=3000,
-                            volume_size=70,
-                            volume_type="gp3",
-                            throughput=125
-                        )
-                    )
-                ]
+                block_device_mappings=block_device_mappings
+            )
+
+        # Create the launch template
+        launch_template = ec2.CfnLaunchTemplate(
+            self, "ProdSchedulerLaunchTemplate",
+            launch_template_name="prod-scheduler-v2-lt",
+            launch_template_data=launch_template_data(
+                instance_type, [instance_type], node_user_data(self, [instance_type], cluster)
             )
         )
 
+        # Same template on Graviton, for arm64 node groups (-c hello_architecture=arm64)
+        arm64_launch_template = None
+        if node_capacity.arm64_template_needed(self):
+            if custom_ami:
+                raise ValueError("node_image=image_builder builds x86_64 AMIs only; arm64 node groups need the EKS AMI")
+            arm64_launch_template = ec2.CfnLaunchTemplate(
+                self, "ProdArm64LaunchTemplate",
+                launch_template_name="prod-arm64-lt",
+                launch_template_data=launch_template_data(
+                    ARM64_INSTANCE_TYPE, [ARM64_INSTANCE_TYPE], node_user_data(self, [ARM64_INSTANCE_TYPE])
+                )
+            )
+
+        # Same template without an instance type, for node groups that list
+        # their own (-c hello_instance_types=..., see node_capacity.py)
+        flex_instance_types = node_capacity.flex_instance_types(self)
+        flex_launch_template = None
+        if flex_instance_types:
+            flex_launch_template = ec2.CfnLaunchTemplate(
+                self, "ProdFlexLaunchTemplate",
+                launch_template_name="prod-flex-lt",
+                launch_template_data=launch_template_data(
+                    None, flex_instance_types, node_user_data(self, flex_instance_types, cluster)
+                )
+            )
+
         # Store the launch template for potential use by other stacks
         self.launch_template = launch_template
+        self.arm64_launch_template = arm64_launch_template
+        self.flex_launch_template = flex_launch_template
+
+        # Publish the launch template ID when SSM wiring is enabled (-c wiring=ssm)
+        ssm_wiring.publish(self, ssm_wiring.LAUNCH_TEMPLATE_ID, launch_template.ref)
+        if arm64_launch_template:
+            ssm_wiring.publish(self, ssm_wiring.ARM64_LAUNCH_TEMPLATE_ID, arm64_launch_template.ref)
+        if flex_launch_template:
+            ssm_wiring.publish(self, ssm_wiring.FLEX_LAUNCH_TEMPLATE_ID, flex_launch_template.ref)
 
         # Outputs
         CfnOutput(
@@ -121,3 +270,36 @@ aws ec2 create-tags --region $REGION --resources $INSTANCE_ID --tags "Key"="Name
             value=primary_sg_id,
             description="Primary security group ID from EKS cluster used in launch template"
         )
+
+        if arm64_launch_template:
+            CfnOutput(
+                self, "Arm64LaunchTemplateId",
+                value=arm64_launch_template.ref,
+                description="Launch Template ID for arm64 node groups"
+            )
+
+        if flex_launch_template:
+            CfnOutput(
+                self, "FlexLaunchTemplateId",
+                value=flex_launch_template.ref,
+                description="Launch Template ID for node groups with their own instance types"
+            )
+
+    # Accessor for node group stacks: the token itself (export) or an SSM lookup
+    def launch_template_id_for(self, consumer: Construct) -> str:
+        return ssm_wiring.resolve(consumer, ssm_wiring.LAUNCH_TEMPLATE_ID, self.launch_template.ref)
+
+    def arm64_launch_template_id_for(self, consumer: Construct) -> str:
+        return ssm_wiring.resolve(consumer, ssm_wiring.ARM64_LAUNCH_TEMPLATE_ID, self.arm64_launch_template.ref)
+
+    def flex_launch_template_id_for(self, consumer: Construct) -> str:
+        return ssm_wiring.resolve(consumer, ssm_wiring.FLEX_LAUNCH_TEMPLATE_ID, self.flex_launch_template.ref)
+
+    # The template a node group launches from: its own instance types need the
+    # one without an instance type, arm64 the Graviton one (see node_capacity.py)
+    def node_group_launch_template_id_for(self, consumer: Construct, node_group: str) -> str:
+        if node_capacity.instance_types(consumer, node_group):
+            return self.flex_launch_template_id_for(consumer)
+        if node_capacity.architecture(consumer, node_group) == "arm64":
+            return self.arm64_launch_template_id_for(consumer)
+        return self.launch_template_id_for(consumer)
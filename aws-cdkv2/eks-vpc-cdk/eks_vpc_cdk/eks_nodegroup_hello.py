@@ -9,6 +9,7 @@ from constructs import Construct
 from eks_vpc_cdk.eks_vpc_cdk_stack import EksVpcCdkStack
 from eks_vpc_cdk.eks_create_cluster import EksClusterStack
 from eks_vpc_cdk.eks_launch_template import EksLaunchTemplateStack
+from eks_vpc_cdk import cluster_autoscaler, node_capacity, settings
 
 class EksNodeGroupHelloStack(Stack):
     def __init__(self, scope: Construct, id: str, 
@@ -18,22 +19,25 @@ class EksNodeGroupHelloStack(Stack):
                  **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
-        # Get the EKS cluster reference
-        cluster = eks_cluster_stack.cluster
+        # Get the EKS cluster name
+        cluster_name = eks_cluster_stack.cluster_name_for(self)
         
-        # Get the launch template ID (reusing the same launch template)
-        launch_template_id = launch_template_stack.launch_template.ref
+        # Get the launch template ID (reusing the same launch template, the one
+        # without an instance type when the group lists its own, or the
+        # Graviton one for arm64)
+        instance_types = node_capacity.instance_types(self, "hello")
+        launch_template_id = launch_template_stack.node_group_launch_template_id_for(self, "hello")
+        nodegroup_name = node_capacity.node_group_name(self, "hello")
         
         # Get the private subnet IDs
-        private_subnet_ids = [subnet.ref for subnet in vpc_stack.private_subnets]
+        private_subnet_ids = vpc_stack.private_subnet_ids_for(self)
         
         # Import VPC for security group creation
-        vpc_cfn = vpc_stack.vpc
         vpc = ec2.Vpc.from_vpc_attributes(
             self, "ImportedVpc",
-            vpc_id=vpc_cfn.ref,
-            availability_zones=["us-east-1a", "us-east-1b", "us-east-1c"],
-            vpc_cidr_block="192.168.0.0/16"
+            vpc_id=vpc_stack.vpc_id_for(self),
+            availability_zones=vpc_stack.cidr_plan["availability_zones"],
+            vpc_cidr_block=vpc_stack.cidr_plan["vpc_cidr"]
         )
         
         # Create a dedicated security group for prod-hello node group
@@ -47,16 +51,30 @@ class EksNodeGroupHelloStack(Stack):
         
         # Add ingress rules for the security group
         hello_sg.add_ingress_rule(
-            peer=ec2.Peer.ipv4("192.168.0.0/16"),
+            peer=ec2.Peer.ipv4(vpc_stack.cidr_plan["vpc_cidr"]),
             connection=ec2.Port.tcp(80),
             description="Allow HTTP from VPC"
         )
         
         hello_sg.add_ingress_rule(
-            peer=ec2.Peer.ipv4("192.168.0.0/16"),
+            peer=ec2.Peer.ipv4(vpc_stack.cidr_plan["vpc_cidr"]),
             connection=ec2.Port.all_traffic(),
             description="Allow all traffic from VPC"
         )
+
+        # Same rules over IPv6 in an IPv6 cluster (-c ip_family=ipv6)
+        if settings.get(self, "ip_family") == "ipv6":
+            vpc_ipv6_cidr = vpc_stack.ipv6_cidr_for(self)
+            hello_sg.add_ingress_rule(
+                peer=ec2.Peer.ipv6(vpc_ipv6_cidr),
+                connection=ec2.Port.tcp(80),
+                description="Allow HTTP from VPC over IPv6"
+            )
+            hello_sg.add_ingress_rule(
+                peer=ec2.Peer.ipv6(vpc_ipv6_cidr),
+                connection=ec2.Port.all_traffic(),
+                description="Allow all traffic from VPC over IPv6"
+            )
         
         # Get the EKS NodeGroup Role ARN
         eks_nodegroup_role_name = "prod-sre-workernode-role"
@@ -72,9 +90,9 @@ class EksNodeGroupHelloStack(Stack):
         # Create the EKS Node Group for prod-hello
         node_group = eks.CfnNodegroup(
             self, "ProdHelloNodeGroup",
-            cluster_name=cluster.name,
+            cluster_name=cluster_name,
             node_role=eks_nodegroup_role.role_arn,
-            nodegroup_name="prod-hello-ng",
+            nodegroup_name=nodegroup_name,
             
             # Subnets - use only private subnets
             subnets=private_subnet_ids,
@@ -85,26 +103,28 @@ class EksNodeGroupHelloStack(Stack):
                 "version": "$Latest"
             },
             
-            # Scaling configuration - 1 node as requested
-            scaling_config={
-                "desiredSize": 1,
-                "minSize": 1,
-                "maxSize": 1
-            },
+            # Scaling configuration - 1 node by default
+            # (-c hello_min_size/hello_desired_size/hello_max_size)
+            scaling_config=cluster_autoscaler.scaling_config(self, "hello"),
             
-            # Capacity type
-            capacity_type="ON_DEMAND",
+            # Instance types and capacity type; the stateless hello tier can run
+            # on Spot (-c hello_instance_types=... -c hello_capacity_type=SPOT)
+            instance_types=instance_types,
+            capacity_type=node_capacity.capacity_type(self, "hello"),
             
-            # AMI type
-            ami_type="AL2023_x86_64_STANDARD",
+            # AMI type; AL2023 ARM with -c hello_architecture=arm64
+            ami_type=node_capacity.ami_type(self, "hello"),
+
+            # arm64 nodes only take pods that tolerate them
+            taints=node_capacity.taints(self, "hello"),
             
             # Tags for the node group
-            tags={
+            tags=cluster_autoscaler.node_group_tags(self, {
                 "Environment": "prod",
                 "System": "prod-eks",
                 "Component": "prod-eks-hello",
-                "NodeGroup": "prod-hello-ng"
-            }
+                "NodeGroup": nodegroup_name
+            })
         )
 
         # Store references
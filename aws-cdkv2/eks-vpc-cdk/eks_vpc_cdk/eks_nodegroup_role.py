@@ -1,88 +1,138 @@
 from aws_cdk import (
     Stack,
+    RemovalPolicy,
     aws_iam as iam,
     CfnOutput
 )
 from constructs import Construct
+from eks_vpc_cdk import settings
 
 class EksNodeGroupRoleStack(Stack):
     def __init__(self, scope: Construct, id: str, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
-        # Create the EKS Cluster Role
-        self.role = iam.Role(
-            self, "EksNodeGroupRole",
-            role_name="prod-sre-workernode-role",
-            assumed_by=iam.ServicePrincipal("ec2.amazonaws.com")
-        )
+        self.role = add_nodegroup_role(self)
 
-        # Add managed policies
-        self.role.add_managed_policy(
-            iam.ManagedPolicy.from_aws_managed_policy_name("AmazonEC2ContainerRegistryReadOnly")
-        )
-        self.role.add_managed_policy(
-            iam.ManagedPolicy.from_aws_managed_policy_name("AmazonEKS_CNI_Policy")
-        )
-        self.role.add_managed_policy(
-            iam.ManagedPolicy.from_aws_managed_policy_name("AmazonEKSWorkerNodePolicy")          
-        )
-        self.role.add_managed_policy(
-            iam.ManagedPolicy.from_aws_managed_policy_name("AmazonSSMManagedInstanceCore")
-        )
-        self.role.add_managed_policy(
-            iam.ManagedPolicy.from_aws_managed_policy_name("AmazonSSMPatchAssociation")
-        )
-        # First inline policy for WAF
-        iam.Policy(
-            self, "AllowWAFpolicy",
-            policy_name="AllowWAF",
-            roles=[self.role],
+
+# Creates the resources directly in `scope`, so the logical IDs are the same whether
+# scope is EksNodeGroupRoleStack, EksIdentityStack or one of its nested stacks
+def add_nodegroup_role(scope: Construct) -> iam.Role:
+    # Create the EKS Cluster Role
+    role = iam.Role(
+        scope, "EksNodeGroupRole",
+        role_name="prod-sre-workernode-role",
+        assumed_by=iam.ServicePrincipal("ec2.amazonaws.com")
+    )
+
+    # Add managed policies
+    role.add_managed_policy(
+        iam.ManagedPolicy.from_aws_managed_policy_name("AmazonEC2ContainerRegistryReadOnly")
+    )
+    role.add_managed_policy(
+        iam.ManagedPolicy.from_aws_managed_policy_name("AmazonEKS_CNI_Policy")
+    )
+    role.add_managed_policy(
+        iam.ManagedPolicy.from_aws_managed_policy_name("AmazonEKSWorkerNodePolicy")
+    )
+    role.add_managed_policy(
+        iam.ManagedPolicy.from_aws_managed_policy_name("AmazonSSMManagedInstanceCore")
+    )
+    role.add_managed_policy(
+        iam.ManagedPolicy.from_aws_managed_policy_name("AmazonSSMPatchAssociation")
+    )
+    # First inline policy for WAF
+    waf_policy = iam.Policy(
+        scope, "AllowWAFpolicy",
+        policy_name="AllowWAF",
+        roles=[role],
+        statements=[
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "wafv2:AssociateWebACL",
+                    "wafv2:DisassociateWebACL",
+                    "wafv2:GetWebACL"
+                ],
+                resources=["*"]
+            )
+        ]
+    )
+
+    # Second inline policy for EC2 Tags
+    tags_policy = iam.Policy(
+        scope, "EC2TagsPolicy",
+        policy_name="EC2Tags",
+        roles=[role],
+        statements=[
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "ec2:DescribeInstances",
+                    "ec2:CreateTags",
+                    "ec2:DescribeTags"
+                ],
+                resources=["*"]
+            )
+        ]
+    )
+
+    # Third inline policy for GetCW metrics. The cluster role has an identical
+    # one; when both roles live in the same stack (identity_mode=merged) the
+    # existing policy is attached to this role too instead of duplicating it.
+    metrics_policy = scope.node.try_find_child("GetCloudwatchMetricsPolicy")
+    if metrics_policy is not None:
+        metrics_policy.attach_to_role(role)
+    else:
+        metrics_policy = iam.Policy(
+            scope, "GetCloudwatchMetricsPolicy",
+            policy_name="GetCloudwatchMetrics-for-EKS",
+            roles=[role],
             statements=[
                 iam.PolicyStatement(
                     effect=iam.Effect.ALLOW,
                     actions=[
-                        "wafv2:AssociateWebACL",
-                        "wafv2:DisassociateWebACL",
-                        "wafv2:GetWebACL"
+                        "cloudwatch:GetMetricData",
+                        "cloudwatch:ListMetrics"
                     ],
                     resources=["*"]
                 )
             ]
         )
 
-        # Second inline policy for EC2 Tags
-        iam.Policy(
-            self, "EC2TagsPolicy",
-            policy_name="EC2Tags",
-            roles=[self.role],
+    policies = [waf_policy, tags_policy, metrics_policy]
+
+    # AmazonEKS_CNI_Policy only covers IPv4; aws-node in an IPv6 cluster
+    # (-c ip_family=ipv6) also assigns IPv6 addresses to the node's ENIs
+    if settings.get(scope, "ip_family") == "ipv6":
+        policies.append(iam.Policy(
+            scope, "CniIpv6Policy",
+            policy_name="AmazonEKS_CNI_IPv6_Policy",
+            roles=[role],
             statements=[
                 iam.PolicyStatement(
                     effect=iam.Effect.ALLOW,
                     actions=[
+                        "ec2:AssignIpv6Addresses",
                         "ec2:DescribeInstances",
-                        "ec2:CreateTags",
-                        "ec2:DescribeTags"
+                        "ec2:DescribeTags",
+                        "ec2:DescribeNetworkInterfaces",
+                        "ec2:DescribeInstanceTypes"
                     ],
                     resources=["*"]
-                )
-            ]
-        )
-
-	# Third inline policy for GetCW metrics
-        iam.Policy(
-            self, "GetCloudwatchMetricsPolicy",
-            policy_name="GetCloudwatchMetrics-for-EKS",
-            roles=[self.role],
-            statements=[
+                ),
                 iam.PolicyStatement(
                     effect=iam.Effect.ALLOW,
-                    actions=[
-                        "cloudwatch:GetMetricData",
-                        "cloudwatch:ListMetrics"
-                    ],
-                    resources=["*"]
+                    actions=["ec2:CreateTags"],
+                    resources=["arn:aws:ec2:*:*:network-interface/*"]
                 )
             ]
-        )
-        # Single output for the role ARN
-        CfnOutput(self, "EksNodeGroupRoleArn", value=self.role.role_arn)
+        ))
+
+    # Keep the role and its policies when the stack is deleted (-c identity_retain=true)
+    if settings.flag(scope, "identity_retain"):
+        for resource in [role] + policies:
+            resource.apply_removal_policy(RemovalPolicy.RETAIN)
+
+    # Single output for the role ARN
+    CfnOutput(scope, "EksNodeGroupRoleArn", value=role.role_arn)
+    return role
@@ -1,13 +1,19 @@
 from aws_cdk import (
     Stack,
+    Fn,
+    aws_autoscaling as autoscaling,
+    aws_ec2 as ec2,
     aws_eks as eks,
     aws_iam as iam,
     CfnOutput
 )
 from constructs import Construct
 from eks_vpc_cdk.eks_vpc_cdk_stack import EksVpcCdkStack
-from eks_vpc_cdk.eks_create_cluster import EksClusterStack
-from eks_vpc_cdk.eks_launch_template import EksLaunchTemplateStack
+from eks_vpc_cdk.eks_create_cluster import CLUSTER_NAME, SERVICE_IPV4_CIDR, EksClusterStack
+from eks_vpc_cdk.eks_launch_template import (
+    INSTANCE_TAGS, INSTANCE_TYPE, KEY_PAIR_NAME, ROOT_VOLUME, EksLaunchTemplateStack, node_user_data
+)
+from eks_vpc_cdk import cluster_autoscaler, image_cache, node_capacity, node_storage, settings, warm_pool
 
 class EksNodeGroupSchedulerStack(Stack):
     def __init__(self, scope: Construct, id: str, 
@@ -17,14 +23,23 @@ class EksNodeGroupSchedulerStack(Stack):
                  **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
-        # Get the EKS cluster reference
-        cluster = eks_cluster_stack.cluster
-        
-        # Get the launch template ID
-        launch_template_id = launch_template_stack.launch_template.ref
+        # Get the EKS cluster name
+        cluster_name = eks_cluster_stack.cluster_name_for(self)
         
         # Get the private subnet IDs
-        private_subnet_ids = [subnet.ref for subnet in vpc_stack.private_subnets]
+        private_subnet_ids = vpc_stack.private_subnet_ids_for(self)
+
+        # Self-managed group with a warm pool instead of the managed node group
+        # (-c scheduler_warm_pool_size=N), see warm_pool.py
+        if settings.number(self, "scheduler_warm_pool_size") > 0:
+            self._add_warm_pool_group(eks_cluster_stack, cluster_name, private_subnet_ids)
+            return
+
+        # Get the launch template ID; node groups with their own instance types
+        # use the template without one, arm64 node groups the Graviton one
+        instance_types = node_capacity.instance_types(self, "scheduler")
+        launch_template_id = launch_template_stack.node_group_launch_template_id_for(self, "scheduler")
+        nodegroup_name = node_capacity.node_group_name(self, "scheduler")
         
         # Get the EKS NodeGroup Role ARN
         # The role was created in EksNodeGroupRoleStack with name "prod-sre-workernode-role"
@@ -41,9 +56,9 @@ class EksNodeGroupSchedulerStack(Stack):
         # Create the EKS Node Group
         node_group = eks.CfnNodegroup(
             self, "ProdSchedulerNodeGroup",
-            cluster_name=cluster.name,  # Reference to the EKS cluster
+            cluster_name=cluster_name,  # Reference to the EKS cluster
             node_role=eks_nodegroup_role.role_arn,  # IAM role for the node group
-            nodegroup_name="prod-scheduler-v2",
+            nodegroup_name=nodegroup_name,
             
             # Subnets - use only private subnets
             subnets=private_subnet_ids,
@@ -54,28 +69,30 @@ class EksNodeGroupSchedulerStack(Stack):
                 "version": "$Latest"  # Use the latest version of the launch template
             },
             
-            # Scaling configuration
-            scaling_config={
-                "desiredSize": 2,  # Desired number of nodes
-                "minSize": 1,      # Minimum number of nodes
-                "maxSize": 2       # Maximum number of nodes
-            },
+            # Scaling configuration (-c scheduler_min_size/scheduler_desired_size/scheduler_max_size)
+            scaling_config=cluster_autoscaler.scaling_config(self, "scheduler"),
             
-            # Capacity type
-            capacity_type="ON_DEMAND",
+            # Instance types and capacity type (-c scheduler_instance_types/scheduler_capacity_type)
+            instance_types=instance_types,
+            capacity_type=node_capacity.capacity_type(self, "scheduler"),
             
-            # AMI type (let EKS handle this since we're using launch template)
-            ami_type="AL2023_x86_64_STANDARD",
+            # AMI type (let EKS handle this since we're using launch template);
+            # AL2023 ARM with -c scheduler_architecture=arm64
+            ami_type=node_capacity.ami_type(self, "scheduler"),
+
+            # arm64 nodes only take pods that tolerate them
+            taints=node_capacity.taints(self, "scheduler"),
             
             # Note: remote_access is removed because SSH key is defined in launch template
             
             # Tags for the node group
-            tags={
+            # (plus the Cluster Autoscaler discovery tags with -c cluster_autoscaler=true)
+            tags=cluster_autoscaler.node_group_tags(self, {
                 "Environment": "prod",
                 "System": "prod-eks",
                 "Component": "prod-eks-scheduler",
-                "NodeGroup": "prod-scheduler-v2"
-            }
+                "NodeGroup": nodegroup_name
+            })
         )
 
         # Store the node group reference
@@ -111,3 +128,192 @@ class EksNodeGroupSchedulerStack(Stack):
             value=",".join(private_subnet_ids),
             description="Private subnet IDs used by this node group"
         )
+
+    def _add_warm_pool_group(self, eks_cluster_stack: EksClusterStack, cluster_name: str,
+                             private_subnet_ids: list) -> None:
+        if settings.get(self, "ip_family") == "ipv6":
+            raise ValueError("scheduler_warm_pool_size requires ip_family=ipv4")
+        if node_capacity.node_group_name(self, "scheduler") != node_capacity.NODE_GROUPS["scheduler"]:
+            raise ValueError(
+                "scheduler_warm_pool_size cannot be combined with scheduler_instance_types, "
+                "SPOT capacity or arm64"
+            )
+        group_name = "prod-scheduler-v2"
+        eks_nodegroup_role_name = "prod-sre-workernode-role"
+        pool_state = settings.get(self, "scheduler_warm_pool_state")
+        hibernated = pool_state == "Hibernated"
+
+        # Managed node groups get an instance profile from EKS; here it is ours
+        instance_profile = iam.CfnInstanceProfile(
+            self, "ProdSchedulerInstanceProfile",
+            instance_profile_name="prod-scheduler-v2-profile",
+            roles=[eks_nodegroup_role_name]
+        )
+
+        # The gate completes the launch lifecycle action from the node itself
+        iam.CfnPolicy(
+            self, "ProdSchedulerLifecyclePolicy",
+            policy_name="ProdSchedulerWarmPoolLifecycle",
+            roles=[eks_nodegroup_role_name],
+            policy_document={
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Effect": "Allow",
+                        "Action": "autoscaling:CompleteLifecycleAction",
+                        "Resource": (
+                            f"arn:{Stack.of(self).partition}:autoscaling:{Stack.of(self).region}:"
+                            f"{Stack.of(self).account}:autoScalingGroup:*:autoScalingGroupName/{group_name}"
+                        )
+                    }
+                ]
+            }
+        )
+
+        # Same instance settings as EksLaunchTemplateStack's template, plus what a
+        # self-managed node needs: the AMI, the instance profile and the cluster
+        # details in its NodeConfig. A managed node group's launch template may
+        # not set an instance profile, so the two cannot share one template.
+        user_data = node_user_data(
+            self, [INSTANCE_TYPE],
+            cluster={
+                "name": cluster_name,
+                "apiServerEndpoint": eks_cluster_stack.endpoint_for(self),
+                "certificateAuthority": eks_cluster_stack.certificate_authority_for(self),
+                "cidr": SERVICE_IPV4_CIDR
+            },
+            extra_setup=warm_pool.gate_setup(group_name)
+        )
+        root_volume = node_storage.root_volume(self, [INSTANCE_TYPE], ROOT_VOLUME)
+        # The pipeline AMI with -c node_image=image_builder (see image_cache.py)
+        ami_parameter = image_cache.AMI_PARAMETER if image_cache.custom_ami(self) else warm_pool.AMI_PARAMETER
+        snapshot_id = image_cache.snapshot_id(self)
+        launch_template = ec2.CfnLaunchTemplate(
+            self, "ProdSchedulerWarmPoolLaunchTemplate",
+            launch_template_name="prod-scheduler-v2-warm-lt",
+            launch_template_data=ec2.CfnLaunchTemplate.LaunchTemplateDataProperty(
+                image_id=f"{{{{resolve:ssm:{ami_parameter}}}}}",
+                iam_instance_profile=ec2.CfnLaunchTemplate.IamInstanceProfileProperty(
+                    arn=instance_profile.attr_arn
+                ),
+                key_name=KEY_PAIR_NAME,
+                instance_type=INSTANCE_TYPE,
+                user_data=Fn.base64(user_data),
+                metadata_options=ec2.CfnLaunchTemplate.MetadataOptionsProperty(
+                    http_endpoint="enabled",
+                    instance_metadata_tags="enabled"
+                ),
+                # Hibernation saves RAM to the (then encrypted) root volume
+                hibernation_options=ec2.CfnLaunchTemplate.HibernationOptionsProperty(
+                    configured=True
+                ) if hibernated else None,
+                tag_specifications=[
+                    ec2.CfnLaunchTemplate.TagSpecificationProperty(
+                        resource_type="instance",
+                        tags=[{"key": key, "value": value} for key, value in INSTANCE_TAGS.items()]
+                    )
+                ],
+                network_interfaces=[
+                    ec2.CfnLaunchTemplate.NetworkInterfaceProperty(
+                        device_index=0,
+                        groups=[eks_cluster_stack.primary_security_group_id_for(self)]
+                    )
+                ],
+                block_device_mappings=[
+                    ec2.CfnLaunchTemplate.BlockDeviceMappingProperty(
+                        device_name=root_volume["device_name"],
+                        ebs=ec2.CfnLaunchTemplate.EbsProperty(
+                            delete_on_termination=True,
+                            encrypted=True if hibernated else None,
+                            iops=root_volume["iops"],
+                            volume_size=root_volume["volume_size"],
+                            volume_type=root_volume["volume_type"],
+                            throughput=root_volume["throughput"]
+                        )
+                    )
+                ] + ([
+                    # Pre-pulled images for /var/lib/containerd (-c containerd_snapshot_id)
+                    ec2.CfnLaunchTemplate.BlockDeviceMappingProperty(
+                        device_name=image_cache.SNAPSHOT_DEVICE,
+                        ebs=ec2.CfnLaunchTemplate.EbsProperty(
+                            delete_on_termination=True,
+                            encrypted=True if hibernated else None,
+                            snapshot_id=snapshot_id,
+                            iops=root_volume["iops"],
+                            volume_type=root_volume["volume_type"],
+                            throughput=root_volume["throughput"]
+                        )
+                    )
+                ] if snapshot_id else [])
+            )
+        )
+
+        # Same bounds and tags as the managed node group it replaces
+        scaling = cluster_autoscaler.scaling_config(self, "scheduler")
+        group_tags = cluster_autoscaler.node_group_tags(self, {
+            "Environment": "prod",
+            "System": "prod-eks",
+            "Component": "prod-eks-scheduler",
+            "NodeGroup": group_name,
+            f"kubernetes.io/cluster/{CLUSTER_NAME}": "owned"
+        })
+        group = autoscaling.CfnAutoScalingGroup(
+            self, "ProdSchedulerAutoScalingGroup",
+            auto_scaling_group_name=group_name,
+            min_size=str(scaling["minSize"]),
+            max_size=str(scaling["maxSize"]),
+            desired_capacity=str(scaling["desiredSize"]),
+            vpc_zone_identifier=private_subnet_ids,
+            launch_template=autoscaling.CfnAutoScalingGroup.LaunchTemplateSpecificationProperty(
+                launch_template_id=launch_template.ref,
+                version=launch_template.attr_latest_version_number
+            ),
+            lifecycle_hook_specification_list=[
+                autoscaling.CfnAutoScalingGroup.LifecycleHookSpecificationProperty(
+                    lifecycle_hook_name=warm_pool.LAUNCH_HOOK,
+                    lifecycle_transition="autoscaling:EC2_INSTANCE_LAUNCHING",
+                    heartbeat_timeout=warm_pool.HOOK_TIMEOUT,
+                    default_result="ABANDON"
+                )
+            ],
+            tags=[
+                autoscaling.CfnAutoScalingGroup.TagPropertyProperty(
+                    key=key, value=value, propagate_at_launch=True
+                )
+                for key, value in group_tags.items()
+            ]
+        )
+
+        # Pre-initialized instances kept next to the group; instances removed on
+        # scale-in go back to the pool instead of being terminated
+        autoscaling.CfnWarmPool(
+            self, "ProdSchedulerWarmPool",
+            auto_scaling_group_name=group.ref,
+            min_size=settings.number(self, "scheduler_warm_pool_size"),
+            pool_state=pool_state,
+            instance_reuse_policy=autoscaling.CfnWarmPool.InstanceReusePolicyProperty(
+                reuse_on_scale_in=True
+            )
+        )
+
+        # Store the group reference
+        self.auto_scaling_group = group
+
+        # Outputs
+        CfnOutput(
+            self, "AutoScalingGroupName",
+            value=group.ref,
+            description="Self-managed scheduler Auto Scaling group with a warm pool"
+        )
+
+        CfnOutput(
+            self, "UsedLaunchTemplateId",
+            value=launch_template.ref,
+            description="Launch Template ID used by the warm pool group"
+        )
+
+        CfnOutput(
+            self, "UsedPrivateSubnets",
+            value=",".join(private_subnet_ids),
+            description="Private subnet IDs used by this node group"
+        )
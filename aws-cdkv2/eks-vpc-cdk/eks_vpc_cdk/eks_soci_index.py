@@ -0,0 +1,166 @@
+import json
+
+from aws_cdk import (
+    Stack,
+    aws_codebuild as codebuild,
+    aws_events as events,
+    aws_iam as iam,
+    aws_logs as logs,
+    CfnOutput
+)
+from constructs import Construct
+from eks_vpc_cdk import settings, soci
+
+PROJECT_NAME = "prod-eks-soci-index"
+
+class EksSociIndexStack(Stack):
+    # SOCI indexes for the images the nodes lazy-load (-c soci=true), see soci.py
+    def __init__(self, scope: Construct, id: str, **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        partition = Stack.of(self).partition
+        region = Stack.of(self).region
+        account = Stack.of(self).account
+
+        repositories = settings.string_list(self, "soci_repositories")
+        repository_arns = [
+            f"arn:{partition}:ecr:{region}:{account}:repository/{repository}" for repository in repositories
+        ]
+
+        log_group = logs.CfnLogGroup(
+            self, "SociIndexLogGroup",
+            log_group_name=f"/aws/codebuild/{PROJECT_NAME}",
+            retention_in_days=14
+        )
+
+        # Indexer role: pull the image, push the index to the same repository
+        build_role = iam.Role(
+            self, "SociIndexBuildRole",
+            role_name="prod-eks-soci-index",
+            assumed_by=iam.ServicePrincipal("codebuild.amazonaws.com")
+        )
+        iam.Policy(
+            self, "SociIndexBuildPolicy",
+            policy_name="SociIndexBuild",
+            roles=[build_role],
+            statements=[
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["ecr:GetAuthorizationToken"],
+                    resources=["*"]
+                ),
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "ecr:BatchCheckLayerAvailability",
+                        "ecr:BatchGetImage",
+                        "ecr:GetDownloadUrlForLayer",
+                        "ecr:CompleteLayerUpload",
+                        "ecr:InitiateLayerUpload",
+                        "ecr:PutImage",
+                        "ecr:UploadLayerPart"
+                    ],
+                    resources=repository_arns
+                ),
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["logs:CreateLogStream", "logs:PutLogEvents"],
+                    resources=[f"{log_group.attr_arn}:*"]
+                )
+            ]
+        )
+
+        # Privileged for containerd; the image to index comes in as
+        # IMAGE_REPOSITORY and IMAGE_TAG
+        project = codebuild.CfnProject(
+            self, "SociIndexProject",
+            name=PROJECT_NAME,
+            description="Create and push SOCI indexes for pushed images",
+            service_role=build_role.role_arn,
+            artifacts=codebuild.CfnProject.ArtifactsProperty(type="NO_ARTIFACTS"),
+            environment=codebuild.CfnProject.EnvironmentProperty(
+                type="LINUX_CONTAINER",
+                compute_type="BUILD_GENERAL1_MEDIUM",
+                image=soci.BUILD_IMAGE,
+                privileged_mode=True
+            ),
+            source=codebuild.CfnProject.SourceProperty(
+                type="NO_SOURCE",
+                build_spec=soci.buildspec(
+                    settings.number(self, "soci_min_layer_size"), soci.release_checksums(self)
+                )
+            ),
+            logs_config=codebuild.CfnProject.LogsConfigProperty(
+                cloud_watch_logs=codebuild.CfnProject.CloudWatchLogsConfigProperty(
+                    status="ENABLED",
+                    group_name=log_group.ref
+                )
+            ),
+            timeout_in_minutes=30
+        )
+
+        # One build per tagged push to the repositories
+        events_role = iam.Role(
+            self, "SociIndexEventsRole",
+            role_name="prod-eks-soci-index-events",
+            assumed_by=iam.ServicePrincipal("events.amazonaws.com")
+        )
+        iam.Policy(
+            self, "SociIndexEventsPolicy",
+            policy_name="SociIndexStartBuild",
+            roles=[events_role],
+            statements=[
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["codebuild:StartBuild"],
+                    resources=[project.attr_arn]
+                )
+            ]
+        )
+        events.CfnRule(
+            self, "SociIndexPushRule",
+            description="Index images pushed to the SOCI repositories",
+            event_pattern=soci.push_event_pattern(repositories),
+            targets=[
+                events.CfnRule.TargetProperty(
+                    id="SociIndexProject",
+                    arn=project.attr_arn,
+                    role_arn=events_role.role_arn,
+                    input_transformer=events.CfnRule.InputTransformerProperty(
+                        input_paths_map={
+                            "repository": "$.detail.repository-name",
+                            "tag": "$.detail.image-tag"
+                        },
+                        input_template=(
+                            '{"environmentVariablesOverride": ['
+                            '{"name": "IMAGE_REPOSITORY", "value": "<repository>"}, '
+                            '{"name": "IMAGE_TAG", "value": "<tag>"}]}'
+                        )
+                    )
+                )
+            ]
+        )
+
+        self.project = project
+
+        # Outputs
+        CfnOutput(
+            self, "SociIndexProjectName",
+            value=project.ref,
+            description="CodeBuild project that creates the SOCI indexes"
+        )
+
+        CfnOutput(
+            self, "SociIndexBuildCommand",
+            value=(
+                f"aws codebuild start-build --project-name {PROJECT_NAME} --environment-variables-override "
+                "name=IMAGE_REPOSITORY,value=<repository> name=IMAGE_TAG,value=<tag>"
+            ),
+            description="Command to index an image pushed before this stack existed"
+        )
+
+        CfnOutput(
+            self, "SociRepositories",
+            value=json.dumps(repositories),
+            description="Repositories whose pushes are indexed"
+        )
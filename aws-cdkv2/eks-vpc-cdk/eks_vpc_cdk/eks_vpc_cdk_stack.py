@@ -1,9 +1,24 @@
 from aws_cdk import (
     Stack,
+    Fn,
     aws_ec2 as ec2,
     CfnOutput
 )
 from constructs import Construct
+from eks_vpc_cdk import cidr_plan, settings, ssm_wiring
+
+# Interface endpoints created with -c vpc_endpoints=true: logical ID prefix -> service
+INTERFACE_ENDPOINTS = {
+    "EcrApi": "ecr.api",
+    "EcrDkr": "ecr.dkr",
+    "Sts": "sts",
+    "Ec2": "ec2",
+    "Ssm": "ssm",
+    "SsmMessages": "ssmmessages",
+    "Ec2Messages": "ec2messages",
+    "Logs": "logs",
+    "Monitoring": "monitoring"
+}
 
 
 class EksVpcCdkStack(Stack):
@@ -11,10 +26,13 @@ class EksVpcCdkStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        # Subnet CIDRs and AZs, from -c vpc_cidr/az_count/pods_per_node/...
+        plan = cidr_plan.from_context(self)
+
         # === VPC ===
         vpc = ec2.CfnVPC(
             self, "EksVpc",
-            cidr_block="192.168.0.0/16",
+            cidr_block=plan["vpc_cidr"],
             tags=[{"key": "Name", "value": "eks-vpc"}]
         )
 
@@ -29,61 +47,36 @@ class EksVpcCdkStack(Stack):
             internet_gateway_id=igw.ref
         )
 
-        # === Public Subnets ===
-        public_a = ec2.CfnSubnet(
-            self, "PublicSubnetA",
-            vpc_id=vpc.ref,
-            cidr_block="192.168.0.0/20",
-            availability_zone="us-east-1a",
-            map_public_ip_on_launch=True,
-            tags=[{"key": "Name", "value": "prod-eks-subnet-public-us-east-1a"}]
-        )
-
-        public_b = ec2.CfnSubnet(
-            self, "PublicSubnetB",
-            vpc_id=vpc.ref,
-            cidr_block="192.168.16.0/20",
-            availability_zone="us-east-1b",
-            map_public_ip_on_launch=True,
-            tags=[{"key": "Name", "value": "prod-eks-subnet-public-us-east-1b"}]
-        )
-
-        public_c = ec2.CfnSubnet(
-            self, "PublicSubnetC",
-            vpc_id=vpc.ref,
-            cidr_block="192.168.32.0/20",
-            availability_zone="us-east-1c",
-            map_public_ip_on_launch=True,
-            tags=[{"key": "Name", "value": "prod-eks-subnet-public-us-east-1c"}]
-        )
-
-        # === Private Subnets ===
-        private_a = ec2.CfnSubnet(
-            self, "PrivateSubnetA",
-            vpc_id=vpc.ref,
-            cidr_block="192.168.48.0/20",
-            availability_zone="us-east-1a",
-            map_public_ip_on_launch=False,
-            tags=[{"key": "Name", "value": "prod-eks-subnet-private-us-east-1a"}]
-        )
+        # === Public and Private Subnets (1 of each per AZ, see cidr_plan.py) ===
+        # Logical IDs and names carry the AZ letter: PublicSubnetA, PrivateSubnetA, ...
+        public_subnets = [
+            ec2.CfnSubnet(
+                self, f"PublicSubnet{az[-1].upper()}",
+                vpc_id=vpc.ref,
+                cidr_block=cidr_block,
+                availability_zone=az,
+                map_public_ip_on_launch=True,
+                tags=[{"key": "Name", "value": f"prod-eks-subnet-public-{az}"}]
+            )
+            for az, cidr_block in zip(plan["availability_zones"], plan["public_subnets"])
+        ]
 
-        private_b = ec2.CfnSubnet(
-            self, "PrivateSubnetB",
-            vpc_id=vpc.ref,
-            cidr_block="192.168.64.0/20",
-            availability_zone="us-east-1b",
-            map_public_ip_on_launch=False,
-            tags=[{"key": "Name", "value": "prod-eks-subnet-private-us-east-1b"}]
-        )
+        # Karpenter finds the subnets for its nodes by tag (-c karpenter=true)
+        discovery_tags = []
+        if settings.flag(self, "karpenter"):
+            discovery_tags = [{"key": "karpenter.sh/discovery", "value": settings.get(self, "karpenter_discovery")}]
 
-        private_c = ec2.CfnSubnet(
-            self, "PrivateSubnetC",
-            vpc_id=vpc.ref,
-            cidr_block="192.168.80.0/20",
-            availability_zone="us-east-1c",
-            map_public_ip_on_launch=False,
-            tags=[{"key": "Name", "value": "prod-eks-subnet-private-us-east-1c"}]
-        )
+        private_subnets = [
+            ec2.CfnSubnet(
+                self, f"PrivateSubnet{az[-1].upper()}",
+                vpc_id=vpc.ref,
+                cidr_block=cidr_block,
+                availability_zone=az,
+                map_public_ip_on_launch=False,
+                tags=[{"key": "Name", "value": f"prod-eks-subnet-private-{az}"}] + discovery_tags
+            )
+            for az, cidr_block in zip(plan["availability_zones"], plan["private_subnets"])
+        ]
 
         # === Public Route Table (1 for all public subnets) ===
         public_rt = ec2.CfnRouteTable(
@@ -99,48 +92,221 @@ class EksVpcCdkStack(Stack):
             gateway_id=igw.ref
         )
 
-        for subnet in [public_a, public_b, public_c]:
+        for subnet in public_subnets:
             ec2.CfnSubnetRouteTableAssociation(
                 self, f"{subnet.node.id}Assoc",
                 subnet_id=subnet.ref,
                 route_table_id=public_rt.ref
             )
 
-        # === NAT Gateway (1 in Public Subnet A) ===
-        eip_nat = ec2.CfnEIP(self, "NatEip", domain="vpc")
-        nat_gw = ec2.CfnNatGateway(
-            self, "NatGateway",
-            subnet_id=public_a.ref,
-            allocation_id=eip_nat.attr_allocation_id,
-            tags=[{"key": "Name", "value": "eks-natgw"}]
-        )
+        # === NAT Gateways and Private Route Tables ===
+        # single (default): 1 NAT gateway in the first public subnet and 1 private
+        # route table for all private subnets.
+        # per_az (-c nat_strategy=per_az): 1 NAT gateway, EIP and private route
+        # table per AZ, so private subnets egress through their own AZ. The first
+        # AZ keeps the single-mode logical IDs, the others get their AZ letter
+        # (NatGatewayB, ...), so switching modes re-associates their subnets
+        # without replacing the existing NAT gateway.
+        if settings.get(self, "nat_strategy") == "per_az":
+            nat_subnets = [
+                (public_subnet, [private_subnet], "" if index == 0 else public_subnet.node.id[-1])
+                for index, (public_subnet, private_subnet) in enumerate(zip(public_subnets, private_subnets))
+            ]
+        else:
+            nat_subnets = [(public_subnets[0], private_subnets, "")]
 
-        # === Private Route Table (1 for all private subnets) ===
-        private_rt = ec2.CfnRouteTable(
-            self, "PrivateRouteTable",
-            vpc_id=vpc.ref,
-            tags=[{"key": "Name", "value": "eks-private-rt"}]
-        )
+        private_route_tables = []
+        route_table_for = {}  # private subnet id -> its route table
+        for public_subnet, routed_subnets, suffix in nat_subnets:
+            az_tag = f"-{public_subnet.availability_zone}" if suffix else ""
+            eip_nat = ec2.CfnEIP(self, f"NatEip{suffix}", domain="vpc")
+            nat_gw = ec2.CfnNatGateway(
+                self, f"NatGateway{suffix}",
+                subnet_id=public_subnet.ref,
+                allocation_id=eip_nat.attr_allocation_id,
+                tags=[{"key": "Name", "value": f"eks-natgw{az_tag}"}]
+            )
 
-        ec2.CfnRoute(
-            self, "PrivateDefaultRoute",
-            route_table_id=private_rt.ref,
-            destination_cidr_block="0.0.0.0/0",
-            nat_gateway_id=nat_gw.ref
-        )
+            private_rt = ec2.CfnRouteTable(
+                self, f"PrivateRouteTable{suffix}",
+                vpc_id=vpc.ref,
+                tags=[{"key": "Name", "value": f"eks-private-rt{az_tag}"}]
+            )
+            private_route_tables.append(private_rt)
 
-        for subnet in [private_a, private_b, private_c]:
-            ec2.CfnSubnetRouteTableAssociation(
-                self, f"{subnet.node.id}Assoc",
-                subnet_id=subnet.ref,
-                route_table_id=private_rt.ref
+            ec2.CfnRoute(
+                self, f"PrivateDefaultRoute{suffix}",
+                route_table_id=private_rt.ref,
+                destination_cidr_block="0.0.0.0/0",
+                nat_gateway_id=nat_gw.ref
             )
 
+            for subnet in routed_subnets:
+                route_table_for[subnet.node.id] = private_rt
+                ec2.CfnSubnetRouteTableAssociation(
+                    self, f"{subnet.node.id}Assoc",
+                    subnet_id=subnet.ref,
+                    route_table_id=private_rt.ref
+                )
+
+        # === IPv6 (optional, -c ip_family=ipv6) ===
+        # Amazon-provided /56 with a /64 per public and private subnet. Public
+        # subnets route ::/0 to the internet gateway, private subnets to an
+        # egress-only internet gateway. IPv4 keeps working as before (dual stack).
+        ipv6_cidr = None
+        if settings.get(self, "ip_family") == "ipv6":
+            if plan["pod_cidr"]:
+                raise ValueError("pod_cidr (custom networking) is not supported with ip_family=ipv6")
+            ipv6_block = ec2.CfnVPCCidrBlock(
+                self, "Ipv6CidrBlock",
+                vpc_id=vpc.ref,
+                amazon_provided_ipv6_cidr_block=True
+            )
+            ipv6_cidr = Fn.select(0, vpc.attr_ipv6_cidr_blocks)
+            subnets = public_subnets + private_subnets
+            ipv6_subnet_cidrs = Fn.cidr(ipv6_cidr, len(subnets), "64")
+            for index, subnet in enumerate(subnets):
+                subnet.ipv6_cidr_block = Fn.select(index, ipv6_subnet_cidrs)
+                subnet.assign_ipv6_address_on_creation = True
+                subnet.add_dependency(ipv6_block)
+
+            ec2.CfnRoute(
+                self, "PublicIpv6DefaultRoute",
+                route_table_id=public_rt.ref,
+                destination_ipv6_cidr_block="::/0",
+                gateway_id=igw.ref
+            )
+
+            eigw = ec2.CfnEgressOnlyInternetGateway(
+                self, "EgressOnlyInternetGateway",
+                vpc_id=vpc.ref
+            )
+            for private_rt in private_route_tables:
+                ec2.CfnRoute(
+                    self, f"{private_rt.node.id}Ipv6DefaultRoute",
+                    route_table_id=private_rt.ref,
+                    destination_ipv6_cidr_block="::/0",
+                    egress_only_internet_gateway_id=eigw.ref
+                )
+
+        # === Pod Subnets (optional, -c pod_cidr=100.64.0.0/16) ===
+        # Secondary CIDR with 1 pod subnet per AZ for VPC CNI custom networking
+        # (see EksClusterStack). Pods egress through their AZ's private route table.
+        pod_subnets = []
+        if plan["pod_cidr"]:
+            pod_cidr_block = ec2.CfnVPCCidrBlock(
+                self, "PodCidrBlock",
+                vpc_id=vpc.ref,
+                cidr_block=plan["pod_cidr"]
+            )
+            for az, cidr_block, private_subnet in zip(
+                plan["availability_zones"], plan["pod_subnets"], private_subnets
+            ):
+                pod_subnet = ec2.CfnSubnet(
+                    self, f"PodSubnet{az[-1].upper()}",
+                    vpc_id=vpc.ref,
+                    cidr_block=cidr_block,
+                    availability_zone=az,
+                    map_public_ip_on_launch=False,
+                    tags=[{"key": "Name", "value": f"prod-eks-subnet-pod-{az}"}]
+                )
+                # The subnet can only be created once the CIDR is associated
+                pod_subnet.add_dependency(pod_cidr_block)
+                ec2.CfnSubnetRouteTableAssociation(
+                    self, f"{pod_subnet.node.id}Assoc",
+                    subnet_id=pod_subnet.ref,
+                    route_table_id=route_table_for[private_subnet.node.id].ref
+                )
+                pod_subnets.append(pod_subnet)
+
+        # === VPC Endpoints (optional, -c vpc_endpoints=true) ===
+        # Keeps image pulls, node bootstrap and AWS API calls from the private
+        # subnets off the NAT gateway
+        if settings.flag(self, "vpc_endpoints"):
+            # S3 gateway endpoint (ECR image layers are served from S3)
+            ec2.CfnVPCEndpoint(
+                self, "S3GatewayEndpoint",
+                vpc_id=vpc.ref,
+                service_name=f"com.amazonaws.{self.region}.s3",
+                vpc_endpoint_type="Gateway",
+                route_table_ids=[rt.ref for rt in private_route_tables]
+            )
+
+            # Shared security group for the interface endpoints: HTTPS from the
+            # VPC, and from the secondary CIDR whose addresses the pods get
+            # with custom networking
+            endpoint_sg = ec2.CfnSecurityGroup(
+                self, "EndpointSecurityGroup",
+                group_description="HTTPS from the VPC to the interface endpoints",
+                vpc_id=vpc.ref,
+                security_group_ingress=[
+                    ec2.CfnSecurityGroup.IngressProperty(
+                        ip_protocol="tcp",
+                        from_port=443,
+                        to_port=443,
+                        cidr_ip=cidr
+                    )
+                    for cidr in [plan["vpc_cidr"], plan["pod_cidr"]] if cidr
+                ],
+                tags=[{"key": "Name", "value": "eks-vpc-endpoints-sg"}]
+            )
+
+            # Interface endpoints, one ENI per private subnet
+            for endpoint_id, service in INTERFACE_ENDPOINTS.items():
+                ec2.CfnVPCEndpoint(
+                    self, f"{endpoint_id}Endpoint",
+                    vpc_id=vpc.ref,
+                    service_name=f"com.amazonaws.{self.region}.{service}",
+                    vpc_endpoint_type="Interface",
+                    private_dns_enabled=True,
+                    subnet_ids=[subnet.ref for subnet in private_subnets],
+                    security_group_ids=[endpoint_sg.attr_group_id]
+                )
+
         # === Outputs ===
         CfnOutput(self, "VpcId", value=vpc.ref)
-        CfnOutput(self, "VpcCidr", value="192.168.0.0/16")
+        CfnOutput(self, "VpcCidr", value=plan["vpc_cidr"])
         
         # Make resources available as instance attributes
         self.vpc = vpc
-        self.public_subnets = [public_a, public_b, public_c]
-        self.private_subnets = [private_a, private_b, private_c]
+        self.public_subnets = public_subnets
+        self.private_subnets = private_subnets
+        self.pod_subnets = pod_subnets
+        self.ipv6_cidr = ipv6_cidr
+        self.cidr_plan = plan
+
+        # Publish identifiers for consumers when SSM wiring is enabled (-c wiring=ssm)
+        ssm_wiring.publish(self, ssm_wiring.VPC_ID, vpc.ref)
+        for index, subnet in enumerate(self.public_subnets):
+            ssm_wiring.publish(self, ssm_wiring.PUBLIC_SUBNET_ID.format(index=index), subnet.ref)
+        for index, subnet in enumerate(self.private_subnets):
+            ssm_wiring.publish(self, ssm_wiring.PRIVATE_SUBNET_ID.format(index=index), subnet.ref)
+        for index, subnet in enumerate(self.pod_subnets):
+            ssm_wiring.publish(self, ssm_wiring.POD_SUBNET_ID.format(index=index), subnet.ref)
+        if ipv6_cidr:
+            ssm_wiring.publish(self, ssm_wiring.VPC_IPV6_CIDR, ipv6_cidr)
+
+    # Accessors for consumer stacks: the token itself (export) or an SSM lookup
+    def vpc_id_for(self, consumer: Construct) -> str:
+        return ssm_wiring.resolve(consumer, ssm_wiring.VPC_ID, self.vpc.ref)
+
+    def ipv6_cidr_for(self, consumer: Construct) -> str:
+        return ssm_wiring.resolve(consumer, ssm_wiring.VPC_IPV6_CIDR, self.ipv6_cidr)
+
+    def public_subnet_ids_for(self, consumer: Construct) -> list:
+        return [
+            ssm_wiring.resolve(consumer, ssm_wiring.PUBLIC_SUBNET_ID.format(index=index), subnet.ref)
+            for index, subnet in enumerate(self.public_subnets)
+        ]
+
+    def private_subnet_ids_for(self, consumer: Construct) -> list:
+        return [
+            ssm_wiring.resolve(consumer, ssm_wiring.PRIVATE_SUBNET_ID.format(index=index), subnet.ref)
+            for index, subnet in enumerate(self.private_subnets)
+        ]
+
+    def pod_subnet_ids_for(self, consumer: Construct) -> list:
+        return [
+            ssm_wiring.resolve(consumer, ssm_wiring.POD_SUBNET_ID.format(index=index), subnet.ref)
+            for index, subnet in enumerate(self.pod_subnets)
+        ]
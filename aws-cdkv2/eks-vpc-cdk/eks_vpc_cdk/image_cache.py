@@ -0,0 +1,119 @@
+"""Node images with the hot container images already in containerd.
+
+Every new node pulls the hello image from ECR through the NAT gateway before
+prod-hello can start. There are two ways to have it on disk at boot.
+
+AMI pipeline (-c image_builder=true, -c node_image=image_builder):
+EksImageBuilderStack runs an EC2 Image Builder pipeline. It starts from the
+EKS optimized AL2023 AMI and pulls CACHED_IMAGES (-c cached_images=...) into
+containerd's k8s.io namespace, where the kubelet finds them. It tags the new
+AMI with AMI_TAGS and stores its ID in AMI_PARAMETER. The first image is built
+while the stack deploys. The pipeline rebuilds on image_pipeline_schedule and
+picks up new EKS AMI releases and image pushes.
+
+node_image=image_builder launches the nodes from that AMI: the launch
+templates, the warm pool group and Karpenter, which selects the newest AMI
+with AMI_TAGS. A node group on a custom AMI is CUSTOM to EKS. Its NodeConfig
+therefore carries the cluster details, as for self-managed nodes.
+EksLaunchTemplateStack reads AMI_PARAMETER when it deploys, so redeploy it
+after a pipeline run to roll the nodes onto the new AMI.
+
+EBS snapshot (-c containerd_snapshot_id=snap-...): the launch templates
+attach a volume created from a snapshot of a node's /var/lib/containerd
+(images pulled) as SNAPSHOT_DEVICE. User data mounts the volume over
+/var/lib/containerd before nodeadm starts containerd. The nodes keep the EKS
+AMI.
+"""
+import hashlib
+import json
+import re
+
+from eks_vpc_cdk import settings, ssm_wiring
+
+# SSM parameter with the latest pipeline AMI
+AMI_PARAMETER = f"{ssm_wiring.PARAMETER_PREFIX}/node-image/image-id"
+
+# Tags on every pipeline AMI (Karpenter's amiSelectorTerms)
+AMI_TAGS = {"prod-eks/node-image": "image-cache"}
+
+# Device of the containerd volume created from containerd_snapshot_id
+SNAPSHOT_DEVICE = "/dev/xvdb"
+
+ECR_REGISTRY = re.compile(r"^\d+\.dkr\.ecr\.([a-z0-9-]+)\.amazonaws\.com/")
+
+
+def custom_ami(scope):
+    """Whether the nodes launch from the pipeline AMI instead of the EKS one."""
+    if settings.get(scope, "node_image") != "image_builder":
+        return False
+    if settings.get(scope, "ip_family") == "ipv6":
+        raise ValueError("node_image=image_builder requires ip_family=ipv4")
+    return True
+
+
+def snapshot_id(scope):
+    """containerd_snapshot_id, or None to keep images on the root volume."""
+    snapshot = settings.get(scope, "containerd_snapshot_id")
+    if snapshot and settings.get(scope, "storage_profile") == "nvme":
+        raise ValueError(
+            "containerd_snapshot_id cannot be combined with storage_profile=nvme; "
+            "both mount /var/lib/containerd"
+        )
+    return snapshot
+
+
+def snapshot_setup(scope):
+    """User data lines that mount the snapshot volume, or "" without one."""
+    if not snapshot_id(scope):
+        return ""
+    return f"""# Pre-pulled containerd images (-c containerd_snapshot_id)
+until [ -e {SNAPSHOT_DEVICE} ]; do sleep 1; done
+mkdir -p /var/lib/containerd
+echo "{SNAPSHOT_DEVICE} /var/lib/containerd auto defaults,nofail 0 2" >> /etc/fstab
+mount /var/lib/containerd
+
+"""
+
+
+def pull_commands(images):
+    """Shell commands that pull images into containerd, ECR images with the instance role."""
+    commands = ["systemctl start containerd"]
+    for image in images:
+        registry = ECR_REGISTRY.match(image)
+        if registry:
+            commands.append(
+                f'ctr -n k8s.io images pull --user "AWS:$(aws ecr get-login-password '
+                f'--region {registry.group(1)})" {image}'
+            )
+        else:
+            commands.append(f"ctr -n k8s.io images pull {image}")
+    return commands
+
+
+def component_document(images):
+    """Image Builder component (JSON, which is valid YAML) that pre-pulls images."""
+    return json.dumps({
+        "name": "prod-eks-image-cache",
+        "description": "Pull the hot container images into containerd",
+        "schemaVersion": 1.0,
+        "phases": [
+            {
+                "name": "build",
+                "steps": [
+                    {
+                        "name": "PullImages",
+                        "action": "ExecuteBash",
+                        "inputs": {"commands": pull_commands(images)}
+                    }
+                ]
+            }
+        ]
+    }, indent=2)
+
+
+def version(properties):
+    """Semantic version for a component or recipe. Both are immutable once a
+    name and version exist, so properties must hold everything that goes into
+    the resource; any change then gets a new version."""
+    digest = hashlib.sha256(json.dumps(properties, sort_keys=True).encode()).hexdigest()
+    return f"1.0.{int(digest[:7], 16)}"
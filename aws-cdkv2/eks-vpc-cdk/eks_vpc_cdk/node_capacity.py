@@ -0,0 +1,131 @@
+"""Instance types and capacity type of the managed node groups.
+
+By default both node groups run on-demand t3a.xlarge nodes from
+EksLaunchTemplateStack's prod-scheduler-v2-lt. A node group can instead take
+a list of instance types (-c hello_instance_types=m6a.xlarge,m5a.xlarge,m5.xlarge)
+and Spot capacity (-c hello_capacity_type=SPOT). EKS spreads a Spot node group
+over all listed types with the price-capacity-optimized allocation strategy
+and rebalances nodes ahead of interruptions; on-demand groups use the list in
+order. A node group may not have an instance type in both its launch template
+and its own settings, so groups with a list use prod-flex-lt, the same
+template without one.
+
+An arm64 node group (-c hello_architecture=arm64) runs the AL2023 ARM AMI on
+Graviton instances: ARM64_INSTANCE_TYPE from prod-arm64-lt, or its own list,
+which may only hold Graviton types. Its nodes carry ARM64_TAINT, so only pods
+that tolerate it, i.e. whose images are multi-arch, are scheduled there;
+EksK8sResourcesStack adds the toleration and an architecture node selector to
+the hello deployment.
+
+Instance types, capacity type and architecture are fixed when a node group
+is created. A node group with non-default values is therefore named after
+them (original name plus a hash), so that CloudFormation creates the
+replacement before it deletes the old group. EksK8sResourcesStack selects the
+prod-hello nodes by that name.
+"""
+import hashlib
+import json
+import re
+
+from eks_vpc_cdk import image_cache, settings
+
+# Settings prefix -> original node group name
+NODE_GROUPS = {
+    "scheduler": "prod-scheduler-v2",
+    "hello": "prod-hello-ng"
+}
+
+# Architecture -> managed node group AMI type
+AMI_TYPES = {
+    "x86_64": "AL2023_x86_64_STANDARD",
+    "arm64": "AL2023_ARM_64_STANDARD"
+}
+
+# Architecture -> kubernetes.io/arch node label
+KUBERNETES_ARCH = {
+    "x86_64": "amd64",
+    "arm64": "arm64"
+}
+
+# Taint on arm64 nodes (CfnNodegroup spelling of the effect)
+ARM64_TAINT = {"key": "kubernetes.io/arch", "value": "arm64", "effect": "NO_SCHEDULE"}
+
+# Graviton families have a "g" right after the generation: t4g, m7g, c7gn, r6gd
+GRAVITON_FAMILY = re.compile(r"^[a-z]+\d+g[a-z]*\.")
+
+
+def instance_architecture(instance_type):
+    return "arm64" if GRAVITON_FAMILY.match(instance_type) else "x86_64"
+
+
+def architecture(scope, node_group):
+    return settings.get(scope, f"{node_group}_architecture")
+
+
+def instance_types(scope, node_group):
+    """The node group's own instance types, or None to use the launch template's."""
+    types = settings.string_list(scope, f"{node_group}_instance_types")
+    node_architecture = architecture(scope, node_group)
+    mismatched = [
+        instance_type for instance_type in types or []
+        if instance_architecture(instance_type) != node_architecture
+    ]
+    if mismatched:
+        raise ValueError(
+            f"{node_group}_instance_types {', '.join(mismatched)} are not {node_architecture} "
+            f"instance types; set {node_group}_architecture to match"
+        )
+    return types
+
+
+def ami_type(scope, node_group):
+    """AMI type, CUSTOM on the pipeline AMI (-c node_image=image_builder)."""
+    if image_cache.custom_ami(scope):
+        if architecture(scope, node_group) == "arm64":
+            raise ValueError(
+                "node_image=image_builder builds x86_64 AMIs only; "
+                f"set {node_group}_architecture=x86_64"
+            )
+        return "CUSTOM"
+    return AMI_TYPES[architecture(scope, node_group)]
+
+
+def taints(scope, node_group):
+    """CfnNodegroup taints, or None for x86_64 node groups."""
+    return [ARM64_TAINT] if architecture(scope, node_group) == "arm64" else None
+
+
+def arm64_template_needed(scope):
+    """Whether an arm64 node group uses prod-arm64-lt (it lists no instance types)."""
+    return any(
+        architecture(scope, node_group) == "arm64" and not instance_types(scope, node_group)
+        for node_group in NODE_GROUPS
+    )
+
+
+def capacity_type(scope, node_group):
+    return settings.get(scope, f"{node_group}_capacity_type")
+
+
+def node_group_name(scope, node_group):
+    """Original name, or the name plus a hash of non-default capacity settings."""
+    name = NODE_GROUPS[node_group]
+    types = instance_types(scope, node_group)
+    capacity = capacity_type(scope, node_group)
+    arm64 = architecture(scope, node_group) == "arm64"
+    if types is None and capacity == "ON_DEMAND" and not arm64:
+        return name
+    settings_key = [capacity, types] + (["arm64"] if arm64 else [])
+    digest = hashlib.sha256(json.dumps(settings_key).encode()).hexdigest()[:6]
+    return f"{name}-{digest}"
+
+
+def flex_instance_types(scope):
+    """Instance types of every node group with its own list, for prod-flex-lt."""
+    types = []
+    for node_group in NODE_GROUPS:
+        types += [
+            instance_type for instance_type in instance_types(scope, node_group) or []
+            if instance_type not in types
+        ]
+    return types
@@ -0,0 +1,181 @@
+"""nodeadm NodeConfig for the AL2023 nodes.
+
+node_user_data() in eks_launch_template.py adds a NodeConfig MIME part when
+any setting needs one. It carries:
+
+- the cluster details, for self-managed nodes only (managed node groups add
+  their own)
+- the kubelet config and flags from kubelet_config() and kubelet_flags()
+- the containerd drop-in from containerd_config()
+- the instance store setup from node_storage.local_storage()
+
+With -c soci=true the kubelet and containerd use the SOCI snapshotter, which
+node_user_data() installs (see soci.py).
+
+With -c kubelet_tuning=true the kubelet and containerd also get the tuning
+below. Each value is a context setting:
+
+- Parallel image pulls instead of one at a time. max_parallel_image_pulls caps
+  the concurrent pulls; registry_pull_qps and registry_burst raise the rate
+  limit.
+- system_reserved and kube_reserved keep CPU, memory and disk for the OS and
+  the node daemons. kube_reserved defaults to nodeadm's value, which it
+  derives from the instance type.
+- eviction_hard, eviction_soft and eviction_soft_grace_period evict pods
+  before the node runs out of memory or disk. image_gc_high and image_gc_low
+  start image garbage collection earlier.
+- containerd_max_concurrent_downloads sets the layer downloads per image pull.
+  Unpacked layers are discarded to save disk.
+
+Resource maps take "key=value,key=value" strings on the command line.
+"""
+import json
+
+from eks_vpc_cdk import dataplane, node_local_dns, settings, soci, vpc_cni
+
+API_VERSION = "node.eks.aws/v1alpha1"
+
+# Kubelet fields an EC2NodeClass can set as well (EksKarpenterStack)
+KARPENTER_KUBELET_FIELDS = (
+    "maxPods", "clusterDNS", "kubeReserved", "systemReserved", "evictionHard",
+    "evictionSoft", "evictionSoftGracePeriod", "imageGCHighThresholdPercent",
+    "imageGCLowThresholdPercent"
+)
+
+
+def kubelet_config(scope, instance_types: list) -> dict:
+    """KubeletConfiguration fields for nodes of any of instance_types."""
+    config = {}
+    service_dataplane = settings.get(scope, "dataplane")
+
+    # max-pods matching the VPC CNI mode (prefix delegation / custom networking)
+    max_pods = vpc_cni.fleet_max_pods(scope, instance_types)
+    if max_pods is not None:
+        config["maxPods"] = max_pods
+
+    # In IPVS mode kube-proxy binds the kube-dns IP itself, so NodeLocal
+    # DNSCache cannot; pods have to be pointed at its link-local address
+    if service_dataplane == "ipvs" and settings.flag(scope, "node_local_dns"):
+        config["clusterDNS"] = [node_local_dns.LOCAL_IP]
+
+    if settings.flag(scope, "kubelet_tuning"):
+        config["serializeImagePulls"] = False
+        config["maxParallelImagePulls"] = settings.number(scope, "max_parallel_image_pulls")
+        config["registryPullQPS"] = settings.number(scope, "registry_pull_qps")
+        config["registryBurst"] = settings.number(scope, "registry_burst")
+        kube_reserved = settings.string_map(scope, "kube_reserved")
+        if kube_reserved:
+            config["kubeReserved"] = kube_reserved
+        config["systemReserved"] = settings.string_map(scope, "system_reserved")
+        config["evictionHard"] = settings.string_map(scope, "eviction_hard")
+        config["evictionSoft"] = settings.string_map(scope, "eviction_soft")
+        config["evictionSoftGracePeriod"] = settings.string_map(scope, "eviction_soft_grace_period")
+        config["imageGCHighThresholdPercent"] = settings.number(scope, "image_gc_high")
+        config["imageGCLowThresholdPercent"] = settings.number(scope, "image_gc_low")
+        if not 0 < config["imageGCLowThresholdPercent"] < config["imageGCHighThresholdPercent"] <= 100:
+            raise ValueError("image_gc_low must be below image_gc_high, both between 1 and 100")
+
+    # Image pulls through the SOCI snapshotter, which passes them on to containerd
+    if soci.enabled(scope):
+        config["imageServiceEndpoint"] = f"unix://{soci.SNAPSHOTTER_SOCKET}"
+    return config
+
+
+def kubelet_flags(scope) -> list:
+    """Kubelet command line flags."""
+    flags = []
+    # No pods on a new node before the Cilium agent is ready on it
+    if settings.get(scope, "dataplane") == "cilium":
+        flags.append(f"--register-with-taints={dataplane.CILIUM_AGENT_NOT_READY_TAINT}")
+    return flags
+
+
+def containerd_config(scope) -> str:
+    """containerd config.toml drop-in, or "" for the AMI's defaults."""
+    # TOML table -> its lines; each table may appear only once
+    tables = {}
+    if settings.flag(scope, "kubelet_tuning"):
+        downloads = settings.number(scope, "containerd_max_concurrent_downloads")
+        tables['plugins."io.containerd.grpc.v1.cri"'] = [f"max_concurrent_downloads = {downloads}"]
+        tables['plugins."io.containerd.grpc.v1.cri".containerd'] = ["discard_unpacked_layers = true"]
+    if soci.enabled(scope):
+        # CRI snapshotter; the annotations tell it which layers have a SOCI index
+        tables.setdefault('plugins."io.containerd.grpc.v1.cri".containerd', []).extend([
+            'snapshotter = "soci"',
+            "disable_snapshot_annotations = false"
+        ])
+        tables["proxy_plugins.soci"] = ['type = "snapshot"', f'address = "{soci.SNAPSHOTTER_SOCKET}"']
+    return "".join(
+        f"[{table}]\n" + "".join(f"{line}\n" for line in lines) for table, lines in tables.items()
+    )
+
+
+def karpenter_kubelet(config: dict) -> dict:
+    """The part of kubelet_config() an EC2NodeClass accepts."""
+    return {key: value for key, value in config.items() if key in KARPENTER_KUBELET_FIELDS}
+
+
+def karpenter_user_data(scope, config: dict) -> str:
+    """EC2NodeClass userData with the rest of config, the containerd drop-in and
+    the SOCI snapshotter setup, or "" when there is none; Karpenter merges it
+    with its own NodeConfig."""
+    node_config_yaml = render(
+        kubelet={key: value for key, value in config.items() if key not in KARPENTER_KUBELET_FIELDS},
+        containerd=containerd_config(scope)
+    )
+    shell_setup = soci.node_setup(scope)
+    if not (node_config_yaml or shell_setup):
+        return ""
+    parts = ""
+    if node_config_yaml:
+        parts += f"""--==BOUNDARY==
+Content-Type: application/node.eks.aws
+
+{node_config_yaml}
+"""
+    if shell_setup:
+        parts += f"""--==BOUNDARY==
+Content-Type: text/x-shellscript; charset="us-ascii"
+
+#!/bin/bash
+{shell_setup}"""
+    return f"""MIME-Version: 1.0
+Content-Type: multipart/mixed; boundary="==BOUNDARY=="
+
+{parts}--==BOUNDARY==--
+"""
+
+
+def render(cluster: dict = None, kubelet: dict = None, flags: list = None, containerd: str = "",
+           instance: dict = None) -> str:
+    """NodeConfig YAML (values in JSON flow style), or "" when there is nothing to set."""
+    if not (cluster or kubelet or flags or containerd or instance):
+        return ""
+    spec_lines = ""
+    if cluster:
+        spec_lines += "  cluster:\n" + "".join(
+            f"    {key}: {json.dumps(value)}\n" for key, value in cluster.items()
+        )
+    if containerd:
+        spec_lines += "  containerd:\n    config: |\n" + "".join(
+            f"      {line}\n" for line in containerd.splitlines()
+        )
+    if instance:
+        spec_lines += "  instance:\n" + "".join(
+            f"    {key}: {json.dumps(value)}\n" for key, value in instance.items()
+        )
+    if kubelet or flags:
+        spec_lines += "  kubelet:\n"
+    if kubelet:
+        spec_lines += "    config:\n" + "".join(
+            f"      {key}: {json.dumps(value)}\n" for key, value in kubelet.items()
+        )
+    if flags:
+        spec_lines += "    flags:\n" + "".join(
+            f"      - {json.dumps(flag)}\n" for flag in flags
+        )
+    return f"""---
+apiVersion: {API_VERSION}
+kind: NodeConfig
+spec:
+{spec_lines}"""
@@ -0,0 +1,176 @@
+"""NodeLocal DNSCache manifests (-c node_local_dns=true).
+
+A node-local-dns DaemonSet runs a caching CoreDNS on every node, on the
+link-local LOCAL_IP and on the kube-dns service IP. Pods keep using the
+kube-dns IP, but their queries are answered on their own node and only cache
+misses go to CoreDNS, over TCP, through the kube-dns-upstream service. No
+kubelet change is needed with kube-proxy in iptables mode. In IPVS mode
+kube-proxy owns the kube-dns IP, so the cache binds LOCAL_IP only and the
+launch template points the kubelet's clusterDNS at it.
+
+Based on the upstream nodelocaldns.yaml (kubernetes/kubernetes
+cluster/addons/dns/nodelocaldns). The __PILLAR__CLUSTER__DNS__ and
+__PILLAR__UPSTREAM__SERVERS__ placeholders are filled in by node-cache at
+startup.
+"""
+IMAGE = "registry.k8s.io/dns/k8s-dns-node-cache:1.23.1"
+LOCAL_IP = "169.254.20.10"
+DNS_DOMAIN = "cluster.local"
+NAMESPACE = "kube-system"
+
+LABELS = {"k8s-app": "node-local-dns"}
+
+
+def corefile(kube_dns_ip, ipvs=False):
+    bind = f"bind {LOCAL_IP}" if ipvs else f"bind {LOCAL_IP} {kube_dns_ip}"
+    cluster_dns = kube_dns_ip if ipvs else "__PILLAR__CLUSTER__DNS__"
+    cluster_zone = f"""{{
+    errors
+    cache 30
+    reload
+    loop
+    {bind}
+    forward . {cluster_dns} {{
+        force_tcp
+    }}
+    prometheus :9253
+}}
+"""
+    return (
+        f"""{DNS_DOMAIN}:53 {{
+    errors
+    cache {{
+        success 9984 30
+        denial 9984 5
+    }}
+    reload
+    loop
+    {bind}
+    forward . {cluster_dns} {{
+        force_tcp
+    }}
+    prometheus :9253
+    health {LOCAL_IP}:8080
+}}
+"""
+        + f"in-addr.arpa:53 {cluster_zone}"
+        + f"ip6.arpa:53 {cluster_zone}"
+        + f""".:53 {{
+    errors
+    cache 30
+    reload
+    loop
+    {bind}
+    forward . __PILLAR__UPSTREAM__SERVERS__
+    prometheus :9253
+}}
+"""
+    )
+
+
+def manifests(kube_dns_ip, ipvs=False):
+    """Kubernetes objects, in apply order, keyed by output name."""
+    service_account = {
+        "apiVersion": "v1",
+        "kind": "ServiceAccount",
+        "metadata": {"name": "node-local-dns", "namespace": NAMESPACE}
+    }
+
+    # Second service in front of CoreDNS, so cache misses bypass the
+    # node-local listener on the kube-dns IP
+    upstream_service = {
+        "apiVersion": "v1",
+        "kind": "Service",
+        "metadata": {
+            "name": "kube-dns-upstream",
+            "namespace": NAMESPACE,
+            "labels": {"k8s-app": "kube-dns"}
+        },
+        "spec": {
+            "ports": [
+                {"name": "dns", "port": 53, "protocol": "UDP", "targetPort": 53},
+                {"name": "dns-tcp", "port": 53, "protocol": "TCP", "targetPort": 53}
+            ],
+            "selector": {"k8s-app": "kube-dns"}
+        }
+    }
+
+    config_map = {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {"name": "node-local-dns", "namespace": NAMESPACE},
+        "data": {"Corefile": corefile(kube_dns_ip, ipvs)}
+    }
+
+    daemon_set = {
+        "apiVersion": "apps/v1",
+        "kind": "DaemonSet",
+        "metadata": {"name": "node-local-dns", "namespace": NAMESPACE, "labels": LABELS},
+        "spec": {
+            "updateStrategy": {"rollingUpdate": {"maxUnavailable": "10%"}},
+            "selector": {"matchLabels": LABELS},
+            "template": {
+                "metadata": {
+                    "labels": LABELS,
+                    "annotations": {"prometheus.io/port": "9253", "prometheus.io/scrape": "true"}
+                },
+                "spec": {
+                    "priorityClassName": "system-node-critical",
+                    "serviceAccountName": "node-local-dns",
+                    "hostNetwork": True,
+                    "dnsPolicy": "Default",
+                    "tolerations": [
+                        {"key": "CriticalAddonsOnly", "operator": "Exists"},
+                        {"effect": "NoExecute", "operator": "Exists"},
+                        {"effect": "NoSchedule", "operator": "Exists"}
+                    ],
+                    "containers": [
+                        {
+                            "name": "node-cache",
+                            "image": IMAGE,
+                            "resources": {"requests": {"cpu": "25m", "memory": "5Mi"}},
+                            "args": [
+                                "-localip", LOCAL_IP if ipvs else f"{LOCAL_IP},{kube_dns_ip}",
+                                "-conf", "/etc/Corefile",
+                                "-upstreamsvc", "kube-dns-upstream"
+                            ],
+                            "securityContext": {"capabilities": {"add": ["NET_ADMIN"]}},
+                            "ports": [
+                                {"containerPort": 53, "name": "dns", "protocol": "UDP"},
+                                {"containerPort": 53, "name": "dns-tcp", "protocol": "TCP"},
+                                {"containerPort": 9253, "name": "metrics", "protocol": "TCP"}
+                            ],
+                            "livenessProbe": {
+                                "httpGet": {"host": LOCAL_IP, "path": "/health", "port": 8080},
+                                "initialDelaySeconds": 60,
+                                "timeoutSeconds": 5
+                            },
+                            "volumeMounts": [
+                                {"mountPath": "/run/xtables.lock", "name": "xtables-lock", "readOnly": False},
+                                {"mountPath": "/etc/coredns", "name": "config-volume"},
+                                {"mountPath": "/etc/kube-dns", "name": "kube-dns-config"}
+                            ]
+                        }
+                    ],
+                    "volumes": [
+                        {"name": "xtables-lock", "hostPath": {"path": "/run/xtables.lock", "type": "FileOrCreate"}},
+                        {"name": "kube-dns-config", "configMap": {"name": "kube-dns", "optional": True}},
+                        {
+                            "name": "config-volume",
+                            "configMap": {
+                                "name": "node-local-dns",
+                                "items": [{"key": "Corefile", "path": "Corefile.base"}]
+                            }
+                        }
+                    ]
+                }
+            }
+        }
+    }
+
+    return {
+        "NodeLocalDnsServiceAccountManifest": service_account,
+        "NodeLocalDnsUpstreamServiceManifest": upstream_service,
+        "NodeLocalDnsConfigMapManifest": config_map,
+        "NodeLocalDnsDaemonSetManifest": daemon_set
+    }
@@ -0,0 +1,88 @@
+"""Node storage profile (-c storage_profile=ebs|nvme).
+
+ebs (default): the 70 GiB gp3 root volume at the gp3 baseline of 3000 IOPS
+and 125 MiB/s, which also holds container images and emptyDir volumes.
+
+nvme: on instance types with local NVMe instance store (m6id, c6gd, i4i, ...),
+nodeadm assembles the disks into a RAID0 array at boot, before containerd and
+the kubelet start, and mounts it for /var/lib/containerd, /var/lib/kubelet and
+/var/log/pods (NodeConfig spec.instance.localStorage). Karpenter nodes get the
+same through the EC2NodeClass instanceStorePolicy. Instance types without
+instance store keep everything on the root volume. For those the root volume
+is provisioned with IOPS and throughput scaled to the instance size
+(GP3_PERFORMANCE); with several instance types, the smallest one without
+instance store decides.
+
+Instance store is wiped when an instance stops, so the warm pool (which stops
+its instances) recreates the array on every start.
+"""
+import re
+
+from eks_vpc_cdk import settings
+
+# Families with NVMe instance store: a "d" in the attribute letters after the
+# generation (m5d, m6id, c6gd, r5dn, z1d) or the storage-optimized i families
+INSTANCE_STORE_FAMILY = re.compile(r"^([a-z]+\d+[a-z]*d[a-z]*|i\d[a-z]*|i[ms]\d[a-z]+)$")
+
+# Minimum size (in large-equivalents) -> gp3 (IOPS, MiB/s); gp3 tops out at 16000 / 1000
+GP3_PERFORMANCE = [
+    (16, (16000, 1000)),
+    (8, (12000, 750)),
+    (4, (8000, 500)),
+    (2, (6000, 375)),
+    (1, (4000, 250)),
+    (0, (3000, 125))
+]
+
+
+def has_instance_store(instance_type):
+    return bool(INSTANCE_STORE_FAMILY.match(instance_type.split(".")[0]))
+
+
+def size_units(instance_type):
+    """Instance size in large-equivalents: large 1, xlarge 2, 4xlarge 8, metal 48;
+    a sized metal type (metal-24xl) counts as the matching Nxlarge."""
+    size = instance_type.split(".")[1]
+    if size in ("nano", "micro", "small", "medium"):
+        return 0
+    if size == "large":
+        return 1
+    if size == "metal":
+        return 48
+    if size.startswith("metal-"):
+        return 2 * int(size[len("metal-"):-len("xl")])
+    multiple = size[:-len("xlarge")]
+    return 2 * (int(multiple) if multiple else 1)
+
+
+def gp3_performance(instance_type):
+    """gp3 (IOPS, throughput) for a root volume that also holds images and emptyDir."""
+    units = size_units(instance_type)
+    for minimum, performance in GP3_PERFORMANCE:
+        if units >= minimum:
+            return performance
+
+
+def nvme(scope):
+    return settings.get(scope, "storage_profile") == "nvme"
+
+
+def root_volume(scope, instance_types, base):
+    """base (a ROOT_VOLUME dict) with IOPS and throughput for instance_types."""
+    if not nvme(scope):
+        return base
+    without_instance_store = [
+        instance_type for instance_type in instance_types if not has_instance_store(instance_type)
+    ]
+    if not without_instance_store:
+        return base
+    smallest = min(without_instance_store, key=size_units)
+    iops, throughput = gp3_performance(smallest)
+    return {**base, "iops": iops, "throughput": throughput}
+
+
+def local_storage(scope):
+    """NodeConfig spec.instance, or None to leave the instance store unused."""
+    if not nvme(scope):
+        return None
+    return {"localStorage": {"strategy": "RAID0"}}
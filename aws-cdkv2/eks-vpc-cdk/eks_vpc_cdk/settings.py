@@ -0,0 +1,177 @@
+"""Feature switches read from CDK context (cdk.json "context" or -c key=value).
+
+Every switch has a default that reproduces the original stacks, so an app
+without any of these context values synthesizes the same templates.
+"""
+
+# Context key -> default value
+DEFAULTS = {
+    # How stacks hand identifiers to each other: CloudFormation exports
+    # ("exports"), SSM parameters ("ssm") or both while migrating, see ssm_wiring.py
+    "wiring": "exports",
+    # Where the three IAM stacks live: separate stacks ("stacks"), one
+    # EksIdentityStack ("merged") or its nested stacks ("nested")
+    "identity_mode": "stacks",
+    # RemovalPolicy.RETAIN on the IAM resources, for moving them between stacks
+    "identity_retain": False,
+    # NAT gateways for private subnet egress: one in us-east-1a ("single") or
+    # one per AZ with its own private route table ("per_az")
+    "nat_strategy": "single",
+    # S3 gateway and ECR/STS/EC2/SSM/CloudWatch interface endpoints in the VPC
+    "vpc_endpoints": False,
+    # Network plan, see cidr_plan.py. The AZ list takes a comma-separated
+    # string on the command line; the first az_count AZs are used.
+    "vpc_cidr": "192.168.0.0/16",
+    "availability_zones": ["us-east-1a", "us-east-1b", "us-east-1c"],
+    "az_count": 3,
+    # t3a.xlarge runs at most 58 pods with the VPC CNI
+    "pods_per_node": 58,
+    "nodes_per_az": 60,
+    "public_subnet_prefix": 20,
+    # Secondary VPC CIDR for pod subnets and VPC CNI custom networking, e.g.
+    # "100.64.0.0/16"; None keeps pods in the private subnets
+    "pod_cidr": None,
+    # VPC CNI prefix delegation: /28 prefixes per ENI slot instead of single
+    # IPs, with WARM_PREFIX_TARGET prefixes kept free per node (see vpc_cni.py)
+    "prefix_delegation": False,
+    "warm_prefix_target": 1,
+    # Cluster IP family; "ipv6" also makes the VPC, nodes and ALB dual stack
+    "ip_family": "ipv4",
+    # vpc-cni, coredns (with replica autoscaling) and kube-proxy as EKS managed add-ons
+    "managed_addons": False,
+    "coredns_min_replicas": 2,
+    "coredns_max_replicas": 10,
+    # NodeLocal DNSCache manifests in EksK8sResourcesStack, see node_local_dns.py
+    "node_local_dns": False,
+    # Service dataplane: kube-proxy in iptables (default) or IPVS mode, or
+    # Cilium replacing kube-proxy and aws-node (see dataplane.py)
+    "dataplane": "iptables",
+    # Kubelet and containerd tuning in the nodes' NodeConfig, see node_config.py
+    "kubelet_tuning": False,
+    "max_parallel_image_pulls": 5,
+    "registry_pull_qps": 20,
+    "registry_burst": 40,
+    "kube_reserved": None,
+    "system_reserved": {"cpu": "100m", "memory": "200Mi", "ephemeral-storage": "1Gi"},
+    "eviction_hard": {"memory.available": "200Mi", "nodefs.available": "10%", "imagefs.available": "15%"},
+    "eviction_soft": {"memory.available": "500Mi", "nodefs.available": "15%"},
+    "eviction_soft_grace_period": {"memory.available": "1m30s", "nodefs.available": "2m"},
+    "image_gc_high": 85,
+    "image_gc_low": 75,
+    "containerd_max_concurrent_downloads": 10,
+    # Node storage: ebs (root volume only) or nvme (instance store RAID0 for
+    # containerd and the kubelet, gp3 sized to the instance otherwise), see
+    # node_storage.py
+    "storage_profile": "ebs",
+    # EksImageBuilderStack: an AMI with these images pre-pulled, rebuilt on the
+    # schedule; node_image=image_builder launches the nodes from it, or
+    # containerd_snapshot_id mounts an EBS snapshot of the images instead
+    # (see image_cache.py)
+    "image_builder": False,
+    "cached_images": ["575108957879.dkr.ecr.us-east-1.amazonaws.com/hello/swatops13032:latest"],
+    "image_pipeline_schedule": "cron(0 4 ? * sun *)",
+    "node_image": "eks",
+    "containerd_snapshot_id": None,
+    # SOCI lazy loading on the nodes and EksSociIndexStack, which indexes
+    # every tagged push to soci_repositories (layers of at least
+    # soci_min_layer_size bytes); soci_release_sha256 pins the release
+    # download per architecture ("amd64=<sha256>,arm64=<sha256>"), see soci.py
+    "soci": False,
+    "soci_repositories": ["hello/swatops13032"],
+    "soci_min_layer_size": 10485760,
+    "soci_release_sha256": None,
+    # EksKarpenterStack; the private subnets get a karpenter.sh/discovery tag
+    # with the karpenter_discovery value
+    "karpenter": False,
+    "karpenter_discovery": "prod-eks-sre-cluster",
+    # NodePool: instance types (comma-separated; default: the launch template's)
+    # and the total vCPUs Karpenter may launch
+    "karpenter_instance_types": None,
+    "karpenter_cpu_limit": 64,
+    # Managed node group sizes, see cluster_autoscaler.py
+    "scheduler_min_size": 1,
+    "scheduler_desired_size": 2,
+    "scheduler_max_size": 2,
+    "hello_min_size": 1,
+    "hello_desired_size": 1,
+    "hello_max_size": 1,
+    # Per node group instance types (comma-separated; default: the launch
+    # template's) and ON_DEMAND or SPOT capacity, see node_capacity.py
+    "scheduler_instance_types": None,
+    "scheduler_capacity_type": "ON_DEMAND",
+    "hello_instance_types": None,
+    "hello_capacity_type": "ON_DEMAND",
+    # CPU architecture per node group: x86_64 or arm64 (Graviton)
+    "scheduler_architecture": "x86_64",
+    "hello_architecture": "x86_64",
+    # Instances kept pre-initialized for the scheduler nodes and their state
+    # while waiting; above 0 the scheduler becomes a self-managed Auto Scaling
+    # group with a warm pool (see warm_pool.py)
+    "scheduler_warm_pool_size": 0,
+    "scheduler_warm_pool_state": "Stopped",
+    # EksClusterAutoscalerStack: how often it looks for pending pods, and how
+    # long a node has to be unneeded (or new) before it is removed
+    "cluster_autoscaler": False,
+    "cluster_autoscaler_scan_interval": "10s",
+    "cluster_autoscaler_scale_down_delay": "10m",
+    "cluster_autoscaler_scale_down_unneeded": "10m"
+}
+
+# Allowed values for switches that take one of a fixed set
+CHOICES = {
+    "wiring": ("exports", "both", "ssm"),
+    "identity_mode": ("stacks", "merged", "nested"),
+    "nat_strategy": ("single", "per_az"),
+    "ip_family": ("ipv4", "ipv6"),
+    "dataplane": ("iptables", "ipvs", "cilium"),
+    "storage_profile": ("ebs", "nvme"),
+    "node_image": ("eks", "image_builder"),
+    "scheduler_warm_pool_state": ("Stopped", "Hibernated", "Running"),
+    "scheduler_capacity_type": ("ON_DEMAND", "SPOT"),
+    "hello_capacity_type": ("ON_DEMAND", "SPOT"),
+    "scheduler_architecture": ("x86_64", "arm64"),
+    "hello_architecture": ("x86_64", "arm64")
+}
+
+
+def get(scope, key):
+    """Context value for key, or its default."""
+    value = scope.node.try_get_context(key)
+    if value is None:
+        value = DEFAULTS[key]
+    if key in CHOICES and value not in CHOICES[key]:
+        raise ValueError(
+            f"Invalid value {value!r} for context '{key}'; expected one of {', '.join(CHOICES[key])}"
+        )
+    return value
+
+
+def flag(scope, key):
+    """Boolean context value; -c values arrive as strings."""
+    value = get(scope, key)
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes", "on")
+    return bool(value)
+
+
+def number(scope, key):
+    """Integer context value; -c values arrive as strings."""
+    return int(get(scope, key))
+
+
+def string_list(scope, key):
+    """List context value; -c values arrive as comma-separated strings."""
+    value = get(scope, key)
+    if isinstance(value, str):
+        value = [item.strip() for item in value.split(",") if item.strip()]
+    return value
+
+
+def string_map(scope, key):
+    """Mapping context value; -c values arrive as "key=value,key=value" strings."""
+    value = get(scope, key)
+    if isinstance(value, str):
+        value = dict(
+            item.strip().split("=", 1) for item in value.split(",") if item.strip()
+        )
+    return value
@@ -0,0 +1,205 @@
+"""Seekable OCI (SOCI) lazy loading (-c soci=true).
+
+A container normally starts only after its whole image is pulled and
+unpacked. The SOCI snapshotter starts it from a SOCI index (a table of
+contents per layer) and fetches file contents from the registry on demand.
+Images without an index are pulled as before.
+
+Indexes: EksSociIndexStack runs a CodeBuild job for every tagged push to
+soci_repositories (an EventBridge rule on ECR push events). The job pulls the
+image, creates the index with `soci create` and pushes it next to the image as
+an OCI referrer. Only layers of at least min_layer_size bytes get one; small
+layers are cheaper to pull whole. Images pushed before the stack existed need
+one build each (SociIndexBuildCommand output).
+
+`soci create` writes version 1 index manifests, which SOCI_VERSION still
+builds but deprecates; newer snapshotters ignore them unless the soci_v1 pull
+mode is on. CONFIG turns it on explicitly, so the nodes keep lazy loading the
+indexes the job pushes. Version 2 indexes would need `soci convert`, which
+pushes a new image under its own tag instead of a referrer.
+
+Nodes: install_commands() downloads the SOCI_VERSION release and checks it
+against soci_release_sha256 (one SHA-256 per architecture, from the release's
+.sha256sum files) before anything is unpacked. node_setup() runs it from user
+data, writes CONFIG and UNIT and starts the snapshotter ahead of containerd.
+On the pipeline AMI (-c node_image=image_builder) component_document() has
+baked the same files in and enabled the unit at build time, so the nodes
+download nothing. containerd_config() makes it the CRI snapshotter. The
+kubelet sends image pulls through it (imageServiceEndpoint, kubelet_config())
+so it can fetch with the pull credentials (CRI keychain). Karpenter nodes get
+the same through their userData. Images pre-pulled into the AMI
+(image_cache.py) are unpacked for overlayfs, so nodes using SOCI pull them
+again.
+"""
+import json
+
+from eks_vpc_cdk import image_cache, node_capacity, settings
+
+# Same release for the indexer and the snapshotter; indexes are version 1
+# index manifests, found through the registry's referrers API
+SOCI_VERSION = "0.9.0"
+RELEASE_URL = (
+    f"https://github.com/awslabs/soci-snapshotter/releases/download/v{SOCI_VERSION}/"
+    f"soci-snapshotter-{SOCI_VERSION}-linux-{{arch}}.tar.gz"
+)
+
+SNAPSHOTTER_SOCKET = "/run/soci-snapshotter-grpc/soci-snapshotter-grpc.sock"
+SNAPSHOTTER_UNIT = "soci-snapshotter.service"
+
+# Snapshotter configuration: the CRI keychain for pull credentials, and the
+# soci_v1 pull mode for the indexes `soci create` builds
+CONFIG = """[pull_modes.soci_v1]
+enable = true
+
+[cri_keychain]
+enable_keychain = true
+image_service_path = "/run/containerd/containerd.sock"
+"""
+
+# Ordered before nodeadm-run as well as containerd: nodeadm starts containerd
+# itself, and the unit must also hold when it is enabled in the AMI instead
+# of being started from user data
+UNIT = """[Unit]
+Description=SOCI snapshotter
+Before=containerd.service nodeadm-run.service
+
+[Service]
+ExecStart=/usr/local/bin/soci-snapshotter-grpc
+Restart=always
+
+[Install]
+WantedBy=multi-user.target
+"""
+
+# CodeBuild image with dnf for containerd
+BUILD_IMAGE = "aws/codebuild/amazonlinux-x86_64-standard:5.0"
+
+
+def enabled(scope):
+    return settings.flag(scope, "soci")
+
+
+def release_checksums(scope):
+    """soci_release_sha256 for every architecture that installs the release:
+    amd64 for the indexer and the x86_64 nodes, arm64 for Graviton ones."""
+    checksums = settings.string_map(scope, "soci_release_sha256") or {}
+    architectures = ["amd64"]
+    if any(node_capacity.architecture(scope, node_group) == "arm64" for node_group in node_capacity.NODE_GROUPS):
+        architectures.append("arm64")
+    missing = [arch for arch in architectures if arch not in checksums]
+    if missing:
+        raise ValueError(
+            f"soci=true requires soci_release_sha256 for {', '.join(missing)} "
+            f"(-c soci_release_sha256=amd64=<sha256>,arm64=<sha256>, see {RELEASE_URL.format(arch='<arch>')}.sha256sum)"
+        )
+    return {arch: checksums[arch] for arch in architectures}
+
+
+def install_commands(checksums):
+    """Shell commands that install soci and soci-snapshotter-grpc into
+    /usr/local/bin; the download is checked before it is unpacked."""
+    cases = " ".join(f"{arch}) SOCI_SHA256={checksum};;" for arch, checksum in checksums.items())
+    return [
+        "ARCH=$(uname -m | sed 's/x86_64/amd64/;s/aarch64/arm64/')",
+        f'case $ARCH in {cases} *) echo "no soci_release_sha256 for $ARCH" >&2; exit 1;; esac',
+        f"curl -sSfL -o /tmp/soci.tar.gz {RELEASE_URL.format(arch='$ARCH')}",
+        'echo "$SOCI_SHA256  /tmp/soci.tar.gz" | sha256sum -c - || exit 1',
+        "tar -xzf /tmp/soci.tar.gz -C /usr/local/bin soci soci-snapshotter-grpc",
+        "rm /tmp/soci.tar.gz"
+    ]
+
+
+def snapshotter_commands(checksums):
+    """Shell commands that install the snapshotter with CONFIG and UNIT."""
+    return install_commands(checksums) + [
+        "mkdir -p /etc/soci-snapshotter-grpc",
+        "cat <<'EOF' > /etc/soci-snapshotter-grpc/config.toml",
+        *CONFIG.splitlines(),
+        "EOF",
+        f"cat <<'EOF' > /etc/systemd/system/{SNAPSHOTTER_UNIT}",
+        *UNIT.splitlines(),
+        "EOF",
+        "systemctl daemon-reload"
+    ]
+
+
+def node_setup(scope):
+    """User data lines that install and start the snapshotter, or "" without
+    SOCI or when the pipeline AMI already has it."""
+    if not enabled(scope) or image_cache.custom_ami(scope):
+        return ""
+    commands = snapshotter_commands(release_checksums(scope)) + [f"systemctl enable --now {SNAPSHOTTER_UNIT}"]
+    # cloud-final runs user data before nodeadm-run starts containerd
+    header = "# SOCI snapshotter (-c soci=true), started before nodeadm-run starts containerd"
+    return "\n".join([header, *commands]) + "\n\n"
+
+
+def component_document(scope):
+    """Image Builder component (JSON, which is valid YAML) that bakes the
+    snapshotter into the pipeline AMI; the unit starts on every boot."""
+    return json.dumps({
+        "name": "prod-eks-soci-snapshotter",
+        "description": f"Install soci-snapshotter {SOCI_VERSION}",
+        "schemaVersion": 1.0,
+        "phases": [
+            {
+                "name": "build",
+                "steps": [
+                    {
+                        "name": "InstallSnapshotter",
+                        "action": "ExecuteBash",
+                        "inputs": {
+                            "commands": snapshotter_commands(release_checksums(scope)) + [
+                                f"systemctl enable {SNAPSHOTTER_UNIT}"
+                            ]
+                        }
+                    }
+                ]
+            }
+        ]
+    }, indent=2)
+
+
+def push_event_pattern(repositories):
+    """EventBridge pattern for tagged image pushes to repositories; the index
+    itself is pushed untagged, so it does not trigger another build."""
+    return {
+        "source": ["aws.ecr"],
+        "detail-type": ["ECR Image Action"],
+        "detail": {
+            "action-type": ["PUSH"],
+            "result": ["SUCCESS"],
+            "repository-name": repositories,
+            "image-tag": [{"exists": True}]
+        }
+    }
+
+
+def buildspec(min_layer_size, checksums):
+    """CodeBuild buildspec (JSON, which is valid YAML) that indexes
+    $IMAGE_REPOSITORY:$IMAGE_TAG in this account's registry with version 1
+    index manifests (see CONFIG)."""
+    return json.dumps({
+        "version": 0.2,
+        "phases": {
+            "install": {
+                "commands": [
+                    "dnf install -y containerd",
+                    "nohup containerd > /tmp/containerd.log 2>&1 &",
+                    *install_commands({"amd64": checksums["amd64"]}),
+                    "until ctr version > /dev/null 2>&1; do sleep 1; done"
+                ]
+            },
+            "build": {
+                "commands": [
+                    "ACCOUNT=$(aws sts get-caller-identity --query Account --output text)",
+                    "IMAGE=$ACCOUNT.dkr.ecr.$AWS_REGION.amazonaws.com/$IMAGE_REPOSITORY:$IMAGE_TAG",
+                    "PASSWORD=$(aws ecr get-login-password)",
+                    # The build container's overlay root cannot hold overlayfs snapshots
+                    'ctr image pull --snapshotter native --user "AWS:$PASSWORD" $IMAGE',
+                    f"soci create --min-layer-size {min_layer_size} $IMAGE",
+                    'soci push --user "AWS:$PASSWORD" $IMAGE'
+                ]
+            }
+        }
+    }, indent=2)
@@ -0,0 +1,62 @@
+"""Cross-stack identifiers through SSM parameters instead of exports.
+
+With `-c wiring=ssm` the VPC, cluster and launch template stacks publish
+their identifiers under PARAMETER_PREFIX and consumers read them back through
+AWS::SSM::Parameter::Value<String> template parameters. No Fn::ImportValue is created,
+so producer stacks can be updated without export locks; consumers pick up
+new values the next time they are deployed.
+
+With the default `wiring=exports` the producer's token is returned as is.
+`wiring=both` publishes the parameters but keeps consumers on exports; it is
+the intermediate step when migrating a deployed environment.
+"""
+from aws_cdk import aws_ssm as ssm
+
+from eks_vpc_cdk import settings
+
+PARAMETER_PREFIX = "/prod-eks"
+
+# Parameter names (below PARAMETER_PREFIX) for everything shared across stacks
+VPC_ID = "/vpc/id"
+VPC_IPV6_CIDR = "/vpc/ipv6-cidr"
+PUBLIC_SUBNET_ID = "/vpc/public-subnet/{index}"
+PRIVATE_SUBNET_ID = "/vpc/private-subnet/{index}"
+POD_SUBNET_ID = "/vpc/pod-subnet/{index}"
+CLUSTER_NAME = "/cluster/name"
+CLUSTER_PRIMARY_SECURITY_GROUP_ID = "/cluster/primary-security-group-id"
+CLUSTER_ENDPOINT = "/cluster/endpoint"
+CLUSTER_CERTIFICATE_AUTHORITY = "/cluster/certificate-authority"
+LAUNCH_TEMPLATE_ID = "/launch-template/id"
+ARM64_LAUNCH_TEMPLATE_ID = "/launch-template/arm64-id"
+FLEX_LAUNCH_TEMPLATE_ID = "/launch-template/flex-id"
+
+
+def decoupled(scope):
+    """Consumers read identifiers from SSM."""
+    return settings.get(scope, "wiring") == "ssm"
+
+
+def publishing(scope):
+    """Producers write identifiers to SSM."""
+    return settings.get(scope, "wiring") in ("ssm", "both")
+
+
+def _construct_id(name):
+    return "Param" + "".join(part.title() for part in name.replace("-", "/").split("/") if part)
+
+
+def publish(scope, name, value):
+    """Store value under name when SSM wiring is enabled."""
+    if publishing(scope):
+        ssm.StringParameter(
+            scope, _construct_id(name),
+            parameter_name=PARAMETER_PREFIX + name,
+            string_value=value
+        )
+
+
+def resolve(consumer, name, value):
+    """value itself, or a deploy-time lookup of name when SSM wiring is enabled."""
+    if decoupled(consumer):
+        return ssm.StringParameter.value_for_string_parameter(consumer, PARAMETER_PREFIX + name)
+    return value
@@ -0,0 +1,269 @@
+import importlib
+
+from eks_vpc_cdk import settings
+
+# Every stack in the app, keyed by construct id.
+#   module/class: where the stack class lives (imported only when the stack is built)
+#   refs:         constructor arguments that take another stack from this registry
+#   after:        deploy-order dependencies that are not passed to the constructor,
+#                 e.g. IAM roles that the stack looks up by name
+#   enabled_by:   optional stacks only: the settings flag that adds the stack to
+#                 the app (-c karpenter=true); it is also required to build the
+#                 stack through -c stacks=...
+#
+# Only list real dependencies here; redundant edges are dropped by
+# reduced_dependencies() so independent stacks can deploy in parallel.
+STACKS = {
+    # VPC, subnets, IGW, NAT and route tables
+    "EksVpcCdkStack": {
+        "module": "eks_vpc_cdk.eks_vpc_cdk_stack",
+        "class": "EksVpcCdkStack",
+        "refs": {},
+        "after": []
+    },
+    # IAM stacks have no dependencies; consumers look their roles up by name
+    "EksClusterRoleStack": {
+        "module": "eks_vpc_cdk.eks_cluster_role",
+        "class": "EksClusterRoleStack",
+        "refs": {},
+        "after": []
+    },
+    "EksNodeGroupRoleStack": {
+        "module": "eks_vpc_cdk.eks_nodegroup_role",
+        "class": "EksNodeGroupRoleStack",
+        "refs": {},
+        "after": []
+    },
+    "EksAdminPolicyStack": {
+        "module": "eks_vpc_cdk.eks_admin_policy",
+        "class": "EksAdminPolicyStack",
+        "refs": {},
+        "after": []
+    },
+    # EKS cluster needs the VPC and the prod-sre-eks-cluster-role
+    "EksClusterStack": {
+        "module": "eks_vpc_cdk.eks_create_cluster",
+        "class": "EksClusterStack",
+        "refs": {"vpc_stack": "EksVpcCdkStack"},
+        "after": ["EksClusterRoleStack"]
+    },
+    # Launch template needs the cluster primary security group
+    "EksLaunchTemplateStack": {
+        "module": "eks_vpc_cdk.eks_launch_template",
+        "class": "EksLaunchTemplateStack",
+        "refs": {"eks_cluster_stack": "EksClusterStack"},
+        "after": []
+    },
+    # Node group (prod-scheduler-v2)
+    "EksNodeGroupSchedulerStack": {
+        "module": "eks_vpc_cdk.eks_nodegroup_scheduler",
+        "class": "EksNodeGroupSchedulerStack",
+        "refs": {
+            "vpc_stack": "EksVpcCdkStack",
+            "eks_cluster_stack": "EksClusterStack",
+            "launch_template_stack": "EksLaunchTemplateStack"
+        },
+        "after": ["EksNodeGroupRoleStack"]
+    },
+    # Node group (prod-hello-ng)
+    "EksNodeGroupHelloStack": {
+        "module": "eks_vpc_cdk.eks_nodegroup_hello",
+        "class": "EksNodeGroupHelloStack",
+        "refs": {
+            "vpc_stack": "EksVpcCdkStack",
+            "eks_cluster_stack": "EksClusterStack",
+            "launch_template_stack": "EksLaunchTemplateStack"
+        },
+        "after": ["EksNodeGroupRoleStack"]
+    },
+    # Kubernetes resources (namespace, deployment, service); the deployment
+    # is pinned to the prod-hello-ng nodes
+    "EksK8sResourcesStack": {
+        "module": "eks_vpc_cdk.eks_k8s_resources",
+        "class": "EksK8sResourcesStack",
+        "refs": {"eks_cluster_stack": "EksClusterStack"},
+        "after": ["EksNodeGroupHelloStack"]
+    },
+    # Internal ALB for prod-hello (IP targets, so it only needs the VPC)
+    "EksAlbStack": {
+        "module": "eks_vpc_cdk.eks_alb",
+        "class": "EksAlbStack",
+        "refs": {"vpc_stack": "EksVpcCdkStack"},
+        "after": []
+    },
+    # Karpenter controller role, interruption queue, NodePool/EC2NodeClass
+    # (optional); nodes use prod-sre-workernode-role
+    "EksKarpenterStack": {
+        "module": "eks_vpc_cdk.eks_karpenter",
+        "class": "EksKarpenterStack",
+        "refs": {"eks_cluster_stack": "EksClusterStack"},
+        "after": ["EksNodeGroupRoleStack"],
+        "enabled_by": "karpenter"
+    },
+    # Cluster Autoscaler role and Helm values (optional); it runs on the node
+    # groups it scales
+    "EksClusterAutoscalerStack": {
+        "module": "eks_vpc_cdk.eks_cluster_autoscaler",
+        "class": "EksClusterAutoscalerStack",
+        "refs": {"eks_cluster_stack": "EksClusterStack"},
+        "after": ["EksNodeGroupSchedulerStack", "EksNodeGroupHelloStack"],
+        "enabled_by": "cluster_autoscaler"
+    },
+    # Image Builder pipeline for a node AMI with pre-pulled images (optional);
+    # EksLaunchTemplateStack reads the AMI from SSM, so deploy this one first
+    "EksImageBuilderStack": {
+        "module": "eks_vpc_cdk.eks_image_builder",
+        "class": "EksImageBuilderStack",
+        "refs": {"vpc_stack": "EksVpcCdkStack"},
+        "after": [],
+        "enabled_by": "image_builder"
+    },
+    # SOCI index builds for pushed images (optional); independent of the cluster
+    "EksSociIndexStack": {
+        "module": "eks_vpc_cdk.eks_soci_index",
+        "class": "EksSociIndexStack",
+        "refs": {},
+        "after": [],
+        "enabled_by": "soci"
+    }
+}
+
+
+# With -c identity_mode=merged|nested the IAM stacks are built as one stack
+IDENTITY_STACK = "EksIdentityStack"
+IDENTITY_MODULE = "eks_vpc_cdk.eks_identity"
+IDENTITY_MEMBERS = ("EksClusterRoleStack", "EksNodeGroupRoleStack", "EksAdminPolicyStack")
+
+
+def deployed_as(stack_id, identity_mode="stacks"):
+    """Name of the CloudFormation stack that holds stack_id's resources."""
+    if identity_mode != "stacks" and stack_id in IDENTITY_MEMBERS:
+        return IDENTITY_STACK
+    return stack_id
+
+
+def dependencies(stack_id):
+    """Stack ids that stack_id directly depends on (constructor refs first)."""
+    spec = STACKS[stack_id]
+    deps = list(spec["refs"].values())
+    deps += [dep for dep in spec["after"] if dep not in deps]
+    return deps
+
+
+def reachable(stack_id):
+    """Every stack that stack_id depends on, directly or transitively."""
+    seen = set()
+    pending = list(dependencies(stack_id))
+    while pending:
+        dep = pending.pop()
+        if dep not in seen:
+            seen.add(dep)
+            pending.extend(dependencies(dep))
+    return seen
+
+
+def reduced_dependencies(stack_id):
+    """Direct dependencies minus those already implied through another dependency.
+
+    This is the transitive reduction of the stack graph at stack_id.
+    """
+    deps = dependencies(stack_id)
+    implied = set()
+    for dep in deps:
+        implied |= reachable(dep)
+    return [dep for dep in deps if dep not in implied]
+
+
+def default_stacks():
+    """Stacks built when none are requested: everything but the optional stacks."""
+    return [stack_id for stack_id, spec in STACKS.items() if "enabled_by" not in spec]
+
+
+def enabled_optional_stacks(app):
+    """Optional stacks whose enabled_by flag is set."""
+    return [
+        stack_id for stack_id, spec in STACKS.items()
+        if "enabled_by" in spec and settings.flag(app, spec["enabled_by"])
+    ]
+
+
+def requested_stacks(app):
+    """Stack ids from the `stacks` context value (-c stacks=A,B), or None for the
+    default stacks. Enabled optional stacks are added to the default stacks."""
+    value = app.node.try_get_context("stacks")
+    if value is None or value in ("", "*", "all"):
+        optional = enabled_optional_stacks(app)
+        return default_stacks() + optional if optional else None
+    if isinstance(value, str):
+        value = value.split(",")
+    names = []
+    for name in (name.strip() for name in value):
+        if name == IDENTITY_STACK:
+            names += IDENTITY_MEMBERS
+        elif name:
+            names.append(name)
+    unknown = [name for name in names if name not in STACKS]
+    if unknown:
+        raise ValueError(
+            f"Unknown stack(s) in 'stacks' context: {', '.join(unknown)}. "
+            f"Known stacks: {', '.join(STACKS)}, {IDENTITY_STACK}"
+        )
+    return names
+
+
+def resolve(names=None):
+    """Requested stacks plus everything they depend on, in construction order."""
+    if names is None:
+        names = default_stacks()
+
+    ordered = []
+    visiting = set()
+
+    def visit(stack_id):
+        if stack_id in ordered:
+            return
+        if stack_id in visiting:
+            raise ValueError(f"Dependency cycle through {stack_id}")
+        visiting.add(stack_id)
+        for dep in dependencies(stack_id):
+            visit(dep)
+        visiting.discard(stack_id)
+        ordered.append(stack_id)
+
+    for name in names:
+        visit(name)
+    return ordered
+
+
+def build_stack(app, stack_id, built):
+    """Import and construct one stack; its dependencies must already be in `built`."""
+    identity_mode = settings.get(app, "identity_mode")
+    target = deployed_as(stack_id, identity_mode)
+    if target != stack_id:
+        # First IAM member builds EksIdentityStack; the others share it
+        if target not in built:
+            identity_class = importlib.import_module(IDENTITY_MODULE).EksIdentityStack
+            built[target] = identity_class(app, target, identity_mode=identity_mode)
+        return built[target]
+
+    spec = STACKS[stack_id]
+    if "enabled_by" in spec and not settings.flag(app, spec["enabled_by"]):
+        raise ValueError(f"{stack_id} is optional; enable it with -c {spec['enabled_by']}=true")
+    stack_class = getattr(importlib.import_module(spec["module"]), spec["class"])
+    kwargs = {arg: built[ref] for arg, ref in spec["refs"].items()}
+    stack = stack_class(app, stack_id, **kwargs)
+    for dep in reduced_dependencies(stack_id):
+        stack.add_dependency(built[dep])
+    return stack
+
+
+def build(app, names=None):
+    """Construct the requested stacks (all of them by default) and their dependencies.
+
+    Returns {stack id: stack}; with identity_mode=merged|nested the IAM stack ids
+    and EksIdentityStack all map to the same EksIdentityStack.
+    """
+    built = {}
+    for stack_id in resolve(names):
+        built[stack_id] = build_stack(app, stack_id, built)
+    return built
@@ -0,0 +1,258 @@
+"""Content-hash cache of synthesized stack templates.
+
+Each stack is fingerprinted from its registry entry, the source of its module
+and every eks_vpc_cdk module that module imports, the app context (cdk.json
+feature flags and -c values) and the CDK library versions. The modules of the
+stacks that reference it are included too, because their references decide
+which exports the stack's template carries.
+
+Stacks whose fingerprint matches the cache are not rebuilt. Their template,
+asset manifest and manifest.json artifacts are copied back from the cache, so
+`cdk deploy` and `cdk diff` still find them, and they are reported as "no
+deploy needed". A
+rebuilt stack only needs a deploy when its template actually differs from the
+cached one.
+
+Enable it with `-c synth_cache=.synth-cache`; the status of every stack is
+written to cdk.out/synth-cache.json.
+"""
+import ast
+import hashlib
+import importlib.metadata
+import importlib.util
+import json
+import os
+import shutil
+
+from eks_vpc_cdk import stack_registry
+
+PACKAGE = "eks_vpc_cdk"
+
+# Context keys that never change a template: stack selection, the cache
+# itself and the aws:cdk:* values the CLI sets per command
+IGNORED_CONTEXT = ("stacks", "synth_cache")
+
+LIBRARIES = ("aws-cdk-lib", "constructs")
+
+INDEX_FILE = "index.json"
+STATUS_FILE = "synth-cache.json"
+MANIFEST_FILE = "manifest.json"
+
+
+def _module_path(module_name):
+    return importlib.util.find_spec(module_name).origin
+
+
+def _package_imports(module_name):
+    """eks_vpc_cdk modules imported by module_name."""
+    with open(_module_path(module_name)) as f:
+        tree = ast.parse(f.read())
+
+    imports = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module == PACKAGE:
+            names = [f"{PACKAGE}.{alias.name}" for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names = [node.module]
+        else:
+            continue
+        imports.update(
+            name for name in names
+            if name.startswith(f"{PACKAGE}.") and importlib.util.find_spec(name)
+        )
+    return imports
+
+
+def module_closure(module_name):
+    """module_name plus every eks_vpc_cdk module it imports, transitively."""
+    seen = set()
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        if name not in seen:
+            seen.add(name)
+            pending.extend(_package_imports(name))
+    return sorted(seen)
+
+
+def relevant_context(context):
+    return {
+        key: value for key, value in sorted(context.items())
+        if key not in IGNORED_CONTEXT and not key.startswith("aws:cdk:")
+    }
+
+
+def ref_dependents(stack_id):
+    """Stacks that take stack_id as a constructor argument."""
+    return [
+        other for other, spec in stack_registry.STACKS.items()
+        if stack_id in spec["refs"].values()
+    ]
+
+
+def fingerprint(stack_id, context):
+    """Hex digest of everything that can change stack_id's template."""
+    digest = hashlib.sha256()
+    spec = stack_registry.STACKS[stack_id]
+    digest.update(json.dumps(spec, sort_keys=True).encode())
+    digest.update(json.dumps(stack_registry.reduced_dependencies(stack_id)).encode())
+
+    modules = set(module_closure(spec["module"]))
+    if stack_id in stack_registry.IDENTITY_MEMBERS:
+        # identity_mode=merged|nested builds it through EksIdentityStack
+        modules.update(module_closure(stack_registry.IDENTITY_MODULE))
+    for dependent in ref_dependents(stack_id):
+        modules.update(module_closure(stack_registry.STACKS[dependent]["module"]))
+    for module_name in sorted(modules):
+        digest.update(module_name.encode())
+        with open(_module_path(module_name), "rb") as f:
+            digest.update(f.read())
+
+    digest.update(json.dumps(relevant_context(context), sort_keys=True, default=str).encode())
+    for library in LIBRARIES:
+        digest.update(f"{library}=={importlib.metadata.version(library)}".encode())
+    return digest.hexdigest()
+
+
+def fingerprints(context):
+    """Fingerprints for every stack in the registry."""
+    return {stack_id: fingerprint(stack_id, context) for stack_id in stack_registry.STACKS}
+
+
+def _load_index(cache_dir):
+    path = os.path.join(cache_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _template_file(stack_id):
+    return f"{stack_id}.template.json"
+
+
+def _artifacts_file(stack_id):
+    return f"{stack_id}.artifacts.json"
+
+
+def _cached(cache_dir, stack_name):
+    return all(
+        os.path.exists(os.path.join(cache_dir, name))
+        for name in (_template_file(stack_name), _artifacts_file(stack_name))
+    )
+
+
+def _stack_artifacts(manifest, stack_name):
+    """The stack's cloud assembly artifact and that of its asset manifest."""
+    return {
+        artifact_id: artifact for artifact_id, artifact in manifest.get("artifacts", {}).items()
+        if artifact_id in (stack_name, f"{stack_name}.assets")
+    }
+
+
+def _asset_files(artifacts):
+    return [
+        artifact["properties"]["file"] for artifact in artifacts.values()
+        if artifact.get("type") == "cdk:asset-manifest"
+    ]
+
+
+def _copy(source_dir, target_dir, stack_name, artifacts):
+    for name in [_template_file(stack_name)] + _asset_files(artifacts):
+        shutil.copyfile(os.path.join(source_dir, name), os.path.join(target_dir, name))
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def changed_stacks(cache_dir, stack_fingerprints, names=None, identity_mode="stacks"):
+    """Requested stacks whose fingerprint or template is missing from the cache."""
+    index = _load_index(cache_dir)
+    changed = [
+        stack_id for stack_id in stack_registry.resolve(names)
+        if index.get(stack_id) != stack_fingerprints[stack_id]
+        or not _cached(cache_dir, stack_registry.deployed_as(stack_id, identity_mode))
+    ]
+    # Stacks sharing a template (EksIdentityStack) are rebuilt together
+    rebuilt = {stack_registry.deployed_as(stack_id, identity_mode) for stack_id in changed}
+    return [
+        stack_id for stack_id in stack_registry.resolve(names)
+        if stack_registry.deployed_as(stack_id, identity_mode) in rebuilt
+    ]
+
+
+def stacks_to_build(changed, names=None):
+    """Changed stacks plus the requested stacks referencing them, so that every
+    changed stack is synthesized with its complete set of exports."""
+    requested = stack_registry.resolve(names)
+    build = list(changed)
+    for stack_id in changed:
+        build += [
+            dependent for dependent in ref_dependents(stack_id)
+            if dependent in requested and dependent not in build
+        ]
+    return build
+
+
+def update(cache_dir, outdir, stack_fingerprints, changed, names=None, identity_mode="stacks"):
+    """Store rebuilt stacks, restore cached ones into outdir (templates, asset
+    manifests and their manifest.json artifacts) and write the per-stack
+    status (keyed by deployed stack name) to outdir/synth-cache.json."""
+    os.makedirs(cache_dir, exist_ok=True)
+    index = _load_index(cache_dir)
+    status = {}
+
+    manifest_path = os.path.join(outdir, MANIFEST_FILE)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    stack_ids = stack_registry.resolve(names)
+    stack_ids += [stack_id for stack_id in stack_registry.resolve(stacks_to_build(changed, names))
+                  if stack_id not in stack_ids]
+    deployed = {}
+    for stack_id in stack_ids:
+        deployed.setdefault(stack_registry.deployed_as(stack_id, identity_mode), []).append(stack_id)
+
+    for stack_name, members in deployed.items():
+        digests = [stack_fingerprints[member] for member in members]
+        digest = digests[0] if len(digests) == 1 else hashlib.sha256("".join(digests).encode()).hexdigest()
+        cached = os.path.join(cache_dir, _template_file(stack_name))
+        synthesized = os.path.join(outdir, _template_file(stack_name))
+        cached_artifacts = os.path.join(cache_dir, _artifacts_file(stack_name))
+        if members[0] in changed:
+            deploy_needed = not os.path.exists(cached) or _read(cached) != _read(synthesized)
+            artifacts = _stack_artifacts(manifest, stack_name)
+            _copy(outdir, cache_dir, stack_name, artifacts)
+            with open(cached_artifacts, "w") as f:
+                json.dump(artifacts, f, indent=2)
+            for member in members:
+                index[member] = stack_fingerprints[member]
+            status[stack_name] = {"fingerprint": digest, "source": "synth", "deploy_needed": deploy_needed}
+        elif not _cached(cache_dir, stack_name):
+            # Outside the requested stacks and never cached; nothing to compare with
+            status[stack_name] = {"fingerprint": digest, "source": "synth", "deploy_needed": True}
+        else:
+            # Never built, or only built because a changed stack depends on
+            # it (and then possibly with fewer exports): the cached template
+            # is the complete, current one. Its artifacts replace any from this
+            # synth, so the template asset hash matches the restored template.
+            with open(cached_artifacts) as f:
+                artifacts = json.load(f)
+            _copy(cache_dir, outdir, stack_name, artifacts)
+            manifest.setdefault("artifacts", {}).update(artifacts)
+            status[stack_name] = {"fingerprint": digest, "source": "cache", "deploy_needed": False}
+
+    if manifest:
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+    with open(os.path.join(cache_dir, INDEX_FILE), "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    with open(os.path.join(outdir, STATUS_FILE), "w") as f:
+        json.dump(status, f, indent=2)
+    return status
@@ -0,0 +1,206 @@
+"""Offline structural diff of synthesized templates against a stored baseline.
+
+Compares every <stack>.template.json in a fresh cdk.out with the same file in
+a baseline directory (e.g. the cdk.out of the last deployed commit), resource
+by resource, without calling CloudFormation. CDK metadata and list ordering
+that CloudFormation ignores are normalized away first.
+
+    python -m eks_vpc_cdk.template_diff --baseline baseline.out [--out cdk.out] [--fail-on-replacement]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+from eks_vpc_cdk import stack_registry
+
+UNCHANGED = "unchanged"
+UPDATE = "update-in-place"
+REPLACEMENT = "replacement"
+NEW = "new"
+REMOVED = "removed"
+
+# CDK bookkeeping that never changes deployed infrastructure
+IGNORED_RESOURCES = ("CDKMetadata",)
+IGNORED_PARAMETERS = ("BootstrapVersion",)
+IGNORED_RULES = ("CheckBootstrapVersion",)
+IGNORED_CONDITIONS = ("CDKMetadataAvailable",)
+
+# Properties whose order CloudFormation (or the service) doesn't care about
+UNORDERED_PROPERTIES = (
+    "DependsOn", "Tags", "SubnetIds", "Subnets", "SecurityGroupIds",
+    "SecurityGroups", "ManagedPolicyArns", "RouteTableIds"
+)
+
+# Property paths whose change makes CloudFormation replace the resource,
+# for the resource types used by this app
+REPLACEMENT_PROPERTIES = {
+    "AWS::EC2::VPC": ["CidrBlock", "InstanceTenancy"],
+    "AWS::EC2::VPCCidrBlock": ["AmazonProvidedIpv6CidrBlock", "CidrBlock", "VpcId"],
+    "AWS::EC2::Subnet": ["AvailabilityZone", "AvailabilityZoneId", "CidrBlock", "VpcId"],
+    "AWS::EC2::RouteTable": ["VpcId"],
+    "AWS::EC2::Route": ["RouteTableId", "DestinationCidrBlock", "DestinationIpv6CidrBlock"],
+    "AWS::EC2::SubnetRouteTableAssociation": ["RouteTableId", "SubnetId"],
+    "AWS::EC2::EIP": ["Domain"],
+    "AWS::EC2::NatGateway": ["AllocationId", "ConnectivityType", "SubnetId"],
+    "AWS::EC2::SecurityGroup": ["GroupDescription", "GroupName", "VpcId"],
+    "AWS::EC2::LaunchTemplate": ["LaunchTemplateName"],
+    "AWS::EKS::Cluster": [
+        "Name", "RoleArn", "KubernetesNetworkConfig", "EncryptionConfig",
+        "ResourcesVpcConfig.SubnetIds", "ResourcesVpcConfig.SecurityGroupIds"
+    ],
+    "AWS::EKS::Nodegroup": [
+        "AmiType", "CapacityType", "ClusterName", "DiskSize", "InstanceTypes",
+        "NodeRole", "NodegroupName", "RemoteAccess", "Subnets"
+    ],
+    "AWS::IAM::Role": ["Path", "RoleName"],
+    "AWS::ElasticLoadBalancingV2::LoadBalancer": ["Name", "Scheme", "Type"],
+    "AWS::ElasticLoadBalancingV2::TargetGroup": [
+        "IpAddressType", "Name", "Port", "Protocol", "ProtocolVersion", "TargetType", "VpcId"
+    ],
+    "AWS::ElasticLoadBalancingV2::Listener": ["LoadBalancerArn"]
+}
+
+
+def _sort_key(value):
+    return json.dumps(value, sort_keys=True)
+
+
+def normalize(value, key=None):
+    """Drop metadata and sort order-insensitive lists, recursively."""
+    if isinstance(value, dict):
+        return {k: normalize(v, k) for k, v in value.items() if k != "Metadata"}
+    if isinstance(value, list):
+        items = [normalize(item) for item in value]
+        if key in UNORDERED_PROPERTIES:
+            items.sort(key=_sort_key)
+        return items
+    return value
+
+
+def normalize_template(template):
+    template = normalize(template)
+    for section, ignored in (
+        ("Resources", IGNORED_RESOURCES),
+        ("Parameters", IGNORED_PARAMETERS),
+        ("Rules", IGNORED_RULES),
+        ("Conditions", IGNORED_CONDITIONS)
+    ):
+        entries = {k: v for k, v in template.get(section, {}).items() if k not in ignored}
+        if entries:
+            template[section] = entries
+        else:
+            template.pop(section, None)
+    return template
+
+
+def _at_path(properties, path):
+    value = properties
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def diff_resource(old, new):
+    """UNCHANGED, UPDATE or REPLACEMENT plus the changed property names."""
+    if old == new:
+        return UNCHANGED, []
+    if old.get("Type") != new.get("Type"):
+        return REPLACEMENT, ["Type"]
+
+    old_props, new_props = old.get("Properties", {}), new.get("Properties", {})
+    changed = sorted(
+        name for name in set(old_props) | set(new_props)
+        if old_props.get(name) != new_props.get(name)
+    )
+    replacing = [
+        path for path in REPLACEMENT_PROPERTIES.get(new.get("Type"), [])
+        if _at_path(old_props, path) != _at_path(new_props, path)
+    ]
+    if replacing:
+        return REPLACEMENT, replacing
+    # DependsOn, DeletionPolicy, UpdatePolicy, ... only changes
+    return UPDATE, changed or sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+
+
+def diff_template(old, new):
+    """Stack classification plus per-resource changes between two templates."""
+    if old is None:
+        return {"status": NEW, "resources": {}}
+    if new is None:
+        return {"status": REMOVED, "resources": {}}
+
+    old, new = normalize_template(old), normalize_template(new)
+    old_resources, new_resources = old.get("Resources", {}), new.get("Resources", {})
+    resources = {}
+    for logical_id in sorted(set(old_resources) | set(new_resources)):
+        if logical_id not in old_resources:
+            resources[logical_id] = {"change": "added"}
+        elif logical_id not in new_resources:
+            resources[logical_id] = {"change": "removed"}
+        else:
+            change, properties = diff_resource(old_resources[logical_id], new_resources[logical_id])
+            if change != UNCHANGED:
+                resources[logical_id] = {"change": change, "properties": properties}
+
+    if any(entry["change"] == REPLACEMENT for entry in resources.values()):
+        status = REPLACEMENT
+    elif resources or old != new:
+        # New/removed resources, or outputs, parameters, conditions
+        status = UPDATE
+    else:
+        status = UNCHANGED
+    return {"status": status, "resources": resources}
+
+
+def _load_templates(directory):
+    templates = {}
+    for path in glob.glob(os.path.join(directory, "*.template.json")):
+        with open(path) as f:
+            templates[os.path.basename(path)[:-len(".template.json")]] = json.load(f)
+    return templates
+
+
+def diff(baseline_dir, out_dir):
+    """Classify every stack and list the ones to deploy, in deploy order."""
+    baseline, fresh = _load_templates(baseline_dir), _load_templates(out_dir)
+    order = stack_registry.resolve(list(stack_registry.STACKS))
+    names = [name for name in order if name in baseline or name in fresh]
+    names += sorted(name for name in set(baseline) | set(fresh) if name not in order)
+
+    stacks = {name: diff_template(baseline.get(name), fresh.get(name)) for name in names}
+    return {
+        "stacks": stacks,
+        "deploy": [
+            name for name, result in stacks.items()
+            if result["status"] in (NEW, UPDATE, REPLACEMENT)
+        ],
+        "replacements": [
+            f"{name}/{logical_id}"
+            for name, result in stacks.items()
+            for logical_id, entry in result["resources"].items()
+            if entry["change"] == REPLACEMENT
+        ]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff cdk.out against a baseline without CloudFormation")
+    parser.add_argument("--baseline", required=True, help="Directory with the baseline *.template.json files")
+    parser.add_argument("--out", default="cdk.out", help="Freshly synthesized cloud assembly (default: cdk.out)")
+    parser.add_argument("--fail-on-replacement", action="store_true",
+                        help="Exit with status 2 when any resource would be replaced")
+    args = parser.parse_args(argv)
+
+    result = diff(args.baseline, args.out)
+    print(json.dumps(result, indent=2))
+    if args.fail_on_replacement and result["replacements"]:
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Size report for synthesized templates, checked against CloudFormation limits.
+
+app.py runs it after every synth, writes cdk.out/template-report.json and fails
+the synth when a stack crosses a threshold. Thresholds default to 80% of the
+CloudFormation hard limits; override them with context, e.g.
+
+    cdk synth -c template_limit_ratio=0.5
+    cdk synth -c 'template_limits={"outputs": 40, "template_bytes": 51200}'
+
+or run it against an existing assembly:
+
+    python -m eks_vpc_cdk.template_report [cdk.out]
+"""
+import glob
+import json
+import os
+import sys
+
+# CloudFormation hard limits per template
+HARD_LIMITS = {
+    "template_bytes": 1048576,  # template body uploaded through S3
+    "resources": 500,
+    "outputs": 200,
+    "parameters": 200,
+    "mappings": 200
+}
+
+DEFAULT_LIMIT_RATIO = 0.8
+
+LARGEST_PROPERTIES = 5
+
+REPORT_FILE = "template-report.json"
+
+
+def _size(value):
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+def _count_imports(value):
+    if isinstance(value, dict):
+        return int("Fn::ImportValue" in value) + sum(_count_imports(v) for v in value.values())
+    if isinstance(value, list):
+        return sum(_count_imports(v) for v in value)
+    return 0
+
+
+def stack_report(template, template_bytes):
+    """Sizes and counts for one template."""
+    resources = template.get("Resources", {})
+    outputs = template.get("Outputs", {})
+
+    properties = [
+        (f"Resources/{logical_id}/Properties/{name}", _size(value))
+        for logical_id, resource in resources.items()
+        for name, value in resource.get("Properties", {}).items()
+    ]
+    properties += [(f"Outputs/{name}/Value", _size(output.get("Value"))) for name, output in outputs.items()]
+    properties.sort(key=lambda item: item[1], reverse=True)
+
+    return {
+        "template_bytes": template_bytes,
+        "resources": len(resources),
+        "outputs": len(outputs),
+        "parameters": len(template.get("Parameters", {})),
+        "mappings": len(template.get("Mappings", {})),
+        "exports": sum(1 for output in outputs.values() if "Export" in output),
+        "imports": _count_imports(resources) + _count_imports(outputs),
+        "largest_properties": [
+            {"path": path, "bytes": size} for path, size in properties[:LARGEST_PROPERTIES]
+        ]
+    }
+
+
+def thresholds(limit_ratio=DEFAULT_LIMIT_RATIO, overrides=None):
+    """Per-metric thresholds: a ratio of the hard limits, then explicit overrides."""
+    limits = {name: int(limit * limit_ratio) for name, limit in HARD_LIMITS.items()}
+    limits.update(overrides or {})
+    return limits
+
+
+def report(directory, limits):
+    """Report for every template in directory plus the thresholds it crosses."""
+    stacks = {}
+    violations = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.template.json"))):
+        name = os.path.basename(path)[:-len(".template.json")]
+        with open(path) as f:
+            template = json.load(f)
+        stacks[name] = stack_report(template, os.path.getsize(path))
+        violations += [
+            f"{name}: {metric} is {stacks[name][metric]}, threshold {limit} "
+            f"(CloudFormation limit {HARD_LIMITS.get(metric, 'n/a')})"
+            for metric, limit in limits.items()
+            if stacks[name].get(metric, 0) > limit
+        ]
+    return {"thresholds": limits, "stacks": stacks, "violations": violations}
+
+
+def check(app, directory):
+    """Write directory/template-report.json and raise if any threshold is crossed."""
+    overrides = app.node.try_get_context("template_limits")
+    if isinstance(overrides, str):
+        overrides = json.loads(overrides)
+    ratio = float(app.node.try_get_context("template_limit_ratio") or DEFAULT_LIMIT_RATIO)
+
+    result = report(directory, thresholds(ratio, overrides))
+    with open(os.path.join(directory, REPORT_FILE), "w") as f:
+        json.dump(result, f, indent=2)
+    if result["violations"]:
+        raise ValueError(
+            "Templates exceed size thresholds:\n  " + "\n  ".join(result["violations"])
+        )
+    return result
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    directory = argv[0] if argv else "cdk.out"
+    result = report(directory, thresholds())
+    print(json.dumps(result, indent=2))
+    return 1 if result["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
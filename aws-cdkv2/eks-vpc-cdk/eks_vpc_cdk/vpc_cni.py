@@ -0,0 +1,125 @@
+"""Configuration for the vpc-cni managed add-on (the aws-node daemonset).
+
+EksClusterStack creates the add-on only when a setting needs it, so by default
+the cluster keeps the self-managed aws-node that EKS installs. Taking it over
+with resolve_conflicts=OVERWRITE keeps running pods; nodes pick up custom
+networking only when they are replaced.
+
+Custom networking (-c pod_cidr=...): aws-node gives pods addresses from the
+pod subnet of the node's AZ. The add-on creates one ENIConfig per AZ, named
+after it, and nodes select theirs through the topology.kubernetes.io/zone label.
+
+Prefix delegation (-c prefix_delegation=true): aws-node assigns /28 prefixes
+(16 addresses) to ENI slots instead of single IPs, which raises pod density and
+makes IP allocation faster. The kubelet's max-pods has to match; max_pods()
+computes it from ENI_LIMITS the same way as the EKS max-pods calculator and
+EksLaunchTemplateStack renders it into the node's NodeConfig.
+"""
+from aws_cdk import Stack
+
+from eks_vpc_cdk import settings
+
+ENI_CONFIG_LABEL = "topology.kubernetes.io/zone"
+
+# Instance type -> (vCPUs, ENIs, IPv4 addresses per ENI)
+ENI_LIMITS = {
+    "t3.medium": (2, 3, 6),
+    "t3.large": (2, 3, 12),
+    "t3.xlarge": (4, 4, 15),
+    "t3.2xlarge": (8, 4, 15),
+    "t3a.medium": (2, 3, 6),
+    "t3a.large": (2, 3, 12),
+    "t3a.xlarge": (4, 4, 15),
+    "t3a.2xlarge": (8, 4, 15),
+    "m5.large": (2, 3, 10),
+    "m5.xlarge": (4, 4, 15),
+    "m5.2xlarge": (8, 4, 15),
+    "m5.4xlarge": (16, 8, 30),
+    "m5.8xlarge": (32, 8, 30),
+    "m6i.large": (2, 3, 10),
+    "m6i.xlarge": (4, 4, 15),
+    "m6i.2xlarge": (8, 4, 15),
+    "m6i.4xlarge": (16, 8, 30),
+    "m6i.8xlarge": (32, 8, 30),
+    "c5.large": (2, 3, 10),
+    "c5.xlarge": (4, 4, 15),
+    "c5.2xlarge": (8, 4, 15),
+    "c5.4xlarge": (16, 8, 30),
+    "r5.large": (2, 3, 10),
+    "r5.xlarge": (4, 4, 15),
+    "r5.2xlarge": (8, 4, 15),
+    "r5.4xlarge": (16, 8, 30),
+    # Graviton (arm64)
+    "t4g.medium": (2, 3, 6),
+    "t4g.large": (2, 3, 12),
+    "t4g.xlarge": (4, 4, 15),
+    "t4g.2xlarge": (8, 4, 15),
+    "m6g.large": (2, 3, 10),
+    "m6g.xlarge": (4, 4, 15),
+    "m6g.2xlarge": (8, 4, 15),
+    "m7g.large": (2, 3, 10),
+    "m7g.xlarge": (4, 4, 15),
+    "m7g.2xlarge": (8, 4, 15),
+    "c7g.large": (2, 3, 10),
+    "c7g.xlarge": (4, 4, 15),
+    "c7g.2xlarge": (8, 4, 15)
+}
+
+# Addresses per prefix with prefix delegation (a /28)
+PREFIX_SIZE = 16
+
+# Recommended kubelet max-pods ceilings with prefix delegation
+MAX_PODS_SMALL = 110  # fewer than 30 vCPUs
+MAX_PODS_LARGE = 250
+
+
+def configuration(scope, availability_zones, pod_subnet_ids, security_group_id):
+    """Add-on configuration values; empty when the defaults apply."""
+    config = {}
+    env = {}
+    if settings.flag(scope, "prefix_delegation"):
+        env["ENABLE_PREFIX_DELEGATION"] = "true"
+        env["WARM_PREFIX_TARGET"] = str(settings.number(scope, "warm_prefix_target"))
+    if pod_subnet_ids:
+        env["AWS_VPC_K8S_CNI_CUSTOM_NETWORK_CFG"] = "true"
+        env["ENI_CONFIG_LABEL_DEF"] = ENI_CONFIG_LABEL
+        config["eniConfig"] = {
+            "create": True,
+            "region": Stack.of(scope).region,
+            "subnets": {
+                az: {"id": subnet_id, "securityGroups": [security_group_id]}
+                for az, subnet_id in zip(availability_zones, pod_subnet_ids)
+            }
+        }
+    if env:
+        config["env"] = env
+    return config
+
+
+def max_pods(instance_type, prefix_delegation=False, custom_networking=False):
+    """Pods a node of instance_type can run with the VPC CNI."""
+    if instance_type not in ENI_LIMITS:
+        raise ValueError(f"No ENI limits for instance type {instance_type}; add it to vpc_cni.ENI_LIMITS")
+    vcpus, enis, ips_per_eni = ENI_LIMITS[instance_type]
+    # With custom networking the primary ENI is not used for pods
+    pod_enis = enis - 1 if custom_networking else enis
+    # Each ENI's primary address is not handed to pods; +2 for host-network pods
+    pods = pod_enis * (ips_per_eni - 1) * (PREFIX_SIZE if prefix_delegation else 1) + 2
+    if prefix_delegation:
+        pods = min(pods, MAX_PODS_SMALL if vcpus < 30 else MAX_PODS_LARGE)
+    return pods
+
+
+def node_max_pods(scope, instance_type):
+    """max-pods for nodes of instance_type, or None when the EKS default applies."""
+    prefix_delegation = settings.flag(scope, "prefix_delegation")
+    custom_networking = bool(settings.get(scope, "pod_cidr"))
+    if not (prefix_delegation or custom_networking):
+        return None
+    return max_pods(instance_type, prefix_delegation, custom_networking)
+
+
+def fleet_max_pods(scope, instance_types):
+    """node_max_pods for nodes of any of instance_types: the smallest one."""
+    values = [node_max_pods(scope, instance_type) for instance_type in instance_types]
+    return None if None in values else min(values)
@@ -0,0 +1,83 @@
+"""Warm pool for the scheduler nodes (-c scheduler_warm_pool_size=N).
+
+Managed node groups cannot have a warm pool, so with a pool size above 0
+EksNodeGroupSchedulerStack replaces the prod-scheduler-v2 managed node group
+with a self-managed Auto Scaling group of the same name. Its instances boot
+once into the warm pool, where they are stopped (or hibernated) with the image
+pulled and the OS initialized, and only start again when the group scales out.
+
+A node must not join the cluster while it is being warmed. Every boot runs
+the warm-pool-gate unit before nodeadm starts the kubelet. The unit reads the
+instance's target lifecycle state from IMDS and completes the LAUNCH_HOOK
+lifecycle action. In a Warmed:* state it then polls until the state reads
+InService, and nodeadm-run (so the kubelet) waits behind it. A Stopped pool
+stops the instance while the gate polls; it boots again into InService and
+the gate passes at once. Hibernated and Running instances do not boot again:
+they resume or are already up, so the same gate sees InService, completes
+the lifecycle action for that transition and lets the node join.
+
+The nodes bootstrap themselves, so they carry the cluster details in their
+NodeConfig; they use the worker node role, which the managed node groups have
+already mapped into the cluster.
+"""
+from eks_vpc_cdk.eks_create_cluster import KUBERNETES_VERSION
+
+LAUNCH_HOOK = "prod-scheduler-v2-launch"
+
+# Seconds a new instance may take to reach the gate before it is abandoned
+HOOK_TIMEOUT = 600
+
+# EKS optimized Amazon Linux 2023 AMI for the cluster's Kubernetes version
+AMI_PARAMETER = (
+    f"/aws/service/eks/optimized-ami/{KUBERNETES_VERSION}/amazon-linux-2023/x86_64/standard/recommended/image_id"
+)
+
+GATE_SCRIPT = "/usr/local/bin/warm-pool-gate"
+GATE_UNIT = "warm-pool-gate.service"
+
+
+def gate_setup(auto_scaling_group_name):
+    """User data lines that install the warm-pool-gate unit ahead of nodeadm-run."""
+    return f"""cat <<'EOF' > {GATE_SCRIPT}
+#!/bin/bash
+imds() {{
+  TOKEN=$(curl -sX PUT http://169.254.169.254/latest/api/token -H "X-aws-ec2-metadata-token-ttl-seconds: 300")
+  curl -sf -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/$1
+}}
+complete() {{
+  aws autoscaling complete-lifecycle-action --region $(imds placement/region) \\
+    --auto-scaling-group-name {auto_scaling_group_name} --lifecycle-hook-name {LAUNCH_HOOK} \\
+    --instance-id $(imds instance-id) --lifecycle-action-result CONTINUE || true
+}}
+# The target state appears once the Auto Scaling group has decided on it
+until STATE=$(imds autoscaling/target-lifecycle-state); do sleep 5; done
+complete
+case "$STATE" in
+  Warmed:*)
+    # Hibernated and Running instances reach InService without a new boot
+    until [ "$(imds autoscaling/target-lifecycle-state)" = InService ]; do sleep 5; done
+    complete ;;
+esac
+EOF
+chmod +x {GATE_SCRIPT}
+cat <<'EOF' > /etc/systemd/system/{GATE_UNIT}
+[Unit]
+Description=Keep the kubelet down while the instance is in the warm pool
+Before=nodeadm-run.service
+
+[Service]
+Type=oneshot
+RemainAfterExit=yes
+TimeoutStartSec=infinity
+ExecStart={GATE_SCRIPT}
+EOF
+mkdir -p /etc/systemd/system/nodeadm-run.service.d
+cat <<'EOF' > /etc/systemd/system/nodeadm-run.service.d/warm-pool.conf
+[Unit]
+Requires={GATE_UNIT}
+After={GATE_UNIT}
+EOF
+systemctl daemon-reload
+systemctl start --no-block {GATE_UNIT}
+
+"""
@@ -0,0 +1,79 @@
+import json
+import os
+import time
+
+import aws_cdk as core
+import pytest
+
+from eks_vpc_cdk import stack_registry
+
+# Wall-clock timings are too noisy for the default run; opt in with -m benchmark
+pytestmark = pytest.mark.benchmark
+
+# Per-step budgets in seconds. Point SYNTH_BUDGETS at another JSON file to
+# tighten or relax them (e.g. on slower CI runners).
+BUDGETS_FILE = os.environ.get(
+    "SYNTH_BUDGETS",
+    os.path.join(os.path.dirname(__file__), "synth_budgets.json")
+)
+
+# Where the measured timings are written so CI can keep them as an artifact;
+# a temporary directory unless set
+RESULTS_FILE = os.environ.get("SYNTH_BENCHMARK_RESULTS")
+
+
+def _load_budgets():
+    with open(BUDGETS_FILE) as f:
+        return json.load(f)
+
+
+def _timed(timings, name, build):
+    start = time.perf_counter()
+    result = build()
+    timings[name] = time.perf_counter() - start
+    return result
+
+
+def run_benchmark():
+    """Build and synth the full app the way app.py does, timing every step."""
+    timings = {}
+
+    app = _timed(timings, "App", core.App)
+
+    built = {}
+    for stack_id in stack_registry.resolve():
+        built[stack_id] = _timed(
+            timings, stack_id, lambda: stack_registry.build_stack(app, stack_id, built)
+        )
+
+    _timed(timings, "synth", app.synth)
+    return timings
+
+
+@pytest.fixture(scope="module")
+def budgets():
+    return _load_budgets()
+
+
+@pytest.fixture(scope="module")
+def timings(budgets, tmp_path_factory):
+    timings = run_benchmark()
+    results_file = RESULTS_FILE or str(tmp_path_factory.mktemp("synth-benchmark") / "synth-benchmark.json")
+    with open(results_file, "w") as f:
+        json.dump({
+            name: {
+                "seconds": round(seconds, 4),
+                "budget": budgets.get(name),
+                "within_budget": name not in budgets or seconds <= budgets[name]
+            }
+            for name, seconds in timings.items()
+        }, f, indent=2)
+    return timings
+
+
+@pytest.mark.parametrize("name", sorted(_load_budgets()))
+def test_step_within_budget(timings, budgets, name):
+    assert name in timings, f"No timing recorded for budgeted step {name}"
+    assert timings[name] <= budgets[name], (
+        f"{name} took {timings[name]:.3f}s, budget is {budgets[name]:.3f}s"
+    )
@@ -0,0 +1,13 @@
+import aws_cdk as core
+import pytest
+
+from eks_vpc_cdk import stack_registry
+
+
+@pytest.fixture
+def build_stacks():
+    """build_stacks(context, names): the named stacks and their producers,
+    built in an App with context, by name."""
+    def build(context, names):
+        return stack_registry.build(core.App(context=context), list(names))
+    return build
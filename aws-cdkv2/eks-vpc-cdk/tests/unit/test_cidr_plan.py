@@ -0,0 +1,47 @@
+import ipaddress
+import itertools
+
+import aws_cdk as core
+import pytest
+
+from eks_vpc_cdk import cidr_plan
+
+
+def test_default_plan_reproduces_original_subnets():
+    plan = cidr_plan.from_context(core.App())
+    assert plan["vpc_cidr"] == "192.168.0.0/16"
+    assert plan["availability_zones"] == ["us-east-1a", "us-east-1b", "us-east-1c"]
+    assert plan["public_subnets"] == ["192.168.0.0/20", "192.168.16.0/20", "192.168.32.0/20"]
+    assert plan["private_subnets"] == ["192.168.48.0/20", "192.168.64.0/20", "192.168.80.0/20"]
+
+
+def test_private_subnets_sized_for_pods_without_overlap():
+    plan = cidr_plan.plan("10.0.0.0/16", ["us-east-1a", "us-east-1b", "us-east-1c"], 110, 100, 24)
+    assert plan["private_subnets"] == ["10.0.0.0/18", "10.0.64.0/18", "10.0.128.0/18"]
+    assert plan["private_addresses_per_az"] >= 100 * 111
+
+    subnets = [ipaddress.ip_network(cidr) for cidr in plan["public_subnets"] + plan["private_subnets"]]
+    assert all(subnet.subnet_of(ipaddress.ip_network("10.0.0.0/16")) for subnet in subnets)
+    assert not any(a.overlaps(b) for a, b in itertools.combinations(subnets, 2))
+
+
+def test_az_count_from_context():
+    app = core.App(context={"az_count": "2", "availability_zones": "us-east-1a,us-east-1b,us-east-1d"})
+    plan = cidr_plan.from_context(app)
+    assert plan["availability_zones"] == ["us-east-1a", "us-east-1b"]
+    assert len(plan["private_subnets"]) == 2
+
+
+def test_vpc_too_small_is_rejected():
+    with pytest.raises(ValueError, match="too small"):
+        cidr_plan.plan("10.0.0.0/16", ["us-east-1a", "us-east-1b", "us-east-1c"], 110, 200, 24)
+    with pytest.raises(ValueError, match="az_count"):
+        cidr_plan.from_context(core.App(context={"az_count": 4}))
+
+
+def test_pod_cidr_split_per_az():
+    plan = cidr_plan.plan("192.168.0.0/16", ["us-east-1a", "us-east-1b", "us-east-1c"], 58, 60, 20,
+                          pod_cidr="100.64.0.0/16")
+    assert plan["pod_subnets"] == ["100.64.0.0/18", "100.64.64.0/18", "100.64.128.0/18"]
+    with pytest.raises(ValueError, match="overlaps"):
+        cidr_plan.plan("192.168.0.0/16", ["us-east-1a"], 58, 60, 20, pod_cidr="192.168.128.0/17")
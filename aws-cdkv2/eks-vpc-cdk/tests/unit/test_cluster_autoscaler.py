@@ -0,0 +1,49 @@
+import json
+
+import aws_cdk.assertions as assertions
+import pytest
+
+
+def test_node_group_bounds_from_context(build_stacks):
+    built = build_stacks(
+        {"scheduler_min_size": "2", "scheduler_max_size": "8", "hello_max_size": "3"},
+        ["EksNodeGroupSchedulerStack", "EksNodeGroupHelloStack"]
+    )
+    assertions.Template.from_stack(built["EksNodeGroupSchedulerStack"]).has_resource_properties(
+        "AWS::EKS::Nodegroup", {"ScalingConfig": {"DesiredSize": 2, "MinSize": 2, "MaxSize": 8}}
+    )
+    assertions.Template.from_stack(built["EksNodeGroupHelloStack"]).has_resource_properties(
+        "AWS::EKS::Nodegroup", {"ScalingConfig": {"DesiredSize": 1, "MinSize": 1, "MaxSize": 3}}
+    )
+
+
+def test_node_group_bounds_must_be_ordered(build_stacks):
+    with pytest.raises(ValueError, match="scheduler"):
+        build_stacks({"scheduler_desired_size": "5"}, ["EksNodeGroupSchedulerStack"])
+
+
+def test_autoscaler_stack_and_discovery_tags(build_stacks):
+    built = build_stacks(
+        {"cluster_autoscaler": "true", "cluster_autoscaler_scan_interval": "20s"},
+        ["EksClusterAutoscalerStack", "EksNodeGroupHelloStack"]
+    )
+    assertions.Template.from_stack(built["EksNodeGroupHelloStack"]).has_resource_properties(
+        "AWS::EKS::Nodegroup", {"Tags": assertions.Match.object_like({
+            "k8s.io/cluster-autoscaler/enabled": "true",
+            "k8s.io/cluster-autoscaler/prod-eks-sre-cluster": "owned"
+        })}
+    )
+    assertions.Template.from_stack(built["EksClusterStack"]).has_resource_properties(
+        "AWS::EKS::Addon", {"AddonName": "eks-pod-identity-agent"}
+    )
+
+    template = assertions.Template.from_stack(built["EksClusterAutoscalerStack"])
+    template.has_resource_properties("AWS::EKS::PodIdentityAssociation", {
+        "Namespace": "kube-system",
+        "ServiceAccount": "cluster-autoscaler"
+    })
+    parts = template.to_json()["Outputs"]["ClusterAutoscalerHelmValues"]["Value"]["Fn::Join"][1]
+    values = json.loads("".join(part if isinstance(part, str) else "us-east-1" for part in parts))
+    assert values["extraArgs"]["scan-interval"] == "20s"
+    assert values["extraArgs"]["expander"] == "priority"
+    assert values["expanderPriorities"]["20"] == [".*prod-scheduler-v2.*"]
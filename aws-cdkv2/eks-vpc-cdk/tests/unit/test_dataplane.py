@@ -0,0 +1,47 @@
+import base64
+import json
+
+import aws_cdk.assertions as assertions
+import pytest
+
+STACKS = ["EksLaunchTemplateStack", "EksK8sResourcesStack"]
+
+
+def _user_data(built):
+    template = assertions.Template.from_stack(built["EksLaunchTemplateStack"]).to_json()
+    return base64.b64decode(
+        template["Resources"]["ProdSchedulerLaunchTemplate"]["Properties"]["LaunchTemplateData"]["UserData"]
+    ).decode()
+
+
+def test_ipvs_kube_proxy_and_node_modules(build_stacks):
+    built = build_stacks({"dataplane": "ipvs", "node_local_dns": "true"}, STACKS)
+    assertions.Template.from_stack(built["EksClusterStack"]).has_resource_properties("AWS::EKS::Addon", {
+        "AddonName": "kube-proxy",
+        "ConfigurationValues": json.dumps({"mode": "ipvs", "ipvs": {"scheduler": "rr"}}, separators=(",", ":"))
+    })
+
+    user_data = _user_data(built)
+    assert "modprobe ip_vs_rr" in user_data
+    assert 'clusterDNS: ["169.254.20.10"]' in user_data
+
+    # kube-proxy owns the kube-dns IP in IPVS mode
+    outputs = assertions.Template.from_stack(built["EksK8sResourcesStack"]).to_json()["Outputs"]
+    daemon_set = json.loads(outputs["NodeLocalDnsDaemonSetManifest"]["Value"])
+    assert "169.254.20.10" in daemon_set["spec"]["template"]["spec"]["containers"][0]["args"]
+
+
+def test_cilium_replaces_aws_node_and_kube_proxy(build_stacks):
+    built = build_stacks({"dataplane": "cilium", "managed_addons": "true"}, STACKS)
+    cluster = assertions.Template.from_stack(built["EksClusterStack"])
+    cluster.resource_count_is("AWS::EKS::Addon", 1)  # coredns only
+    outputs = cluster.to_json()["Outputs"]
+    assert "CiliumHelmValues" in outputs
+    assert "helm upgrade --install cilium" in json.dumps(outputs["CiliumInstallCommands"])
+
+    assert "--register-with-taints=node.cilium.io/agent-not-ready=true:NoExecute" in _user_data(built)
+
+
+def test_cilium_rejects_custom_networking(build_stacks):
+    with pytest.raises(ValueError, match="cilium"):
+        build_stacks({"dataplane": "cilium", "pod_cidr": "100.64.0.0/16"}, STACKS)
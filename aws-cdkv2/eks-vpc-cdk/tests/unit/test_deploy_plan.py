@@ -0,0 +1,32 @@
+from eks_vpc_cdk import deploy_plan, stack_registry
+
+
+def test_redundant_nodegroup_dependencies_are_reduced():
+    assert stack_registry.reduced_dependencies("EksNodeGroupSchedulerStack") == [
+        "EksLaunchTemplateStack", "EksNodeGroupRoleStack"
+    ]
+    assert stack_registry.reduced_dependencies("EksNodeGroupHelloStack") == [
+        "EksLaunchTemplateStack", "EksNodeGroupRoleStack"
+    ]
+
+
+def test_iam_stacks_and_vpc_deploy_in_first_wave():
+    waves = deploy_plan.waves(deploy_plan.graph())
+    assert sorted(waves[0]) == sorted([
+        "EksVpcCdkStack", "EksClusterRoleStack", "EksNodeGroupRoleStack", "EksAdminPolicyStack"
+    ])
+    assert "EksAlbStack" in waves[1]
+
+
+def test_critical_path_follows_the_cluster_chain():
+    path, minutes = deploy_plan.critical_path(
+        deploy_plan.graph(), deploy_plan.ESTIMATED_MINUTES
+    )
+    assert path[:3] == ["EksVpcCdkStack", "EksClusterStack", "EksLaunchTemplateStack"]
+    assert minutes == sum(deploy_plan.ESTIMATED_MINUTES[stack_id] for stack_id in path)
+
+
+def test_plan_for_requested_stacks():
+    result = deploy_plan.plan(["EksAlbStack"])
+    assert result["waves"] == [["EksVpcCdkStack"], ["EksAlbStack"]]
+    assert result["command"] == "cdk deploy EksVpcCdkStack EksAlbStack --concurrency 1"
@@ -0,0 +1,58 @@
+import json
+
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+
+from eks_vpc_cdk import deploy_plan, stack_registry
+from eks_vpc_cdk.eks_cluster_role import EksClusterRoleStack
+from eks_vpc_cdk.eks_nodegroup_role import EksNodeGroupRoleStack
+from eks_vpc_cdk.eks_admin_policy import EksAdminPolicyStack
+from eks_vpc_cdk.eks_identity import EksIdentityStack
+
+
+def _logical_ids(stack):
+    template = assertions.Template.from_stack(stack).to_json()
+    return set(template["Resources"]) | set(template.get("Outputs", {}))
+
+
+def _standalone_logical_ids():
+    return {
+        stack_class.__name__: _logical_ids(stack_class(core.App(), stack_class.__name__))
+        for stack_class in (EksClusterRoleStack, EksNodeGroupRoleStack, EksAdminPolicyStack)
+    }
+
+
+def test_merged_identity_stack_keeps_logical_ids():
+    standalone = _standalone_logical_ids()
+    stack = EksIdentityStack(core.App(), "EksIdentityStack", identity_mode="merged")
+    assert _logical_ids(stack) == set().union(*standalone.values())
+    assertions.Template.from_stack(stack).resource_count_is("AWS::IAM::Role", 2)
+
+
+def test_nested_identity_stacks_keep_logical_ids():
+    standalone = _standalone_logical_ids()
+    app = core.App()
+    stack = EksIdentityStack(app, "EksIdentityStack", identity_mode="nested")
+    assembly = app.synth()
+    for name, ids in standalone.items():
+        nested = stack.node.find_child(name)
+        with open(f"{assembly.directory}/{nested.template_file}") as f:
+            template = json.load(f)
+        assert set(template["Resources"]) | set(template.get("Outputs", {})) == ids
+
+
+def test_identity_retain_sets_retain_policy():
+    stack = EksClusterRoleStack(core.App(context={"identity_retain": "true"}), "EksClusterRoleStack")
+    assertions.Template.from_stack(stack).has_resource(
+        "AWS::IAM::Role", {"DeletionPolicy": "Retain", "UpdateReplacePolicy": "Retain"}
+    )
+
+
+def test_registry_builds_one_identity_stack():
+    app = core.App(context={"identity_mode": "merged"})
+    built = stack_registry.build(app, ["EksNodeGroupSchedulerStack"])
+    assert built["EksNodeGroupRoleStack"] is built["EksIdentityStack"]
+    assert "EksNodeGroupRoleStack" not in [stack.stack_name for stack in app.synth().stacks]
+
+    waves = deploy_plan.waves(deploy_plan.graph(identity_mode="merged"))
+    assert sorted(waves[0]) == ["EksIdentityStack", "EksVpcCdkStack"]
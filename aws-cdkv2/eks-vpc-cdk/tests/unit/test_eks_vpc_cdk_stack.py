@@ -13,3 +13,69 @@ def test_sqs_queue_created():
 #     template.has_resource_properties("AWS::SQS::Queue", {
 #         "VisibilityTimeout": 300
 #     })
+
+
+def test_single_nat_gateway_by_default():
+    template = assertions.Template.from_stack(EksVpcCdkStack(core.App(), "eks-vpc-cdk"))
+    template.resource_count_is("AWS::EC2::NatGateway", 1)
+    template.resource_count_is("AWS::EC2::EIP", 1)
+    template.resource_count_is("AWS::EC2::RouteTable", 2)
+
+
+def test_per_az_nat_gateways():
+    app = core.App(context={"nat_strategy": "per_az"})
+    template = assertions.Template.from_stack(EksVpcCdkStack(app, "eks-vpc-cdk"))
+    template.resource_count_is("AWS::EC2::NatGateway", 3)
+    template.resource_count_is("AWS::EC2::EIP", 3)
+    template.resource_count_is("AWS::EC2::RouteTable", 4)
+
+    resources = template.to_json()["Resources"]
+    # AZ a keeps the single-mode logical IDs
+    assert {"NatEip", "NatGateway", "PrivateRouteTable", "PrivateDefaultRoute"} <= set(resources)
+    # Each private subnet routes through the NAT gateway in its own AZ
+    for az in "ABC":
+        suffix = "" if az == "A" else az
+        assert resources[f"PrivateSubnet{az}Assoc"]["Properties"]["RouteTableId"] == {"Ref": f"PrivateRouteTable{suffix}"}
+        assert resources[f"NatGateway{suffix}"]["Properties"]["SubnetId"] == {"Ref": f"PublicSubnet{az}"}
+
+
+def test_vpc_endpoints():
+    template = assertions.Template.from_stack(EksVpcCdkStack(core.App(), "eks-vpc-cdk"))
+    template.resource_count_is("AWS::EC2::VPCEndpoint", 0)
+
+    app = core.App(context={"vpc_endpoints": "true", "nat_strategy": "per_az"})
+    template = assertions.Template.from_stack(EksVpcCdkStack(app, "eks-vpc-cdk"))
+    template.resource_count_is("AWS::EC2::VPCEndpoint", 10)
+    template.resource_count_is("AWS::EC2::SecurityGroup", 1)
+    gateway = template.find_resources("AWS::EC2::VPCEndpoint", {"Properties": {"VpcEndpointType": "Gateway"}})
+    # The S3 gateway endpoint is on every private route table
+    assert len(next(iter(gateway.values()))["Properties"]["RouteTableIds"]) == 3
+    template.has_resource_properties("AWS::EC2::VPCEndpoint", {
+        "VpcEndpointType": "Interface",
+        "PrivateDnsEnabled": True,
+        "SubnetIds": assertions.Match.array_with([{"Ref": "PrivateSubnetA"}])
+    })
+    ingress = template.to_json()["Resources"]["EndpointSecurityGroup"]["Properties"]["SecurityGroupIngress"]
+    assert [rule["CidrIp"] for rule in ingress] == ["192.168.0.0/16"]
+
+
+def test_vpc_endpoints_accept_pod_cidr():
+    # Pods on custom networking call the endpoints from the secondary CIDR
+    app = core.App(context={"vpc_endpoints": "true", "pod_cidr": "100.64.0.0/16"})
+    template = assertions.Template.from_stack(EksVpcCdkStack(app, "eks-vpc-cdk"))
+    ingress = template.to_json()["Resources"]["EndpointSecurityGroup"]["Properties"]["SecurityGroupIngress"]
+    assert [(rule["CidrIp"], rule["FromPort"]) for rule in ingress] == [("192.168.0.0/16", 443), ("100.64.0.0/16", 443)]
+
+
+def test_ipv6_dual_stack_subnets():
+    app = core.App(context={"ip_family": "ipv6"})
+    template = assertions.Template.from_stack(EksVpcCdkStack(app, "eks-vpc-cdk"))
+    template.has_resource_properties("AWS::EC2::VPCCidrBlock", {"AmazonProvidedIpv6CidrBlock": True})
+    template.resource_count_is("AWS::EC2::EgressOnlyInternetGateway", 1)
+    template.has_resource_properties("AWS::EC2::Route", {
+        "DestinationIpv6CidrBlock": "::/0",
+        "EgressOnlyInternetGatewayId": assertions.Match.any_value()
+    })
+    subnets = template.find_resources("AWS::EC2::Subnet")
+    assert len(subnets) == 6
+    assert all(subnet["Properties"]["AssignIpv6AddressOnCreation"] for subnet in subnets.values())
@@ -0,0 +1,81 @@
+import json
+
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from eks_vpc_cdk import image_cache, stack_registry
+from eks_vpc_cdk.eks_launch_template import ROOT_VOLUME
+
+
+def test_ecr_images_are_pulled_with_the_instance_role():
+    commands = image_cache.pull_commands([
+        "575108957879.dkr.ecr.us-east-1.amazonaws.com/hello/swatops13032:latest",
+        "public.ecr.aws/docker/library/busybox:1.36"
+    ])
+    assert commands[0] == "systemctl start containerd"
+    assert "get-login-password --region us-east-1" in commands[1]
+    assert commands[2] == "ctr -n k8s.io images pull public.ecr.aws/docker/library/busybox:1.36"
+
+
+def test_any_resource_change_gets_a_new_version():
+    properties = {"name": "prod-eks-image-cache", "data": image_cache.component_document(["a:1"])}
+    assert image_cache.version(dict(properties)) == image_cache.version(properties)
+    assert image_cache.version({**properties, "data": image_cache.component_document(["a:2"])}) != (
+        image_cache.version(properties)
+    )
+
+
+def test_recipe_version_follows_the_root_volume(monkeypatch):
+    def versions():
+        app = core.App(context={"image_builder": "true"})
+        built = stack_registry.build(app, ["EksImageBuilderStack"])
+        resources = assertions.Template.from_stack(built["EksImageBuilderStack"]).to_json()["Resources"]
+        return (resources["ImageCacheComponent"]["Properties"]["Version"],
+                resources["NodeImageRecipe"]["Properties"]["Version"])
+
+    component, recipe = versions()
+    monkeypatch.setitem(ROOT_VOLUME, "volume_size", 100)
+    new_component, new_recipe = versions()
+    assert new_component == component
+    assert new_recipe != recipe
+
+
+def test_image_builder_stack_is_optional(build_stacks):
+    assert "EksImageBuilderStack" not in stack_registry.default_stacks()
+    built = build_stacks({"image_builder": "true"}, ["EksImageBuilderStack"])
+    template = assertions.Template.from_stack(built["EksImageBuilderStack"])
+    template.resource_count_is("AWS::ImageBuilder::Image", 1)
+    template.has_resource_properties("AWS::ImageBuilder::ImageRecipe", {
+        "ParentImage": "ssm:/aws/service/eks/optimized-ami/1.33/amazon-linux-2023/x86_64/standard/recommended/image_id"
+    })
+    template.has_resource_properties("AWS::ImageBuilder::DistributionConfiguration", {
+        "Distributions": [assertions.Match.object_like({
+            "SsmParameterConfigurations": [{"DataType": "aws:ec2:image", "ParameterName": image_cache.AMI_PARAMETER}]
+        })]
+    })
+
+
+def test_pipeline_ami_makes_node_groups_custom(build_stacks):
+    built = build_stacks({"node_image": "image_builder"}, ["EksNodeGroupHelloStack"])
+    data = assertions.Template.from_stack(built["EksLaunchTemplateStack"]).to_json()[
+        "Resources"]["ProdSchedulerLaunchTemplate"]["Properties"]["LaunchTemplateData"]
+    assert data["ImageId"] == "{{resolve:ssm:/prod-eks/node-image/image-id}}"
+    assert "apiServerEndpoint" in json.dumps(data["UserData"])
+    assertions.Template.from_stack(built["EksNodeGroupHelloStack"]).has_resource_properties(
+        "AWS::EKS::Nodegroup", {"AmiType": "CUSTOM"}
+    )
+
+
+def test_snapshot_volume_is_mounted_for_containerd(build_stacks):
+    built = build_stacks({"containerd_snapshot_id": "snap-0123456789abcdef0"}, ["EksLaunchTemplateStack"])
+    data = assertions.Template.from_stack(built["EksLaunchTemplateStack"]).to_json()[
+        "Resources"]["ProdSchedulerLaunchTemplate"]["Properties"]["LaunchTemplateData"]
+    assert data["BlockDeviceMappings"][1]["Ebs"]["SnapshotId"] == "snap-0123456789abcdef0"
+    assert "ImageId" not in data
+
+
+def test_snapshot_and_nvme_profile_conflict():
+    app = core.App(context={"containerd_snapshot_id": "snap-0123", "storage_profile": "nvme"})
+    with pytest.raises(ValueError, match="containerd_snapshot_id"):
+        image_cache.snapshot_id(app)
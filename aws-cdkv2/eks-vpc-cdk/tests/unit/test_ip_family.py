@@ -0,0 +1,37 @@
+import aws_cdk.assertions as assertions
+
+STACKS = ["EksAlbStack", "EksNodeGroupHelloStack"]
+
+
+def test_ipv4_by_default(build_stacks):
+    built = build_stacks({}, STACKS)
+    assertions.Template.from_stack(built["EksClusterStack"]).has_resource_properties("AWS::EKS::Cluster", {
+        "KubernetesNetworkConfig": {"IpFamily": "ipv4", "ServiceIpv4Cidr": "10.100.0.0/16"}
+    })
+    assertions.Template.from_stack(built["EksAlbStack"]).has_resource_properties(
+        "AWS::ElasticLoadBalancingV2::LoadBalancer", {"IpAddressType": "ipv4"}
+    )
+
+
+def test_ipv6_cluster_nodes_and_alb(build_stacks):
+    built = build_stacks({"ip_family": "ipv6"}, STACKS)
+    cluster = assertions.Template.from_stack(built["EksClusterStack"]).to_json()
+    assert cluster["Resources"]["ProdSreEksCluster"]["Properties"]["KubernetesNetworkConfig"] == {"IpFamily": "ipv6"}
+
+    assertions.Template.from_stack(built["EksNodeGroupRoleStack"]).has_resource_properties(
+        "AWS::IAM::Policy", {"PolicyName": "AmazonEKS_CNI_IPv6_Policy"}
+    )
+    assertions.Template.from_stack(built["EksLaunchTemplateStack"]).has_resource_properties(
+        "AWS::EC2::LaunchTemplate", {"LaunchTemplateData": {
+            "NetworkInterfaces": [assertions.Match.object_like({"Ipv6AddressCount": 1})]
+        }}
+    )
+
+    alb = assertions.Template.from_stack(built["EksAlbStack"])
+    alb.has_resource_properties("AWS::ElasticLoadBalancingV2::LoadBalancer", {"IpAddressType": "dualstack"})
+    alb.has_resource_properties("AWS::ElasticLoadBalancingV2::TargetGroup", {"IpAddressType": "ipv6"})
+    alb.has_resource_properties("AWS::EC2::SecurityGroup", {
+        "SecurityGroupIngress": assertions.Match.array_with([
+            assertions.Match.object_like({"CidrIpv6": assertions.Match.any_value(), "FromPort": 80})
+        ])
+    })
@@ -0,0 +1,71 @@
+import json
+
+import aws_cdk.assertions as assertions
+
+STACKS = ["EksKarpenterStack"]
+
+
+def _manifest(template, output_id):
+    value = template.to_json()["Outputs"][output_id]["Value"]
+    if isinstance(value, dict):
+        # Tokens are joined in at deploy time; drop them to inspect the rest
+        value = "".join(part if isinstance(part, str) else "TOKEN" for part in value["Fn::Join"][1])
+    return json.loads(value)
+
+
+def test_controller_role_and_interruption_queue(build_stacks):
+    built = build_stacks({"karpenter": "true"}, STACKS)
+    template = assertions.Template.from_stack(built["EksKarpenterStack"])
+    template.has_resource_properties("AWS::EKS::PodIdentityAssociation", {
+        "Namespace": "kube-system",
+        "ServiceAccount": "karpenter"
+    })
+    template.has_resource_properties("AWS::SQS::Queue", {"MessageRetentionPeriod": 300})
+    template.resource_count_is("AWS::Events::Rule", 4)
+
+    cluster = assertions.Template.from_stack(built["EksClusterStack"])
+    cluster.has_resource_properties("AWS::EKS::Addon", {"AddonName": "eks-pod-identity-agent"})
+
+
+def test_node_class_reuses_launch_template_settings(build_stacks):
+    built = build_stacks({"karpenter": "true", "prefix_delegation": "true"}, STACKS)
+    template = assertions.Template.from_stack(built["EksKarpenterStack"])
+    node_class = _manifest(template, "EC2NodeClassManifest")["spec"]
+    assert node_class["role"] == "prod-sre-workernode-role"
+    assert node_class["subnetSelectorTerms"] == [{"tags": {"karpenter.sh/discovery": "prod-eks-sre-cluster"}}]
+    assert node_class["blockDeviceMappings"][0]["ebs"]["volumeSize"] == "70Gi"
+    assert node_class["kubelet"] == {"maxPods": 110}
+
+    node_pool = _manifest(template, "NodePoolManifest")["spec"]
+    assert node_pool["limits"] == {"cpu": 64}
+    assert node_pool["disruption"]["consolidationPolicy"] == "WhenEmptyOrUnderutilized"
+    assert node_pool["template"]["spec"]["requirements"][0]["values"] == ["t3a.xlarge"]
+
+
+def test_instance_types_and_discovery_tag_from_context(build_stacks):
+    built = build_stacks({"karpenter": "true", "karpenter_instance_types": "m6a.large, m6a.xlarge"}, STACKS)
+    node_pool = _manifest(assertions.Template.from_stack(built["EksKarpenterStack"]), "NodePoolManifest")
+    assert node_pool["spec"]["template"]["spec"]["requirements"][0]["values"] == ["m6a.large", "m6a.xlarge"]
+
+    vpc = assertions.Template.from_stack(built["EksVpcCdkStack"])
+    vpc.has_resource_properties("AWS::EC2::Subnet", {
+        "Tags": assertions.Match.array_with([{"Key": "karpenter.sh/discovery", "Value": "prod-eks-sre-cluster"}])
+    })
+
+
+def test_controller_cannot_touch_untagged_resources(build_stacks):
+    built = build_stacks({"karpenter": "true"}, STACKS)
+    template = assertions.Template.from_stack(built["EksKarpenterStack"]).to_json()
+    policy = next(
+        resource["Properties"]["PolicyDocument"] for resource in template["Resources"].values()
+        if resource["Type"] == "AWS::IAM::Policy"
+    )
+    read_only = {"pricing:GetProducts"}
+    for statement in policy["Statement"]:
+        actions = statement["Action"] if isinstance(statement["Action"], list) else [statement["Action"]]
+        if statement["Resource"] == "*":
+            assert all(action.split(":")[1].startswith("Describe") or action in read_only for action in actions)
+        if {"ec2:TerminateInstances", "iam:DeleteInstanceProfile"} & set(actions):
+            assert statement["Condition"]["StringEquals"][
+                "aws:ResourceTag/kubernetes.io/cluster/prod-eks-sre-cluster"
+            ] == "owned"
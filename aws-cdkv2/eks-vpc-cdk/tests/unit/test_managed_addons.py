@@ -0,0 +1,43 @@
+import json
+
+import aws_cdk.assertions as assertions
+import pytest
+
+from eks_vpc_cdk import node_local_dns
+
+STACKS = ["EksK8sResourcesStack"]
+
+
+def test_managed_addons_with_coredns_autoscaling(build_stacks):
+    built = build_stacks({"managed_addons": "true", "coredns_max_replicas": "20"}, STACKS)
+    cluster = assertions.Template.from_stack(built["EksClusterStack"])
+    cluster.resource_count_is("AWS::EKS::Addon", 3)
+    cluster.has_resource_properties("AWS::EKS::Addon", {
+        "AddonName": "coredns",
+        "ConfigurationValues": json.dumps(
+            {"autoScaling": {"enabled": True, "minReplicas": 2, "maxReplicas": 20}}, separators=(",", ":")
+        )
+    })
+
+
+def test_node_local_dns_outputs(build_stacks):
+    built = build_stacks({"node_local_dns": "true"}, STACKS)
+    k8s = assertions.Template.from_stack(built["EksK8sResourcesStack"]).to_json()
+    daemon_set = json.loads(k8s["Outputs"]["NodeLocalDnsDaemonSetManifest"]["Value"])
+    assert daemon_set["kind"] == "DaemonSet"
+    assert "169.254.20.10,10.100.0.10" in daemon_set["spec"]["template"]["spec"]["containers"][0]["args"]
+    config_map = json.loads(k8s["Outputs"]["NodeLocalDnsConfigMapManifest"]["Value"])
+    assert "bind 169.254.20.10 10.100.0.10" in config_map["data"]["Corefile"]
+    assert "NodeLocalDnsInstallCommand" in k8s["Outputs"]
+
+    assert "NodeLocalDnsDaemonSetManifest" not in assertions.Template.from_stack(
+        build_stacks({}, STACKS)["EksK8sResourcesStack"]
+    ).to_json()["Outputs"]
+
+
+def test_node_local_dns_manifests_are_ordered(build_stacks):
+    assert [manifest["kind"] for manifest in node_local_dns.manifests("10.100.0.10").values()] == [
+        "ServiceAccount", "Service", "ConfigMap", "DaemonSet"
+    ]
+    with pytest.raises(ValueError, match="ip_family"):
+        build_stacks({"node_local_dns": "true", "ip_family": "ipv6"}, STACKS)
@@ -0,0 +1,83 @@
+import base64
+import json
+
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from eks_vpc_cdk import node_capacity
+
+STACKS = ["EksNodeGroupHelloStack", "EksK8sResourcesStack"]
+
+
+def test_default_node_groups_keep_their_names(build_stacks):
+    app = core.App()
+    assert node_capacity.node_group_name(app, "hello") == "prod-hello-ng"
+    assert node_capacity.flex_instance_types(app) == []
+
+    built = build_stacks({}, STACKS)
+    assertions.Template.from_stack(built["EksLaunchTemplateStack"]).resource_count_is(
+        "AWS::EC2::LaunchTemplate", 1
+    )
+
+
+def test_spot_hello_node_group_on_the_flex_launch_template(build_stacks):
+    built = build_stacks({
+        "hello_instance_types": "m6i.xlarge, m5.xlarge",
+        "hello_capacity_type": "SPOT",
+        "prefix_delegation": "true"
+    }, STACKS)
+    name = node_capacity.node_group_name(built["EksNodeGroupHelloStack"], "hello")
+    assert name.startswith("prod-hello-ng-")
+
+    hello = assertions.Template.from_stack(built["EksNodeGroupHelloStack"])
+    hello.has_resource_properties("AWS::EKS::Nodegroup", {
+        "NodegroupName": name,
+        "CapacityType": "SPOT",
+        "InstanceTypes": ["m6i.xlarge", "m5.xlarge"]
+    })
+
+    launch_templates = assertions.Template.from_stack(built["EksLaunchTemplateStack"]).to_json()["Resources"]
+    flex = launch_templates["ProdFlexLaunchTemplate"]["Properties"]["LaunchTemplateData"]
+    assert "InstanceType" not in flex
+    assert "maxPods: 110" in base64.b64decode(flex["UserData"]).decode()
+    assert "InstanceType" in launch_templates["ProdSchedulerLaunchTemplate"]["Properties"]["LaunchTemplateData"]
+
+    # The hello deployment follows the renamed node group
+    k8s = assertions.Template.from_stack(built["EksK8sResourcesStack"]).to_json()
+    assert name in k8s["Outputs"]["DeploymentManifest"]["Value"]
+
+
+def test_warm_pool_rejects_spot(build_stacks):
+    with pytest.raises(ValueError, match="SPOT"):
+        build_stacks(
+            {"scheduler_warm_pool_size": "1", "scheduler_capacity_type": "SPOT"},
+            ["EksNodeGroupSchedulerStack"]
+        )
+
+
+def test_arm64_hello_node_group(build_stacks):
+    built = build_stacks({"hello_architecture": "arm64"}, STACKS)
+    hello = assertions.Template.from_stack(built["EksNodeGroupHelloStack"])
+    hello.has_resource_properties("AWS::EKS::Nodegroup", {
+        "AmiType": "AL2023_ARM_64_STANDARD",
+        "Taints": [{"Key": "kubernetes.io/arch", "Value": "arm64", "Effect": "NO_SCHEDULE"}]
+    })
+
+    launch_templates = assertions.Template.from_stack(built["EksLaunchTemplateStack"])
+    launch_templates.has_resource_properties("AWS::EC2::LaunchTemplate", {
+        "LaunchTemplateName": "prod-arm64-lt",
+        "LaunchTemplateData": assertions.Match.object_like({"InstanceType": "t4g.xlarge"})
+    })
+
+    outputs = assertions.Template.from_stack(built["EksK8sResourcesStack"]).to_json()["Outputs"]
+    pod_spec = json.loads(outputs["DeploymentManifest"]["Value"])["spec"]["template"]["spec"]
+    assert pod_spec["nodeSelector"]["kubernetes.io/arch"] == "arm64"
+    assert pod_spec["tolerations"][0]["key"] == "kubernetes.io/arch"
+
+
+def test_instance_types_must_match_the_architecture(build_stacks):
+    assert node_capacity.instance_architecture("c7gn.large") == "arm64"
+    assert node_capacity.instance_architecture("m6i.xlarge") == "x86_64"
+    with pytest.raises(ValueError, match="m5.xlarge"):
+        build_stacks({"hello_architecture": "arm64", "hello_instance_types": "m7g.xlarge,m5.xlarge"}, STACKS)
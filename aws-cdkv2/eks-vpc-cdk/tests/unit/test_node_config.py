@@ -0,0 +1,59 @@
+import base64
+import email
+import json
+
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from eks_vpc_cdk import node_config
+from eks_vpc_cdk.eks_launch_template import node_user_data
+
+
+def test_nothing_to_render_by_default():
+    app = core.App()
+    assert node_config.kubelet_config(app, ["t3a.xlarge"]) == {}
+    assert node_config.containerd_config(app) == ""
+    assert node_config.render() == ""
+
+
+def test_kubelet_tuning_in_the_launch_template(build_stacks):
+    built = build_stacks({"kubelet_tuning": "true", "kube_reserved": "cpu=150m,memory=1Gi"}, ["EksLaunchTemplateStack"])
+    template = assertions.Template.from_stack(built["EksLaunchTemplateStack"]).to_json()
+    user_data = base64.b64decode(
+        template["Resources"]["ProdSchedulerLaunchTemplate"]["Properties"]["LaunchTemplateData"]["UserData"]
+    ).decode()
+    assert "serializeImagePulls: false" in user_data
+    assert "maxParallelImagePulls: 5" in user_data
+    assert 'kubeReserved: {"cpu": "150m", "memory": "1Gi"}' in user_data
+    assert 'evictionHard: {"memory.available": "200Mi"' in user_data
+    assert "      max_concurrent_downloads = 10\n" in user_data
+
+
+def test_user_data_is_a_mime_document_nodeadm_can_read():
+    app = core.App(context={"kubelet_tuning": "true"})
+    cluster = {"name": "prod-eks-sre-cluster", "apiServerEndpoint": "https://example", "cidr": "172.20.0.0/16"}
+    message = email.message_from_string(node_user_data(app, ["t3a.xlarge"], cluster))
+    assert message["MIME-Version"] == "1.0"
+    assert message.is_multipart()
+    parts = {part.get_content_type(): part.get_payload() for part in message.get_payload()}
+    assert list(parts) == ["application/node.eks.aws", "text/x-shellscript"]
+    assert "apiServerEndpoint" in parts["application/node.eks.aws"]
+    assert "serializeImagePulls: false" in parts["application/node.eks.aws"]
+    assert parts["text/x-shellscript"].startswith("#!/bin/bash\n")
+
+
+def test_karpenter_nodes_get_the_same_tuning(build_stacks):
+    built = build_stacks({"kubelet_tuning": "true", "karpenter": "true"}, ["EksKarpenterStack"])
+    outputs = assertions.Template.from_stack(built["EksKarpenterStack"]).to_json()["Outputs"]
+    value = outputs["EC2NodeClassManifest"]["Value"]["Fn::Join"][1]
+    spec = json.loads("".join(part if isinstance(part, str) else "sg-1" for part in value))["spec"]
+    assert spec["kubelet"]["imageGCHighThresholdPercent"] == 85
+    assert "serializeImagePulls" not in spec["kubelet"]
+    assert "serializeImagePulls: false" in spec["userData"]
+
+
+def test_image_gc_thresholds_are_checked():
+    app = core.App(context={"kubelet_tuning": "true", "image_gc_low": "90"})
+    with pytest.raises(ValueError, match="image_gc_low"):
+        node_config.kubelet_config(app, ["t3a.xlarge"])
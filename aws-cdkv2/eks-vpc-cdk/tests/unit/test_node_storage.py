@@ -0,0 +1,61 @@
+import base64
+import json
+
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+
+from eks_vpc_cdk import node_storage
+from eks_vpc_cdk.eks_launch_template import ROOT_VOLUME
+
+
+def test_instance_store_families():
+    for instance_type in ("m6id.xlarge", "c6gd.large", "r5dn.2xlarge", "z1d.large", "i4i.xlarge", "im4gn.large"):
+        assert node_storage.has_instance_store(instance_type), instance_type
+    for instance_type in ("t3a.xlarge", "m6i.xlarge", "c5n.large", "t4g.xlarge", "inf2.xlarge"):
+        assert not node_storage.has_instance_store(instance_type), instance_type
+
+
+def test_gp3_scales_with_instance_size():
+    assert node_storage.gp3_performance("t3a.medium") == (3000, 125)
+    assert node_storage.gp3_performance("t3a.xlarge") == (6000, 375)
+    assert node_storage.gp3_performance("m6i.4xlarge") == (12000, 750)
+    assert node_storage.gp3_performance("m6i.metal") == (16000, 1000)
+
+
+def test_sized_metal_types_count_as_their_xlarge_size():
+    assert node_storage.size_units("m7i.metal-24xl") == node_storage.size_units("m7i.24xlarge") == 48
+    assert node_storage.size_units("c7i.metal-48xl") == 96
+    assert node_storage.size_units("r7iz.metal-16xl") == 32
+    app = core.App(context={"storage_profile": "nvme"})
+    assert node_storage.root_volume(app, ["c7i.metal-48xl", "m6i.xlarge"], ROOT_VOLUME)["iops"] == 6000
+
+
+def test_root_volume_unchanged_by_default():
+    app = core.App()
+    assert node_storage.root_volume(app, ["m6i.8xlarge"], ROOT_VOLUME) is ROOT_VOLUME
+    assert node_storage.local_storage(app) is None
+
+
+def test_root_volume_follows_the_smallest_type_without_instance_store():
+    app = core.App(context={"storage_profile": "nvme"})
+    assert node_storage.root_volume(app, ["m6id.xlarge"], ROOT_VOLUME) is ROOT_VOLUME
+    volume = node_storage.root_volume(app, ["m6id.large", "m6i.4xlarge", "m6i.2xlarge"], ROOT_VOLUME)
+    assert (volume["iops"], volume["throughput"]) == (8000, 500)
+    assert volume["volume_size"] == ROOT_VOLUME["volume_size"]
+
+
+def test_nvme_profile_in_the_launch_template(build_stacks):
+    built = build_stacks({"storage_profile": "nvme"}, ["EksLaunchTemplateStack"])
+    data = assertions.Template.from_stack(built["EksLaunchTemplateStack"]).to_json()[
+        "Resources"]["ProdSchedulerLaunchTemplate"]["Properties"]["LaunchTemplateData"]
+    assert data["BlockDeviceMappings"][0]["Ebs"]["Iops"] == 6000
+    user_data = base64.b64decode(data["UserData"]).decode()
+    assert '  instance:\n    localStorage: {"strategy": "RAID0"}\n' in user_data
+
+
+def test_karpenter_nodes_raid_the_instance_store(build_stacks):
+    built = build_stacks({"storage_profile": "nvme", "karpenter": "true"}, ["EksKarpenterStack"])
+    outputs = assertions.Template.from_stack(built["EksKarpenterStack"]).to_json()["Outputs"]
+    value = outputs["EC2NodeClassManifest"]["Value"]["Fn::Join"][1]
+    spec = json.loads("".join(part if isinstance(part, str) else "sg-1" for part in value))["spec"]
+    assert spec["instanceStorePolicy"] == "RAID0"
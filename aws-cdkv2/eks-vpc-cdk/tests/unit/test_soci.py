@@ -0,0 +1,102 @@
+import json
+
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from eks_vpc_cdk import node_config, soci, stack_registry
+
+AMD64_SHA256 = "a" * 64
+CHECKSUMS = f"amd64={AMD64_SHA256},arm64={'b' * 64}"
+
+
+def test_nothing_changes_without_soci():
+    app = core.App()
+    assert soci.node_setup(app) == ""
+    assert "EksSociIndexStack" not in stack_registry.default_stacks()
+
+
+def test_nodes_pull_through_the_snapshotter():
+    app = core.App(context={"soci": "true", "soci_release_sha256": CHECKSUMS})
+    assert node_config.kubelet_config(app, ["t3a.xlarge"])["imageServiceEndpoint"] == (
+        f"unix://{soci.SNAPSHOTTER_SOCKET}"
+    )
+    setup = soci.node_setup(app)
+    assert "systemctl enable --now soci-snapshotter.service" in setup
+    assert "Before=containerd.service nodeadm-run.service\n" in setup
+
+
+def test_release_is_checked_before_it_is_unpacked():
+    with pytest.raises(ValueError, match="soci_release_sha256 for amd64"):
+        soci.node_setup(core.App(context={"soci": "true"}))
+    with pytest.raises(ValueError, match="soci_release_sha256 for arm64"):
+        soci.node_setup(core.App(context={
+            "soci": "true", "soci_release_sha256": f"amd64={AMD64_SHA256}", "hello_architecture": "arm64"
+        }))
+    commands = soci.install_commands({"amd64": AMD64_SHA256})
+    check = commands.index('echo "$SOCI_SHA256  /tmp/soci.tar.gz" | sha256sum -c - || exit 1')
+    assert f"amd64) SOCI_SHA256={AMD64_SHA256};;" in commands[1]
+    assert commands[check + 1].startswith("tar -xzf /tmp/soci.tar.gz")
+
+
+def test_pipeline_ami_has_the_snapshotter_baked_in():
+    app = core.App(context={
+        "soci": "true", "soci_release_sha256": CHECKSUMS, "image_builder": "true", "node_image": "image_builder"
+    })
+    assert soci.node_setup(app) == ""
+    built = stack_registry.build(app, ["EksImageBuilderStack"])
+    template = assertions.Template.from_stack(built["EksImageBuilderStack"])
+    template.has_resource_properties("AWS::ImageBuilder::Component", {"Name": "prod-eks-soci-snapshotter"})
+    recipe = template.to_json()["Resources"]["NodeImageRecipe"]["Properties"]
+    assert len(recipe["Components"]) == 2
+
+
+def test_containerd_tables_are_merged_with_the_tuning():
+    app = core.App(context={"soci": "true", "kubelet_tuning": "true"})
+    config = node_config.containerd_config(app)
+    assert config.count('[plugins."io.containerd.grpc.v1.cri".containerd]') == 1
+    assert 'snapshotter = "soci"\n' in config
+    assert "discard_unpacked_layers = true\n" in config
+    assert "[proxy_plugins.soci]\n" in config
+
+
+def test_karpenter_nodes_install_the_snapshotter(build_stacks):
+    built = build_stacks({"soci": "true", "soci_release_sha256": CHECKSUMS, "karpenter": "true"}, ["EksKarpenterStack"])
+    outputs = assertions.Template.from_stack(built["EksKarpenterStack"]).to_json()["Outputs"]
+    value = outputs["EC2NodeClassManifest"]["Value"]["Fn::Join"][1]
+    spec = json.loads("".join(part if isinstance(part, str) else "sg-1" for part in value))["spec"]
+    assert "imageServiceEndpoint" in spec["userData"]
+    assert "Content-Type: text/x-shellscript" in spec["userData"]
+
+
+def test_index_builds_on_tagged_pushes(build_stacks):
+    built = build_stacks({
+        "soci": "true", "soci_release_sha256": CHECKSUMS, "soci_repositories": "hello/swatops13032,hello/api"
+    }, ["EksSociIndexStack"])
+    template = assertions.Template.from_stack(built["EksSociIndexStack"])
+    template.has_resource_properties("AWS::Events::Rule", {
+        "EventPattern": assertions.Match.object_like({
+            "detail": assertions.Match.object_like({
+                "repository-name": ["hello/swatops13032", "hello/api"],
+                "image-tag": [{"exists": True}]
+            })
+        })
+    })
+    template.has_resource_properties("AWS::CodeBuild::Project", {
+        "Environment": assertions.Match.object_like({"PrivilegedMode": True})
+    })
+    build_spec = template.to_json()["Resources"]["SociIndexProject"]["Properties"]["Source"]["BuildSpec"]
+    assert "soci create --min-layer-size 10485760 $IMAGE" in json.loads(build_spec)["phases"]["build"]["commands"]
+
+
+def test_nodes_lazy_load_the_index_version_the_job_builds():
+    # soci create builds version 1 indexes; the snapshotter only uses them
+    # with the soci_v1 pull mode on
+    app = core.App(context={"soci": "true", "soci_release_sha256": CHECKSUMS})
+    setup = soci.node_setup(app)
+    config = setup.split("config.toml\n", 1)[1].split("\nEOF\n", 1)[0]
+    assert "[pull_modes.soci_v1]\nenable = true\n" in config
+    commands = json.loads(soci.buildspec(10485760, soci.release_checksums(app)))["phases"]["build"]["commands"]
+    assert [command.split()[:2] for command in commands if command.startswith("soci ")] == [
+        ["soci", "create"], ["soci", "push"]
+    ]
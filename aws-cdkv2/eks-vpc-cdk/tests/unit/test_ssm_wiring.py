@@ -0,0 +1,45 @@
+import json
+
+import aws_cdk.assertions as assertions
+import pytest
+
+STACKS = ["EksNodeGroupSchedulerStack"]
+
+
+def test_ssm_wiring_publishes_identifiers_and_avoids_exports(build_stacks):
+    built = build_stacks({"wiring": "ssm"}, STACKS)
+
+    vpc = assertions.Template.from_stack(built["EksVpcCdkStack"])
+    vpc.has_resource_properties("AWS::SSM::Parameter", {"Name": "/prod-eks/vpc/id"})
+    vpc.has_resource_properties("AWS::SSM::Parameter", {"Name": "/prod-eks/vpc/private-subnet/2"})
+    assertions.Template.from_stack(built["EksLaunchTemplateStack"]).has_resource_properties(
+        "AWS::SSM::Parameter", {"Name": "/prod-eks/launch-template/id"}
+    )
+
+    nodegroup = assertions.Template.from_stack(built["EksNodeGroupSchedulerStack"]).to_json()
+    assert "Fn::ImportValue" not in json.dumps(nodegroup)
+    assert any(
+        parameter.get("Default") == "/prod-eks/launch-template/id"
+        for parameter in nodegroup["Parameters"].values()
+    )
+
+
+def test_default_wiring_uses_exports(build_stacks):
+    built = build_stacks({}, STACKS)
+    nodegroup = assertions.Template.from_stack(built["EksNodeGroupSchedulerStack"]).to_json()
+    assert "Fn::ImportValue" in json.dumps(nodegroup)
+    assertions.Template.from_stack(built["EksVpcCdkStack"]).resource_count_is("AWS::SSM::Parameter", 0)
+
+
+def test_invalid_wiring_is_rejected(build_stacks):
+    with pytest.raises(ValueError, match="wiring"):
+        build_stacks({"wiring": "carrier-pigeon"}, STACKS)
+
+
+def test_both_wiring_publishes_but_keeps_exports(build_stacks):
+    built = build_stacks({"wiring": "both"}, STACKS)
+    assertions.Template.from_stack(built["EksVpcCdkStack"]).has_resource_properties(
+        "AWS::SSM::Parameter", {"Name": "/prod-eks/vpc/id"}
+    )
+    nodegroup = assertions.Template.from_stack(built["EksNodeGroupSchedulerStack"]).to_json()
+    assert "Fn::ImportValue" in json.dumps(nodegroup)
@@ -0,0 +1,50 @@
+import aws_cdk as core
+import pytest
+
+from eks_vpc_cdk import stack_registry
+
+
+def test_resolve_all_stacks_dependencies_first():
+    order = stack_registry.resolve()
+    assert sorted(order) == sorted(stack_registry.default_stacks())
+    for stack_id in order:
+        for dep in stack_registry.dependencies(stack_id):
+            assert order.index(dep) < order.index(stack_id)
+
+
+def test_resolve_requested_stack_pulls_in_dependencies_only():
+    order = stack_registry.resolve(["EksAlbStack"])
+    assert order == ["EksVpcCdkStack", "EksAlbStack"]
+
+
+def test_requested_stacks_from_context():
+    app = core.App(context={"stacks": "EksClusterStack, EksVpcCdkStack"})
+    assert stack_registry.requested_stacks(app) == ["EksClusterStack", "EksVpcCdkStack"]
+    assert stack_registry.requested_stacks(core.App()) is None
+
+
+def test_requested_stacks_rejects_unknown_names():
+    app = core.App(context={"stacks": "NoSuchStack"})
+    with pytest.raises(ValueError):
+        stack_registry.requested_stacks(app)
+
+
+def test_build_only_requested_stacks():
+    app = core.App(context={"stacks": "EksLaunchTemplateStack"})
+    built = stack_registry.build(app, stack_registry.requested_stacks(app))
+    assert list(built) == [
+        "EksVpcCdkStack", "EksClusterRoleStack", "EksClusterStack", "EksLaunchTemplateStack"
+    ]
+    assert sorted(stack.stack_name for stack in app.synth().stacks) == sorted(built)
+
+
+def test_optional_stacks_need_their_flag():
+    assert "EksKarpenterStack" not in stack_registry.resolve()
+    assert stack_registry.requested_stacks(core.App()) is None
+
+    app = core.App(context={"karpenter": "true"})
+    assert stack_registry.requested_stacks(app) == stack_registry.default_stacks() + ["EksKarpenterStack"]
+
+    app = core.App(context={"stacks": "EksKarpenterStack"})
+    with pytest.raises(ValueError, match="karpenter=true"):
+        stack_registry.build(app, stack_registry.requested_stacks(app))
@@ -0,0 +1,86 @@
+import json
+
+from eks_vpc_cdk import stack_registry, synth_cache
+
+
+def test_module_closure_follows_package_imports():
+    closure = synth_cache.module_closure("eks_vpc_cdk.eks_launch_template")
+    # Direct and transitive package imports; nothing outside the package
+    assert {"eks_vpc_cdk.eks_launch_template", "eks_vpc_cdk.eks_create_cluster",
+            "eks_vpc_cdk.settings"} <= set(closure)
+    assert all(name.startswith("eks_vpc_cdk.") for name in closure)
+    assert closure == sorted(closure)
+
+
+def test_fingerprint_ignores_stack_selection_but_not_feature_flags():
+    base = synth_cache.fingerprint("EksAlbStack", {})
+    assert synth_cache.fingerprint("EksAlbStack", {"stacks": "EksAlbStack"}) == base
+    assert synth_cache.fingerprint("EksAlbStack", {"aws:cdk:enable-path-metadata": True}) == base
+    assert synth_cache.fingerprint("EksAlbStack", {"@aws-cdk/core:newFlag": True}) != base
+
+
+def test_unchanged_stacks_are_restored_and_need_no_deploy(tmp_path):
+    cache_dir, outdir = tmp_path / "cache", tmp_path / "out"
+    outdir.mkdir()
+    fingerprints = synth_cache.fingerprints({})
+    for stack_id in stack_registry.STACKS:
+        (outdir / f"{stack_id}.template.json").write_text(json.dumps({"Resources": {stack_id: {}}}))
+
+    changed = synth_cache.changed_stacks(str(cache_dir), fingerprints)
+    assert changed == stack_registry.resolve()
+    synth_cache.update(str(cache_dir), str(outdir), fingerprints, changed)
+
+    # Second run: only the ALB changed, so it is rebuilt with nothing referencing it
+    fingerprints["EksAlbStack"] = "changed"
+    changed = synth_cache.changed_stacks(str(cache_dir), fingerprints)
+    assert changed == ["EksAlbStack"]
+    assert synth_cache.stacks_to_build(changed) == ["EksAlbStack"]
+
+    outdir2 = tmp_path / "out2"
+    outdir2.mkdir()
+    (outdir2 / "EksAlbStack.template.json").write_text(json.dumps({"Resources": {"Alb": {}}}))
+    status = synth_cache.update(str(cache_dir), str(outdir2), fingerprints, changed)
+    assert status["EksAlbStack"]["deploy_needed"] is True
+    assert status["EksVpcCdkStack"] == {
+        "fingerprint": fingerprints["EksVpcCdkStack"], "source": "cache", "deploy_needed": False
+    }
+    assert (outdir2 / "EksVpcCdkStack.template.json").exists()
+
+
+def test_changed_producer_is_rebuilt_with_its_consumers():
+    assert synth_cache.stacks_to_build(["EksLaunchTemplateStack"]) == [
+        "EksLaunchTemplateStack", "EksNodeGroupSchedulerStack", "EksNodeGroupHelloStack"
+    ]
+
+
+def test_restored_stacks_keep_their_manifest_artifacts(tmp_path):
+    cache_dir, outdir = tmp_path / "cache", tmp_path / "out"
+    outdir.mkdir()
+    fingerprints = synth_cache.fingerprints({})
+    artifacts = {}
+    for stack_id in stack_registry.resolve():
+        (outdir / f"{stack_id}.template.json").write_text(json.dumps({"Resources": {stack_id: {}}}))
+        (outdir / f"{stack_id}.assets.json").write_text(json.dumps({"files": {stack_id: {}}}))
+        artifacts[f"{stack_id}.assets"] = {
+            "type": "cdk:asset-manifest", "properties": {"file": f"{stack_id}.assets.json"}
+        }
+        artifacts[stack_id] = {"type": "aws:cloudformation:stack", "dependencies": [f"{stack_id}.assets"]}
+    (outdir / "manifest.json").write_text(json.dumps({"version": "1", "artifacts": artifacts}))
+    changed = synth_cache.changed_stacks(str(cache_dir), fingerprints)
+    synth_cache.update(str(cache_dir), str(outdir), fingerprints, changed)
+
+    # Warm cache: only the ALB is synthesized, the rest comes from the cache
+    fingerprints["EksAlbStack"] = "changed"
+    changed = synth_cache.changed_stacks(str(cache_dir), fingerprints)
+    outdir2 = tmp_path / "out2"
+    outdir2.mkdir()
+    (outdir2 / "EksAlbStack.template.json").write_text(json.dumps({"Resources": {"Alb": {}}}))
+    (outdir2 / "EksAlbStack.assets.json").write_text("{}")
+    (outdir2 / "manifest.json").write_text(json.dumps({"version": "1", "artifacts": {
+        "EksAlbStack.assets": artifacts["EksAlbStack.assets"], "EksAlbStack": artifacts["EksAlbStack"]
+    }}))
+    synth_cache.update(str(cache_dir), str(outdir2), fingerprints, changed)
+
+    manifest = json.loads((outdir2 / "manifest.json").read_text())
+    assert manifest["artifacts"] == artifacts
+    assert (outdir2 / "EksVpcCdkStack.assets.json").exists()
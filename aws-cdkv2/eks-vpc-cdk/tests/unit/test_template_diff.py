@@ -0,0 +1,72 @@
+import copy
+import json
+
+from eks_vpc_cdk import template_diff
+
+CLUSTER_TEMPLATE = {
+    "Resources": {
+        "ProdSreEksCluster": {
+            "Type": "AWS::EKS::Cluster",
+            "Properties": {
+                "Name": "prod-eks-sre-cluster",
+                "Version": "1.33",
+                "ResourcesVpcConfig": {"SubnetIds": ["subnet-a", "subnet-b"]}
+            },
+            "Metadata": {"aws:cdk:path": "EksClusterStack/ProdSreEksCluster"}
+        },
+        "CDKMetadata": {"Type": "AWS::CDK::Metadata", "Properties": {"Analytics": "v2:deflate64:abc"}}
+    },
+    "Outputs": {"EksClusterName": {"Value": "prod-eks-sre-cluster"}},
+    "Parameters": {"BootstrapVersion": {"Type": "AWS::SSM::Parameter::Value<String>"}}
+}
+
+
+def _changed(**properties):
+    template = copy.deepcopy(CLUSTER_TEMPLATE)
+    template["Resources"]["ProdSreEksCluster"]["Properties"].update(properties)
+    return template
+
+
+def test_metadata_and_ordering_churn_is_unchanged():
+    template = copy.deepcopy(CLUSTER_TEMPLATE)
+    template["Resources"]["ProdSreEksCluster"]["Metadata"] = {"aws:cdk:path": "moved"}
+    template["Resources"]["CDKMetadata"]["Properties"]["Analytics"] = "v2:deflate64:xyz"
+    template["Resources"]["ProdSreEksCluster"]["Properties"]["ResourcesVpcConfig"]["SubnetIds"].reverse()
+    assert template_diff.diff_template(CLUSTER_TEMPLATE, template)["status"] == template_diff.UNCHANGED
+
+
+def test_version_bump_is_update_in_place():
+    result = template_diff.diff_template(CLUSTER_TEMPLATE, _changed(Version="1.34"))
+    assert result["status"] == template_diff.UPDATE
+    assert result["resources"]["ProdSreEksCluster"] == {"change": "update-in-place", "properties": ["Version"]}
+
+
+def test_cluster_subnet_change_is_replacement():
+    result = template_diff.diff_template(
+        CLUSTER_TEMPLATE, _changed(ResourcesVpcConfig={"SubnetIds": ["subnet-a", "subnet-c"]})
+    )
+    assert result["status"] == template_diff.REPLACEMENT
+    assert result["resources"]["ProdSreEksCluster"]["properties"] == ["ResourcesVpcConfig.SubnetIds"]
+
+
+def test_output_only_change_is_update():
+    template = copy.deepcopy(CLUSTER_TEMPLATE)
+    template["Outputs"]["Extra"] = {"Value": "x"}
+    assert template_diff.diff_template(CLUSTER_TEMPLATE, template) == {
+        "status": template_diff.UPDATE, "resources": {}
+    }
+
+
+def test_diff_lists_only_changed_stacks_to_deploy(tmp_path):
+    baseline, out = tmp_path / "baseline", tmp_path / "out"
+    baseline.mkdir()
+    out.mkdir()
+    for directory, cluster in ((baseline, CLUSTER_TEMPLATE), (out, _changed(Version="1.34"))):
+        (directory / "EksClusterStack.template.json").write_text(json.dumps(cluster))
+        (directory / "EksAlbStack.template.json").write_text(json.dumps({"Resources": {}}))
+    (out / "EksVpcCdkStack.template.json").write_text(json.dumps({"Resources": {}}))
+
+    result = template_diff.diff(str(baseline), str(out))
+    assert result["deploy"] == ["EksVpcCdkStack", "EksClusterStack"]
+    assert result["stacks"]["EksAlbStack"]["status"] == template_diff.UNCHANGED
+    assert result["replacements"] == []
@@ -0,0 +1,44 @@
+import json
+
+import aws_cdk as core
+import pytest
+
+from eks_vpc_cdk import template_report
+
+TEMPLATE = {
+    "Resources": {
+        "EksVpc": {"Type": "AWS::EC2::VPC", "Properties": {"CidrBlock": "192.168.0.0/16"}},
+        "Consumer": {"Type": "AWS::EC2::Subnet", "Properties": {"VpcId": {"Fn::ImportValue": "vpc-id"}}}
+    },
+    "Outputs": {
+        "Manifest": {"Value": json.dumps({"kind": "Deployment", "spec": {"replicas": 1}})},
+        "VpcId": {"Value": {"Ref": "EksVpc"}, "Export": {"Name": "vpc-id"}}
+    }
+}
+
+
+def _write(directory, name, template):
+    (directory / f"{name}.template.json").write_text(json.dumps(template))
+
+
+def test_stack_report_counts():
+    report = template_report.stack_report(TEMPLATE, 1234)
+    assert report["template_bytes"] == 1234
+    assert (report["resources"], report["outputs"], report["exports"], report["imports"]) == (2, 2, 1, 1)
+    assert report["largest_properties"][0]["path"] == "Outputs/Manifest/Value"
+
+
+def test_thresholds_scale_hard_limits_and_accept_overrides():
+    limits = template_report.thresholds(0.5, {"outputs": 1})
+    assert limits["resources"] == 250
+    assert limits["outputs"] == 1
+
+
+def test_check_fails_when_threshold_crossed(tmp_path):
+    _write(tmp_path, "EksK8sResourcesStack", TEMPLATE)
+    app = core.App(context={"template_limits": {"outputs": 1}})
+    with pytest.raises(ValueError, match="EksK8sResourcesStack: outputs is 2"):
+        template_report.check(app, str(tmp_path))
+    assert (tmp_path / "template-report.json").exists()
+
+    assert template_report.check(core.App(), str(tmp_path))["violations"] == []
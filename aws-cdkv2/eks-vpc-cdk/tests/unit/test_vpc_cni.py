@@ -0,0 +1,64 @@
+import base64
+import json
+
+import aws_cdk.assertions as assertions
+import pytest
+
+from eks_vpc_cdk import vpc_cni
+
+STACKS = ["EksClusterStack"]
+
+
+def test_no_addon_by_default(build_stacks):
+    built = build_stacks({}, STACKS)
+    assertions.Template.from_stack(built["EksClusterStack"]).resource_count_is("AWS::EKS::Addon", 0)
+
+
+def test_custom_networking_with_pod_cidr(build_stacks):
+    built = build_stacks({"pod_cidr": "100.64.0.0/16"}, STACKS)
+
+    vpc = assertions.Template.from_stack(built["EksVpcCdkStack"])
+    vpc.has_resource_properties("AWS::EC2::VPCCidrBlock", {"CidrBlock": "100.64.0.0/16"})
+    vpc.has_resource("AWS::EC2::Subnet", {
+        "Properties": {"CidrBlock": "100.64.64.0/18", "AvailabilityZone": "us-east-1b"},
+        "DependsOn": ["PodCidrBlock"]
+    })
+
+    cluster = assertions.Template.from_stack(built["EksClusterStack"]).to_json()
+    addon = cluster["Resources"]["VpcCniAddon"]["Properties"]
+    assert addon["AddonName"] == "vpc-cni"
+    configuration = "".join(
+        part if isinstance(part, str) else "X" for part in addon["ConfigurationValues"]["Fn::Join"][1]
+    )
+    config = json.loads(configuration)
+    assert config["env"]["AWS_VPC_K8S_CNI_CUSTOM_NETWORK_CFG"] == "true"
+    assert sorted(config["eniConfig"]["subnets"]) == ["us-east-1a", "us-east-1b", "us-east-1c"]
+
+
+def test_max_pods_table():
+    assert vpc_cni.max_pods("t3a.xlarge") == 58
+    assert vpc_cni.max_pods("m5.large") == 29
+    assert vpc_cni.max_pods("t3a.xlarge", custom_networking=True) == 44
+    assert vpc_cni.max_pods("t3a.xlarge", prefix_delegation=True) == 110
+    assert vpc_cni.max_pods("m5.8xlarge", prefix_delegation=True) == 250
+    with pytest.raises(ValueError, match="ENI_LIMITS"):
+        vpc_cni.max_pods("x99.huge")
+
+
+def test_prefix_delegation_sets_addon_env_and_max_pods(build_stacks):
+    built = build_stacks({"prefix_delegation": "true", "warm_prefix_target": "2"}, ["EksLaunchTemplateStack"])
+
+    cluster = assertions.Template.from_stack(built["EksClusterStack"])
+    cluster.has_resource_properties("AWS::EKS::Addon", {
+        "AddonName": "vpc-cni",
+        "ConfigurationValues": json.dumps(
+            {"env": {"ENABLE_PREFIX_DELEGATION": "true", "WARM_PREFIX_TARGET": "2"}}, separators=(",", ":")
+        )
+    })
+
+    template = assertions.Template.from_stack(built["EksLaunchTemplateStack"]).to_json()
+    user_data = base64.b64decode(
+        template["Resources"]["ProdSchedulerLaunchTemplate"]["Properties"]["LaunchTemplateData"]["UserData"]
+    ).decode()
+    assert "Content-Type: application/node.eks.aws" in user_data
+    assert "maxPods: 110" in user_data
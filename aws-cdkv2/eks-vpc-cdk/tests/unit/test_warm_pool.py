@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+
+import aws_cdk.assertions as assertions
+import pytest
+
+from eks_vpc_cdk import warm_pool
+
+STACKS = ["EksNodeGroupSchedulerStack"]
+
+
+def test_managed_node_group_without_warm_pool(build_stacks):
+    template = assertions.Template.from_stack(build_stacks({}, STACKS)["EksNodeGroupSchedulerStack"])
+    template.resource_count_is("AWS::EKS::Nodegroup", 1)
+    template.resource_count_is("AWS::AutoScaling::WarmPool", 0)
+
+
+def test_warm_pool_replaces_the_managed_node_group(build_stacks):
+    built = build_stacks({"scheduler_warm_pool_size": "3", "scheduler_max_size": "6"}, STACKS)
+    template = assertions.Template.from_stack(built["EksNodeGroupSchedulerStack"])
+    template.resource_count_is("AWS::EKS::Nodegroup", 0)
+    template.has_resource_properties("AWS::AutoScaling::WarmPool", {
+        "MinSize": 3,
+        "PoolState": "Stopped",
+        "InstanceReusePolicy": {"ReuseOnScaleIn": True}
+    })
+    template.has_resource_properties("AWS::AutoScaling::AutoScalingGroup", {
+        "AutoScalingGroupName": "prod-scheduler-v2",
+        "MaxSize": "6",
+        "LifecycleHookSpecificationList": [assertions.Match.object_like({
+            "LifecycleHookName": "prod-scheduler-v2-launch",
+            "LifecycleTransition": "autoscaling:EC2_INSTANCE_LAUNCHING"
+        })]
+    })
+
+    # Self-managed nodes bootstrap themselves and stay down while warmed
+    data = template.to_json()["Resources"]["ProdSchedulerWarmPoolLaunchTemplate"]["Properties"]["LaunchTemplateData"]
+    user_data = json.dumps(data["UserData"])
+    assert "apiServerEndpoint" in user_data
+    assert "Requires=warm-pool-gate.service" in user_data
+    assert "until [ \\\"$(imds autoscaling/target-lifecycle-state)\\\" = InService ]" in user_data
+    assert "IamInstanceProfile" in data
+
+
+def test_hibernated_pool_encrypts_the_root_volume(build_stacks):
+    built = build_stacks({"scheduler_warm_pool_size": "1", "scheduler_warm_pool_state": "Hibernated"}, STACKS)
+    template = assertions.Template.from_stack(built["EksNodeGroupSchedulerStack"])
+    template.has_resource_properties("AWS::EC2::LaunchTemplate", {
+        "LaunchTemplateData": assertions.Match.object_like({
+            "HibernationOptions": {"Configured": True},
+            "BlockDeviceMappings": [assertions.Match.object_like({
+                "Ebs": assertions.Match.object_like({"Encrypted": True})
+            })]
+        })
+    })
+
+
+@pytest.mark.parametrize("pool_state", ["Running", "Hibernated"])
+def test_gate_waits_for_in_service_without_a_reboot(tmp_path, pool_state):
+    # The instance moves from the pool to InService without booting again;
+    # the gate must notice, complete the lifecycle action and exit 0 so
+    # nodeadm-run starts the kubelet
+    setup = warm_pool.gate_setup("prod-scheduler-v2")
+    script = setup.split("\n", 1)[1].split("\nEOF\n", 1)[0]
+    (tmp_path / "gate").write_text(script)
+    states = tmp_path / "states"
+    states.write_text(f"Warmed:{pool_state}\nWarmed:{pool_state}\nWarmed:{pool_state}\nInService\n")
+    calls = tmp_path / "calls"
+    stubs = {
+        "curl": (
+            'case "$*" in\n'
+            '  *api/token*) echo token ;;\n'
+            f'  *target-lifecycle-state*) head -1 {states}; sed -i "1{{/InService/!d}}" {states} ;;\n'
+            '  *) echo i-1 ;;\n'
+            'esac\n'
+        ),
+        "aws": f'echo "$*" >> {calls}\n',
+        "sleep": ""
+    }
+    for name, body in stubs.items():
+        (tmp_path / name).write_text("#!/bin/bash\n" + body)
+        (tmp_path / name).chmod(0o755)
+    env = {**os.environ, "PATH": f"{tmp_path}:{os.environ['PATH']}"}
+    subprocess.run(["bash", str(tmp_path / "gate")], env=env, check=True, timeout=30)
+    completions = calls.read_text().splitlines()
+    assert len(completions) == 2
+    assert all("--lifecycle-hook-name prod-scheduler-v2-launch" in call for call in completions)
+    assert states.read_text() == "InService\n"
+
+
+def test_warm_pool_requires_ipv4(build_stacks):
+    with pytest.raises(ValueError, match="ipv4"):
+        build_stacks({"scheduler_warm_pool_size": "1", "ip_family": "ipv6"}, STACKS)